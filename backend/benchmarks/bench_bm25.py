@@ -0,0 +1,149 @@
+"""
+Latency benchmark for the lexical (BM25) leg of the hybrid retriever.
+
+Chunks the PDFs in a documents directory, then grows the chunk list to each
+requested corpus size by repeating it with a fraction of tokens rewritten per
+copy (so the vocabulary and postings grow like a real corpus rather than
+staying fixed). For every size it compares:
+
+- rank_bm25: BM25Retriever.from_documents, the previous implementation
+- sparse: SparseBM25Retriever (CSR term x chunk matrix, argpartition top-k)
+
+and reports build time, query latency (mean / p95, k=10) and how closely the
+sparse top 10 matches rank_bm25's: identical score lists (rankings equal up
+to the order of tied chunks) and mean overlap@10.
+
+rank_bm25 scores every chunk in Python per query term, so it is skipped for
+sizes above --reference-max.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bm25 [--docs documents] [--sizes 1000,10000,100000] [--queries 50]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import types
+from pathlib import Path
+
+import numpy as np
+from langchain.schema import Document
+from langchain_community.retrievers import BM25Retriever
+
+from chain import ingestion
+
+# chain.retriever builds the production retriever at import time; the benchmark
+# only needs the scorer class, so give it an empty loader instead
+sys.modules.setdefault("chain.loader", types.SimpleNamespace(vectorstore=None, docs=[], bm25_index=None, persist_dir=None))
+from chain.retriever import SparseBM25Retriever  # noqa: E402
+
+K = 10
+MUTATION_RATE = 0.2
+
+
+def load_chunks(docs_dir: str):
+    pdfs = [str(p) for p in sorted(Path(docs_dir).rglob("*.pdf"))]
+    chunks = []
+    for _, file_chunks in ingestion.iter_file_chunks((p, Path(p).name) for p in pdfs):
+        chunks.extend(file_chunks or [])
+    return [c.page_content for c in chunks]
+
+
+def grow_corpus(texts, size: int, seed: int = 0):
+    """Repeat the base chunks up to size, rewriting MUTATION_RATE of the tokens in every copy"""
+    rng = random.Random(seed)
+    out = []
+    copy = 0
+    while len(out) < size:
+        for text in texts:
+            if len(out) >= size:
+                break
+            if copy == 0:
+                out.append(text)
+                continue
+            out.append(" ".join(
+                f"{tok}_{copy}" if rng.random() < MUTATION_RATE else tok for tok in text.split()
+            ))
+        copy += 1
+    return [Document(page_content=t, metadata={"position": i}) for i, t in enumerate(out)]
+
+
+def make_queries(docs, n: int, seed: int = 1):
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < n:
+        tokens = rng.choice(docs).page_content.split()
+        if len(tokens) < 6:
+            continue
+        start = rng.randrange(len(tokens) - 5)
+        queries.append(" ".join(tokens[start:start + rng.randint(2, 6)]))
+    return queries
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def latency(retriever, queries):
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        retriever.invoke(q)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(timings), sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+
+
+def agreement(reference, sparse, queries):
+    """(# queries whose top-k score lists are equal, mean overlap@k)"""
+    equal = 0
+    overlap = 0.0
+    for q in queries:
+        ref_scores = reference.vectorizer.get_scores(reference.preprocess_func(q))
+        sparse_scores = sparse.get_scores(q)
+        ref_top = [d.metadata["position"] for d in reference.invoke(q)]
+        sparse_top = [d.metadata["position"] for d in sparse.invoke(q)]
+        equal += bool(np.allclose(ref_scores[ref_top], sparse_scores[sparse_top]))
+        overlap += len(set(ref_top) & set(sparse_top)) / K
+    return equal, overlap / len(queries)
+
+
+def run(docs_dir: str, sizes, n_queries: int, reference_max: int):
+    base = load_chunks(docs_dir)
+    if not base:
+        print(f"No PDF chunks found in {docs_dir}")
+        return
+    print(f"{len(base)} base chunks, {n_queries} queries per size, k={K}\n")
+
+    for size in sizes:
+        docs = grow_corpus(base, size)
+        queries = make_queries(docs, n_queries)
+        print(f"[{size} chunks]")
+
+        sparse, build_s = timed(lambda: SparseBM25Retriever.from_documents(docs, k=K))
+        mean, p95 = latency(sparse, queries)
+        print(f"  sparse    : build {build_s:7.2f}s, query {mean:8.2f} ms mean, {p95:8.2f} ms p95")
+
+        if size > reference_max:
+            print(f"  rank_bm25 : skipped (--reference-max {reference_max})\n")
+            continue
+        reference, build_s = timed(lambda: BM25Retriever.from_documents(docs, k=K))
+        ref_mean, ref_p95 = latency(reference, queries)
+        print(f"  rank_bm25 : build {build_s:7.2f}s, query {ref_mean:8.2f} ms mean, {ref_p95:8.2f} ms p95")
+        equal, overlap = agreement(reference, sparse, queries)
+        print(f"  speedup   : {ref_mean / mean:.1f}x mean latency")
+        print(f"  agreement : {equal}/{len(queries)} identical top-{K} scores, overlap@{K} {overlap:.3f}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", default=os.getenv("DOCUMENTS_DIR", "documents"))
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--reference-max", type=int, default=100000)
+    args = parser.parse_args()
+    run(args.docs, [int(s) for s in args.sizes.split(",")], args.queries, args.reference_max)
@@ -0,0 +1,123 @@
+"""
+Benchmark for the chunking modes used at ingestion time.
+
+Parses the PDFs in a documents directory once, chunks them with the current
+RecursiveCharacterTextSplitter (1000/200) and with SectionChunker, then for
+each mode reports:
+
+- chunk count, chunk sizes and redundancy (chunk characters / source characters)
+- index size: a Chroma store built with LocalHashEmbeddings in a temp dir, plus
+  the estimated size of the OpenAI vectors (1536 float32 per chunk)
+- retrieval latency of the two legs the hybrid retriever runs (BM25, k=10 and
+  Chroma similarity search, k=10), and how often the chunk holding a section's
+  header is in the BM25 top 5 when querying with that header
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunking [--docs documents] [--queries 50]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from langchain_chroma import Chroma
+from langchain_community.retrievers import BM25Retriever
+
+from chain import ingestion
+from chain.embedding_pipeline import LocalHashEmbeddings
+from chain.section_chunker import SectionChunker
+from chain.utils.metadata_utils import find_section_headers
+
+OPENAI_DIM = 1536
+
+
+def dir_size(path: str) -> int:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def header_queries(pages_by_file, n: int):
+    """First line of randomly picked section headers, used as queries"""
+    headers = []
+    for pages in pages_by_file:
+        for page in pages:
+            text = page.page_content
+            for start, _ in find_section_headers(text):
+                line = text[start:].split("\n", 1)[0].strip()
+                headers.append(line)
+    random.Random(0).shuffle(headers)
+    return headers[:n]
+
+
+def time_queries(fn, queries):
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(timings), sorted(timings)[int(len(timings) * 0.95) - 1]
+
+
+def run(docs_dir: str, n_queries: int):
+    pdfs = [str(p) for p in sorted(Path(docs_dir).rglob("*.pdf"))]
+    if not pdfs:
+        print(f"No PDFs found in {docs_dir}")
+        return
+
+    pages_by_file = []
+    for _, pages in ingestion.iter_parsed_pdfs((p, Path(p).name) for p in pdfs):
+        if pages:
+            ingestion.attach_aggregated_metadata(pages)
+            pages_by_file.append(pages)
+    source_chars = sum(len(p.page_content) for pages in pages_by_file for p in pages)
+    queries = header_queries(pages_by_file, n_queries)
+    print(f"{len(pdfs)} PDFs, {sum(len(p) for p in pages_by_file)} pages, {source_chars} characters, {len(queries)} queries\n")
+
+    splitters = {
+        "recursive": ingestion.RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len),
+        "section": SectionChunker(chunk_size=1000),
+    }
+
+    for mode, splitter in splitters.items():
+        chunks = [c for pages in pages_by_file for c in splitter.split_documents(pages)]
+        sizes = [len(c.page_content) for c in chunks]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            store = Chroma.from_documents(
+                documents=ingestion.documents_for_store(chunks),
+                embedding=LocalHashEmbeddings(),
+                persist_directory=tmp
+            )
+            build_s = time.perf_counter() - start
+            store_bytes = dir_size(tmp)
+
+            bm25 = BM25Retriever.from_documents(chunks)
+            bm25.k = 10
+            bm25_mean, bm25_p95 = time_queries(bm25.invoke, queries)
+            vec_mean, vec_p95 = time_queries(lambda q: store.similarity_search(q, k=10), queries)
+
+            bm25.k = 5
+            hits = sum(any(q in d.page_content for d in bm25.invoke(q)) for q in queries)
+            store.delete_collection()
+
+        print(f"[{mode}]")
+        print(f"  chunks            : {len(chunks)} (mean {statistics.mean(sizes):.0f}, max {max(sizes)} chars)")
+        print(f"  redundancy        : {sum(sizes) / source_chars:.2f}x source text")
+        print(f"  index size        : {store_bytes / 1e6:.2f} MB chroma (local 256-dim), "
+              f"~{len(chunks) * OPENAI_DIM * 4 / 1e6:.2f} MB OpenAI vectors")
+        print(f"  build             : {build_s:.2f}s")
+        print(f"  bm25 k=10         : {bm25_mean:.2f} ms mean, {bm25_p95:.2f} ms p95")
+        print(f"  chroma k=10       : {vec_mean:.2f} ms mean, {vec_p95:.2f} ms p95")
+        print(f"  header hit@5      : {hits}/{len(queries)}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", default=os.getenv("DOCUMENTS_DIR", "documents"))
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    run(args.docs, args.queries)
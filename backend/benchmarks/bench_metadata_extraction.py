@@ -0,0 +1,65 @@
+"""
+Micro-benchmark for extract_legal_metadata, the ingestion hot path.
+
+Parses the PDFs in a documents directory once, then runs the previous
+extractor (benchmarks/legacy_metadata_extractor.py) and the current one over
+every page, checks that both return identical metadata and reports pages/sec.
+
+Usage (from backend/):
+    python -m benchmarks.bench_metadata_extraction [--docs documents] [--repeat 5]
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+from langchain_community.document_loaders import PyPDFLoader
+
+from benchmarks import legacy_metadata_extractor
+from chain.utils import metadata_utils
+
+
+def load_pages(docs_dir: str):
+    pages = []
+    for pdf in sorted(Path(docs_dir).rglob("*.pdf")):
+        try:
+            pages.extend((d.page_content, pdf.name) for d in PyPDFLoader(str(pdf)).load())
+        except Exception as e:
+            print(f"Error loading {pdf}: {e}")
+    return pages
+
+
+def pages_per_sec(extract, pages, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, filename in pages:
+            extract(text, filename)
+    return repeat * len(pages) / (time.perf_counter() - start)
+
+
+def run(docs_dir: str, repeat: int):
+    pages = load_pages(docs_dir)
+    if not pages:
+        print(f"No PDF pages found in {docs_dir}")
+        return
+    print(f"{len(pages)} pages, {sum(len(t) for t, _ in pages)} characters\n")
+
+    mismatches = sum(
+        legacy_metadata_extractor.extract_legal_metadata(t, f) != metadata_utils.extract_legal_metadata(t, f)
+        for t, f in pages
+    )
+    print(f"identical output: {len(pages) - mismatches}/{len(pages)} pages")
+
+    before = pages_per_sec(legacy_metadata_extractor.extract_legal_metadata, pages, repeat)
+    after = pages_per_sec(metadata_utils.extract_legal_metadata, pages, repeat)
+    print(f"{'before':>8}: {before:8.1f} pages/sec")
+    print(f"{'after':>8}: {after:8.1f} pages/sec ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", default=os.getenv("DOCUMENTS_DIR", "documents"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.docs, args.repeat)
@@ -0,0 +1,160 @@
+"""
+Latency benchmark for the scoring stage of the SBERT reranker.
+
+Chunks the PDFs in a documents directory (repeated with token mutations up to
+--corpus chunks, as in bench_bm25), builds the per-chunk rerank features, then
+for each candidate count reranks random candidate sets with:
+
+- legacy: the previous per-candidate path (np.linalg.norm cosine per pair,
+  substring / regex heuristics per candidate, full Python sort)
+- vectorized: one matrix-vector product over normalized embeddings, the
+  precomputed RerankFeatures, fuse_rerank_scores and argpartition top-k
+
+Encoding is not part of either path: candidates get fixed random 384-d vectors
+(the all-MiniLM-L6-v2 width), so the numbers isolate the scoring work. It also
+reports how often both paths agree on the top k; they can differ where a query
+word only occurs inside a longer word, which the token-based overlap no longer
+counts.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rerank [--docs documents] [--candidates 10,100,1000] [--queries 50]
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import types
+from pathlib import Path
+
+import numpy as np
+from langchain.schema import Document
+
+from benchmarks.bench_bm25 import grow_corpus, make_queries
+from chain import ingestion
+from chain.bm25_index import BM25Index
+from chain.metadata_index import MetadataIndex
+from chain.rerank_embeddings import normalize
+from chain.rerank_features import RerankFeatures
+
+# chain.retriever builds the production retriever at import time; the benchmark
+# only needs its scoring helpers, so give it an empty loader instead
+sys.modules.setdefault("chain.loader", types.SimpleNamespace(vectorstore=None, docs=[], bm25_index=None, persist_dir=None))
+from chain.retriever import fuse_rerank_scores, top_k_indices  # noqa: E402
+
+DIM = 384
+TOP_K = 10
+ALPHA = 0.5
+
+
+def load_docs(docs_dir: str, corpus: int):
+    """Chunks with their metadata, grown to the corpus size"""
+    pdfs = [str(p) for p in sorted(Path(docs_dir).rglob("*.pdf"))]
+    base = []
+    for _, file_chunks in ingestion.iter_file_chunks((p, Path(p).name) for p in pdfs):
+        base.extend(file_chunks or [])
+    if not base:
+        return []
+    grown = grow_corpus([c.page_content for c in base], max(corpus, len(base)))
+    return [
+        Document(page_content=d.page_content, metadata={**base[i % len(base)].metadata, "position": i})
+        for i, d in enumerate(grown)
+    ]
+
+
+def legacy_score(doc: Document, query: str) -> float:
+    """The per-document heuristic the reranker used before the precomputed features"""
+    score = 0.0
+    content = doc.page_content.lower()
+    query_lower = query.lower()
+    if query_lower in content:
+        score += 2.0
+    query_words = query_lower.split()
+    word_matches = sum(1 for word in query_words if word in content)
+    score += (word_matches / len(query_words)) * 1.5
+    if re.search(r'section\s+\d+', content):
+        score += 0.5
+    doc_type = doc.metadata.get('document_type', '')
+    if doc_type in ['criminal_code', 'procedure_code'] and any(
+        word in query_lower for word in ['criminal', 'police', 'arrest', 'bail']
+    ):
+        score += 0.8
+    return score
+
+
+def legacy_rerank(candidates, query, q_emb, doc_embs):
+    def cosine(a, b):
+        da = np.linalg.norm(a)
+        db = np.linalg.norm(b)
+        if da == 0 or db == 0:
+            return 0.0
+        return float(np.dot(a, b) / (da * db))
+
+    sem_sims = [cosine(q_emb, de) for de in doc_embs]
+    heur_scores = [legacy_score(d, query) for d in candidates]
+    min_h, max_h = min(heur_scores), max(heur_scores)
+    if max_h - min_h > 1e-6:
+        heur_norm = [(s - min_h) / (max_h - min_h) for s in heur_scores]
+    else:
+        heur_norm = [0.0 for _ in heur_scores]
+    final_scores = [(d, ALPHA * sem_sims[i] + (1.0 - ALPHA) * heur_norm[i]) for i, d in enumerate(candidates)]
+    final_scores.sort(key=lambda x: x[1], reverse=True)
+    return [d for d, _ in final_scores][:TOP_K]
+
+
+def vectorized_rerank(features, candidates, query, q_emb, doc_embs):
+    sem_sims = (doc_embs @ q_emb).astype(np.float64)
+    final_scores = fuse_rerank_scores(sem_sims, features.scores(candidates, query), ALPHA)
+    return [candidates[i] for i in top_k_indices(final_scores, TOP_K)]
+
+
+def run(docs_dir: str, corpus: int, sizes, n_queries: int):
+    docs = load_docs(docs_dir, corpus)
+    if not docs:
+        print(f"No PDF chunks found in {docs_dir}")
+        return
+    rng = np.random.default_rng(0)
+    raw_embs = rng.normal(size=(len(docs), DIM)).astype(np.float32)
+    norm_embs = normalize(raw_embs)
+
+    start = time.perf_counter()
+    features = RerankFeatures(docs, MetadataIndex(docs), BM25Index.from_documents(docs))
+    print(f"{len(docs)} chunks, features built in {time.perf_counter() - start:.2f}s, "
+          f"{n_queries} queries per size, top {TOP_K}\n")
+
+    queries = make_queries(docs, n_queries)
+    pick = random.Random(2)
+    for size in sizes:
+        legacy_ms, vector_ms, same = [], [], 0
+        for query in queries:
+            idx = pick.sample(range(len(docs)), min(size, len(docs)))
+            candidates = [docs[i] for i in idx]
+            q_raw = rng.normal(size=DIM).astype(np.float32)
+
+            start = time.perf_counter()
+            legacy = legacy_rerank(candidates, query, q_raw, raw_embs[idx])
+            legacy_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            vectorized = vectorized_rerank(features, candidates, query, normalize(q_raw)[0], norm_embs[idx])
+            vector_ms.append((time.perf_counter() - start) * 1000)
+            same += [d.metadata["position"] for d in legacy] == [d.metadata["position"] for d in vectorized]
+
+        print(f"[{size} candidates]")
+        print(f"  legacy     : {statistics.mean(legacy_ms):8.3f} ms mean")
+        print(f"  vectorized : {statistics.mean(vector_ms):8.3f} ms mean")
+        print(f"  speedup    : {statistics.mean(legacy_ms) / statistics.mean(vector_ms):.1f}x")
+        print(f"  agreement  : {same}/{len(queries)} identical top-{TOP_K}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", default=os.getenv("DOCUMENTS_DIR", "documents"))
+    parser.add_argument("--corpus", type=int, default=5000)
+    parser.add_argument("--candidates", default="10,100,1000")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    run(args.docs, args.corpus, [int(s) for s in args.candidates.split(",")], args.queries)
@@ -0,0 +1,113 @@
+"""
+CPU throughput / latency and accuracy of the reranker inference backends.
+
+Chunks the PDFs in a documents directory, samples --chunks of them and a set
+of queries cut from chunk text, then loads the reranker model once per
+backend (see chain/reranker_backends.py) and reports:
+
+- batch throughput: chunks encoded per second (the precomputation workload)
+- query latency: mean / p95 of encoding one query (the per-request workload)
+- tolerance vs torch: minimum and mean cosine between each chunk's embedding
+  and the torch backend's, and the largest change of a query-chunk
+  similarity, checked against MIN_COSINE_TO_REFERENCE / MAX_SIMILARITY_DRIFT
+
+Backends whose runtime is not installed are reported as skipped. Pin the
+thread count (e.g. OMP_NUM_THREADS=4) to compare runs across machines.
+
+Usage (from backend/):
+    python -m benchmarks.bench_reranker_backends [--docs documents] [--chunks 512] [--queries 100]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_bm25 import make_queries
+from chain import ingestion, rerank_embeddings
+from chain.reranker_backends import (
+    BACKENDS,
+    MAX_SIMILARITY_DRIFT,
+    MIN_COSINE_TO_REFERENCE,
+    load_reranker,
+)
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def load_chunks(docs_dir: str):
+    pdfs = [str(p) for p in sorted(Path(docs_dir).rglob("*.pdf"))]
+    chunks = []
+    for _, file_chunks in ingestion.iter_file_chunks((p, Path(p).name) for p in pdfs):
+        chunks.extend(file_chunks or [])
+    return chunks
+
+
+def measure(model, texts, queries):
+    # Warm up the runtime (graph optimization, thread pools) before timing
+    rerank_embeddings.encode(model, texts[:8] + queries[:8])
+
+    start = time.perf_counter()
+    chunk_embs = rerank_embeddings.encode(model, texts)
+    throughput = len(texts) / (time.perf_counter() - start)
+
+    timings = []
+    query_embs = []
+    for q in queries:
+        start = time.perf_counter()
+        query_embs.append(rerank_embeddings.encode(model, [q])[0])
+        timings.append((time.perf_counter() - start) * 1000)
+    p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+    return chunk_embs, np.stack(query_embs), throughput, statistics.mean(timings), p95
+
+
+def run(docs_dir: str, n_chunks: int, n_queries: int, onnx_file):
+    chunks = load_chunks(docs_dir)
+    if not chunks:
+        print(f"No PDF chunks found in {docs_dir}")
+        return
+    sample = random.Random(0).sample(chunks, min(n_chunks, len(chunks)))
+    texts = [rerank_embeddings.rerank_text(c) for c in sample]
+    queries = make_queries(chunks, n_queries)
+    print(f"{len(texts)} chunks, {len(queries)} queries, model {MODEL_NAME}\n")
+
+    reference = None
+    for backend in BACKENDS:
+        try:
+            model = load_reranker(MODEL_NAME, backend, onnx_file)
+        except Exception as e:
+            print(f"[{backend}] skipped: {e}\n")
+            continue
+        chunk_embs, query_embs, throughput, mean, p95 = measure(model, texts, queries)
+        print(f"[{backend}]")
+        print(f"  batch     : {throughput:8.1f} chunks/s")
+        print(f"  query     : {mean:8.2f} ms mean, {p95:8.2f} ms p95")
+
+        if backend == "torch":
+            reference = (chunk_embs, query_embs, throughput, mean)
+            print()
+            continue
+        if reference is None:
+            print("  tolerance : no torch reference\n")
+            continue
+        ref_chunks, ref_queries, ref_throughput, ref_mean = reference
+        cosines = np.sum(chunk_embs * ref_chunks, axis=1)
+        drift = np.abs(query_embs @ chunk_embs.T - ref_queries @ ref_chunks.T).max()
+        ok = cosines.min() >= MIN_COSINE_TO_REFERENCE and drift <= MAX_SIMILARITY_DRIFT
+        print(f"  vs torch  : {throughput / ref_throughput:.2f}x throughput, {ref_mean / mean:.2f}x query latency")
+        print(f"  tolerance : cosine min {cosines.min():.5f} mean {cosines.mean():.5f}, "
+              f"similarity drift {drift:.5f} -> {'within' if ok else 'OUTSIDE'} tolerance\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", default=os.getenv("DOCUMENTS_DIR", "documents"))
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--onnx-file", default=os.getenv("RERANK_ONNX_FILE"))
+    args = parser.parse_args()
+    run(args.docs, args.chunks, args.queries, args.onnx_file)
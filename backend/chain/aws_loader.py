@@ -3,17 +3,17 @@ import boto3
 import hashlib
 import json
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from langchain.schema import Document
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from botocore.exceptions import ClientError, NoCredentialsError
-import tempfile
+import time
 
 import logging
-from chain.utils import metadata_utils
+from chain import bm25_index, chunk_snapshot, embedding_cache, index_manifest, ingestion, query_embedding_cache
+from chain.embedding_pipeline import BatchedEmbeddings
+from chain.s3_object_cache import S3ObjectCache
 from config.settings import settings
 from config.secrets import secrets_manager
 
@@ -24,11 +24,15 @@ class AWSDocumentsLoader:
         self.aws_region = settings.aws_region
         self.chroma_persist_dir = settings.chroma_persist_dir
         self.cache_file = os.path.join(self.chroma_persist_dir, "aws_document_cache.json")
+        self.object_cache_dir = settings.s3_object_cache_dir or os.path.join(self.chroma_persist_dir, "s3_object_cache")
+        self.listing_file = os.path.join(self.chroma_persist_dir, "s3_listing.json")
+        self._s3_listing: Optional[List[dict]] = None
 
         # Initialize AWS clients
         try:
             self.s3_client = boto3.client('s3', region_name=self.aws_region)
             self.s3_resource = boto3.resource('s3', region_name=self.aws_region)
+            self.object_cache = S3ObjectCache(self.s3_client, self.s3_bucket, self.object_cache_dir)
             print(f"AWS S3 client initialized for bucket: {self.s3_bucket}")
         except NoCredentialsError:
             print("Error: AWS credentials not found. Please configure your AWS credentials.")
@@ -60,8 +64,24 @@ class AWSDocumentsLoader:
         
         return None
 
-    def list_s3_documents(self) -> List[dict]:
-        """List all PDF documents in the S3 bucket"""
+    def list_s3_documents(self, refresh: bool = False) -> List[dict]:
+        """
+        List all PDF documents in the S3 bucket.
+
+        The bucket is listed at most once per loader: cache validation, loading
+        and cache-metadata writing all reuse the same listing (refresh=True forces
+        a new pass). With S3_LISTING_TRUST_MINUTES > 0, a listing saved by a
+        previous run that is younger than that is used without listing at all.
+        """
+        if self._s3_listing is not None and not refresh:
+            return self._s3_listing
+
+        if not refresh:
+            trusted = self._load_trusted_listing()
+            if trusted is not None:
+                self._s3_listing = trusted
+                return trusted
+
         try:
             if not self.s3_bucket:
                 print("Error: AWS_S3_BUCKET environment variable is not set.")
@@ -92,101 +112,103 @@ class AWSDocumentsLoader:
                         continue
 
             print(f"Found {len(pdf_objects)} PDF documents in S3")
+            self._s3_listing = pdf_objects
+            self._save_listing(pdf_objects)
             return pdf_objects
         except ClientError as e:
             print(f"Error listing S3 objects: {e}")
             return []
 
-    def download_s3_document(self, s3_key: str) -> Optional[str]:
-        """Download a document from S3 to a temp file"""
+    def _load_trusted_listing(self) -> Optional[List[dict]]:
+        """Listing saved by an earlier run, if trusting it is enabled and it is fresh enough"""
+        trust_minutes = settings.s3_listing_trust_minutes
+        if trust_minutes <= 0 or not os.path.exists(self.listing_file):
+            return None
         try:
-            # Create a temporary file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            temp_path = temp_file.name
-            temp_file.close()
-
-            # Download from S3
-            self.s3_client.download_file(self.s3_bucket, s3_key, temp_path)
-            print(f"Downloaded {s3_key} to {temp_path}")
-            return temp_path
-        
-        except ClientError as e:
-            print(f"Error downloading ${s3_key}: {e}")
+            with open(self.listing_file, 'r') as f:
+                saved = json.load(f)
+            if saved.get("s3_bucket") != self.s3_bucket or saved.get("s3_prefix") != self.s3_prefix:
+                return None
+            age_minutes = (time.time() - float(saved.get("listed_at", 0))) / 60
+            if age_minutes > trust_minutes:
+                return None
+            objects = saved.get("objects") or []
+            print(f"Using S3 listing from {age_minutes:.1f} minutes ago ({len(objects)} PDF documents)")
+            return objects
+        except Exception as e:
+            print(f"Error loading saved S3 listing: {e}")
             return None
-        
-    def load_documents_from_s3(self) -> List[Document]:
-        """Load and process documents from S3"""
-        s3_objects = self.list_s3_documents()
 
-        if not s3_objects:
-            print("No documents found in S3")
-            return []
-        
-        all_docs = []
-        temp_files = []
+    def _save_listing(self, s3_objects: List[dict]):
+        try:
+            os.makedirs(self.chroma_persist_dir, exist_ok=True)
+            with open(self.listing_file + ".tmp", 'w') as f:
+                json.dump({
+                    "s3_bucket": self.s3_bucket,
+                    "s3_prefix": self.s3_prefix,
+                    "listed_at": time.time(),
+                    "objects": s3_objects
+                }, f)
+            os.replace(self.listing_file + ".tmp", self.listing_file)
+        except Exception as e:
+            print(f"Error saving S3 listing: {e}")
 
-        for s3_obj in s3_objects:
-            try:
-                s3_key = s3_obj['key']
-                print(f"Processing {s3_key}...")
+    def iter_document_chunks(self, s3_objects: List[dict]) -> Iterator[Tuple[str, List[Document]]]:
+        """
+        Stream (s3_key, chunks) one object at a time, in listing order.
+        Objects come from the local ETag-keyed cache or are downloaded concurrently,
+        and each one is parsed as soon as it has arrived.
+        """
+        fetched: Dict[str, dict] = {}
 
-                # Download document
-                temp_path = self.download_s3_document(s3_key)
-                if not temp_path:
+        def _fetched_files():
+            for s3_obj, path in self.object_cache.iter_fetched(s3_objects):
+                if not path:
                     continue
+                fetched[path] = s3_obj
+                yield path, Path(s3_obj['key']).name
 
-                temp_files.append(temp_path)
-
-                # Load PDF
-                loader = PyPDFLoader(temp_path)
-                docs = loader.load()
-
-                # Add metadata
-                for doc in docs:
-                    enhanced_metadata = metadata_utils.extract_legal_metadata(
-                        doc.page_content,
-                        Path(s3_key).name
-                    )
-                    doc.metadata.update(enhanced_metadata)
-                    doc.metadata.update({
-                        "source_file": Path(s3_key).name,
-                        "s3_key": s3_key,
-                        "s3_bucket": self.s3_bucket,
-                        "document_type": "legal_document",
-                        "size": s3_obj['size'],
-                        "last_modified": s3_obj['last_modified'],
-                        "etag": s3_obj['etag']
-                    })
-
-                all_docs.extend(docs)
-                print(f"  Loaded {len(docs)} pages from {Path(s3_key).name}")
-                
-            except Exception as e:
-                print(f"Error processing {s3_obj['key']}: {e}")
+        for path, chunks in ingestion.iter_file_chunks(_fetched_files(), sanitize=False, aggregate=False):
+            s3_obj = fetched.pop(path)
+            if chunks is None:
+                print(f"Error processing {s3_obj['key']}")
                 continue
 
-        # Clean up temporary files
-        for temp_file in temp_files:
-            try:
-                os.unlink(temp_file)
-            except OSError:
-                pass
+            s3_key = s3_obj['key']
+            for chunk in chunks:
+                chunk.metadata.update({
+                    "source_file": Path(s3_key).name,
+                    "s3_key": s3_key,
+                    "s3_bucket": self.s3_bucket,
+                    "document_type": "legal_document",
+                    "size": s3_obj['size'],
+                    "last_modified": s3_obj['last_modified'],
+                    "etag": s3_obj['etag']
+                })
 
-        if not all_docs:
-            print("Warning: No documents could be loaded successfully from S3")
+            # Give every chunk a stable ID derived from its object's ETag so later runs can re-index per file
+            index_manifest.stamp_chunk_ids(chunks, s3_key, s3_obj['etag'])
+            print(f"  Loaded {len(chunks)} chunks from {Path(s3_key).name}")
+            yield s3_key, chunks
+
+    def load_documents_from_s3(self, s3_objects: Optional[List[dict]] = None) -> List[Document]:
+        """Load and process documents from S3 (or only the given listed objects)"""
+        if s3_objects is None:
+            s3_objects = self.list_s3_documents()
+
+        if not s3_objects:
+            print("No documents found in S3")
             return []
-        
-        # Split documents into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len
-        )
 
-        print(f"Splitting {len(all_docs)} documents into chunks...")
-        chunks = text_splitter.split_documents(all_docs)
+        chunks = []
+        for _, object_chunks in self.iter_document_chunks(s3_objects):
+            chunks.extend(object_chunks)
 
-        print(f"Created {len(chunks)} chunks from {len(all_docs)} documents")
+        if not chunks:
+            print("Warning: No documents could be loaded successfully from S3")
+            return []
+
+        print(f"Created {len(chunks)} chunks from S3 documents")
         return chunks
     
     def get_s3_documents_hash(self) -> str:
@@ -200,7 +222,12 @@ class AWSDocumentsLoader:
         hash_data = []
         for obj in sorted(s3_objects, key=lambda x: x['key']):
             hash_data.append(f"{obj['key']}:{obj['etag']}:{obj['last_modified']}")
-        
+
+        # A different chunking mode yields different chunks, so it invalidates the cache
+        # (the default mode is left out to keep existing hashes valid)
+        if settings.chunking_mode != "recursive":
+            hash_data.append(f"chunking_mode:{settings.chunking_mode}")
+
         return hashlib.md5("\n".join(hash_data).encode()).hexdigest()
 
     def load_cache_metadata(self) -> dict:
@@ -232,64 +259,164 @@ class AWSDocumentsLoader:
         
         return cache_metadata.get("s3_documents_hash") == current_hash
     
-    def create_vector_store(self, docs: List[Document]):
-        """Create vector store from documents"""
+    def _openai_embeddings(self, **kwargs) -> OpenAIEmbeddings:
         openai_key = self._resolve_openai_key()
-
-        if not docs:
-            print("Warning: No documents provided to create vector store")
-            # Create a placeholder vector store
-            dummy_doc = Document(
-                page_content="No legal documents found in S3. Please upload PDF documents to the configured S3 bucket.",
-                metadata={"source_file": "placeholder", "document_type": "placeholder"}
+        if not openai_key:
+            raise RuntimeError(
+                "OpenAI API key not found. Set OPENAI_API_KEY env var or ensure secret "
+                "ai-legal-assistant-openai_api_key-<env> exists and is readable by the task role."
             )
-            if not openai_key:
-                print("No OpenAI key available — returning placeholder document without embeddings/vector store")
-                return None, [dummy_doc]
-            
-            embeddings = OpenAIEmbeddings(api_key=openai_key)
+        return OpenAIEmbeddings(api_key=openai_key, **kwargs)
 
-            os.makedirs(self.chroma_persist_dir, exist_ok=True)
-            vector_store = Chroma.from_documents(
-                documents=[dummy_doc],
-                embedding=embeddings,
-                persist_directory=self.chroma_persist_dir
-            )
-            
-            print("Created vector store with placeholder document")
-            return vector_store, [dummy_doc]
-        
-        try:
-            if not openai_key:
-                raise RuntimeError(
-                    "OpenAI API key not found. Set OPENAI_API_KEY env var or ensure secret "
-                    "ai-legal-assistant-openai_api_key-<env> exists and is readable by the task role."
-                )
-            embeddings = OpenAIEmbeddings(api_key=openai_key)
-            os.makedirs(self.chroma_persist_dir, exist_ok=True)
-            
-            vector_store = Chroma.from_documents(
-                documents=docs,
-                embedding=embeddings,
-                persist_directory=self.chroma_persist_dir
-            )
-            
-            # Save cache metadata
-            cache_metadata = {
-                "s3_documents_hash": self.get_s3_documents_hash(),
-                "document_count": len(docs),
-                "s3_bucket": self.s3_bucket,
-                "s3_prefix": self.s3_prefix,
-                "created_at": str(os.path.getctime(self.chroma_persist_dir))
-            }
-            self.save_cache_metadata(cache_metadata)
-            
-            print(f"Created and cached vector store with {len(docs)} documents from S3")
-            return vector_store, docs
-            
-        except Exception as e:
-            print(f"Error creating vector store in AWS loader: {e}")
-            raise
+    def _cached_embeddings(self):
+        # Only chunks whose text is not in the embedding cache are sent to OpenAI, in concurrent batches
+        return embedding_cache.with_embedding_cache(
+            BatchedEmbeddings(self._openai_embeddings()), self.chroma_persist_dir
+        )
+
+    def _serving_vector_store(self) -> Chroma:
+        """
+        The collection as the retriever queries it. Repeated questions reuse the
+        cached query embedding; the embedding call times out with the semantic
+        retrieval leg (and is not retried), so a call the leg has given up on does
+        not keep holding a retrieval thread.
+        """
+        timeout_ms = settings.retrieval_semantic_timeout_ms
+        limits = {"timeout": timeout_ms / 1000, "max_retries": 0} if timeout_ms > 0 else {}
+        embeddings = query_embedding_cache.with_query_cache(self._openai_embeddings(**limits))
+        return Chroma(persist_directory=self.chroma_persist_dir, embedding_function=embeddings)
+
+    def _empty_vector_store(self, embeddings) -> Chroma:
+        """Open the collection after dropping it, so a full rebuild never leaves stale chunks behind"""
+        os.makedirs(self.chroma_persist_dir, exist_ok=True)
+        Chroma(embedding_function=embeddings, persist_directory=self.chroma_persist_dir).delete_collection()
+        return Chroma(persist_directory=self.chroma_persist_dir, embedding_function=embeddings)
+
+    def _write_index(self, vector_store: Chroma, files: Iterator[Tuple[str, List[Document], bool]]) -> str:
+        """
+        Stream files into the vector store, the chunk snapshot, the BM25 index and the
+        per-file manifest, then record the cache metadata. Returns the hash the snapshot is keyed by.
+        """
+        s3_documents_hash = self.get_s3_documents_hash()
+        with chunk_snapshot.ChunkSnapshotWriter(self.chroma_persist_dir, s3_documents_hash) as snapshot, \
+                bm25_index.BM25IndexWriter(self.chroma_persist_dir, s3_documents_hash) as lexical:
+            manifest_files, upserted = ingestion.write_index(vector_store, files, [snapshot, lexical])
+        print(f"Upserted {upserted} chunks, index holds {snapshot.count} chunks")
+
+        index_manifest.save_manifest(self.chroma_persist_dir, manifest_files)
+        self.save_cache_metadata({
+            "s3_documents_hash": s3_documents_hash,
+            "document_count": snapshot.count,
+            "s3_bucket": self.s3_bucket,
+            "s3_prefix": self.s3_prefix,
+            "created_at": str(os.path.getctime(self.chroma_persist_dir))
+        })
+        return s3_documents_hash
+
+    def create_placeholder_vector_store(self):
+        """Vector store holding one placeholder document, for when the bucket has no documents to index"""
+        openai_key = self._resolve_openai_key()
+
+        print("Warning: No documents provided to create vector store")
+        dummy_doc = Document(
+            page_content="No legal documents found in S3. Please upload PDF documents to the configured S3 bucket.",
+            metadata={"source_file": "placeholder", "document_type": "placeholder"}
+        )
+        if not openai_key:
+            print("No OpenAI key available — returning placeholder document without embeddings/vector store")
+            return None, [dummy_doc]
+
+        embeddings = OpenAIEmbeddings(api_key=openai_key)
+
+        os.makedirs(self.chroma_persist_dir, exist_ok=True)
+        vector_store = Chroma.from_documents(
+            documents=[dummy_doc],
+            embedding=embeddings,
+            persist_directory=self.chroma_persist_dir
+        )
+
+        print("Created vector store with placeholder document")
+        return vector_store, [dummy_doc]
+
+    def build_vector_store(self, s3_objects: List[dict]):
+        """
+        Full build, streamed object by object (download -> parse -> extract -> chunk
+        -> embed -> upsert) so memory stays bounded regardless of bucket size.
+        Returns the vector store and the hash of the written chunk snapshot.
+        """
+        embeddings = self._cached_embeddings()
+        vector_store = self._empty_vector_store(embeddings)
+        files = ((key, chunks, True) for key, chunks in self.iter_document_chunks(s3_objects))
+        s3_documents_hash = self._write_index(vector_store, files)
+        embeddings.report()
+        self.object_cache.report()
+        self.object_cache.prune(s3_objects)
+        return vector_store, s3_documents_hash
+
+    def update_vector_store(self, manifest_files: Dict[str, Dict]):
+        """
+        Re-index only the objects that were added, modified or removed since the last build.
+        Chunks of unchanged objects are reused from the chunk snapshot, so they are
+        neither downloaded nor re-embedded.
+        """
+        s3_objects = self.list_s3_documents()
+        if not s3_objects:
+            raise RuntimeError("No documents found in S3 to re-index")
+
+        current_hashes = {obj['key']: obj['etag'] for obj in s3_objects}
+        changes = index_manifest.plan_changes(manifest_files, current_hashes)
+        print(
+            f"Incremental re-index: {len(changes['added'])} added, {len(changes['modified'])} modified, "
+            f"{len(changes['removed'])} removed, {len(changes['unchanged'])} unchanged"
+        )
+
+        # Unchanged files' chunks are read from the previous snapshot as the new one reaches them
+        reused = index_manifest.ReusedChunks(self.chroma_persist_dir, manifest_files, changes["unchanged"])
+
+        embeddings = self._cached_embeddings()
+        vector_store = Chroma(
+            persist_directory=self.chroma_persist_dir,
+            embedding_function=embeddings
+        )
+
+        stale_ids = []
+        for key in changes["modified"] + changes["removed"]:
+            stale_ids.extend(manifest_files[key].get("chunk_ids") or [])
+        if stale_ids:
+            vector_store.delete(ids=stale_ids)
+            print(f"Deleted {len(stale_ids)} stale chunks")
+
+        changed = set(changes["added"] + changes["modified"])
+        changed_objects = [obj for obj in s3_objects if obj['key'] in changed]
+        new_objects = self.iter_document_chunks(changed_objects)
+
+        def _files():
+            # Interleave reused and freshly chunked objects so the snapshot stays in listing order
+            pending = next(new_objects, None)
+            for obj in s3_objects:
+                key = obj['key']
+                if key in reused:
+                    yield key, reused.take(key), False
+                elif pending is not None and pending[0] == key:
+                    yield key, pending[1], True
+                    pending = next(new_objects, None)
+
+        with reused:
+            s3_documents_hash = self._write_index(vector_store, _files())
+        embeddings.report()
+        self.object_cache.report()
+        self.object_cache.prune(s3_objects)
+
+        docs = chunk_snapshot.load_chunk_snapshot(self.chroma_persist_dir, s3_documents_hash, compact=True)
+        if docs is None:
+            raise RuntimeError("Chunk snapshot could not be read back after re-indexing")
+        print(f"Re-indexed vector store now holds {len(docs)} chunks from S3")
+        return self._serving_vector_store(), docs
+
+    def load_bm25_index(self, docs: List[Document]) -> Optional[bm25_index.BM25Index]:
+        """Memory-map the persisted BM25 index for the chunk list returned by get_or_create_vector_store"""
+        s3_documents_hash = self.load_cache_metadata().get("s3_documents_hash")
+        return bm25_index.load_or_build(self.chroma_persist_dir, s3_documents_hash, docs)
 
     def get_or_create_vector_store(self):
         """Get existing vector store or create new one from S3"""
@@ -297,28 +424,48 @@ class AWSDocumentsLoader:
         # Check if we can load from cache
         if self.is_cache_valid():
             try:
-                openai_key = self._resolve_openai_key()
                 print("Loading vector store from cache...")
-                embeddings = OpenAIEmbeddings(api_key=openai_key)
-                vector_store = Chroma(
-                    persist_directory=self.chroma_persist_dir,
-                    embedding_function=embeddings
-                )
+                vector_store = self._serving_vector_store()
                 
                 cache_metadata = self.load_cache_metadata()
                 print(f"Loaded cached vector store with {cache_metadata.get('document_count', 'unknown')} documents")
 
-                # Reload docs for the retriever
-                docs = self.load_documents_from_s3()
+                # Read the chunk list for the retriever from the snapshot; only
+                # download and re-parse the bucket if the snapshot is missing or stale
+                s3_documents_hash = cache_metadata.get("s3_documents_hash")
+                docs = chunk_snapshot.load_chunk_snapshot(self.chroma_persist_dir, s3_documents_hash, compact=True)
+                if docs is None:
+                    print("No usable chunk snapshot, reloading documents from S3 for the retriever...")
+                    docs = self.load_documents_from_s3()
+                    chunk_snapshot.save_chunk_snapshot(self.chroma_persist_dir, s3_documents_hash, docs)
                 return vector_store, docs
                 
             except Exception as e:
                 print(f"Error loading from cache: {e}")
                 print("Creating new vector store from S3...")
         
+        # Re-index only the changed objects if a previous build left a manifest behind
+        manifest_files = index_manifest.load_manifest(self.chroma_persist_dir)
+        if manifest_files:
+            try:
+                return self.update_vector_store(manifest_files)
+            except Exception as e:
+                print(f"Incremental re-index failed: {e}")
+
         # Create new vector store from S3
         print("Loading documents from S3 and creating vector store...")
-        docs = self.load_documents_from_s3()
-        vector_store, docs = self.create_vector_store(docs)
-        
-        return vector_store, docs
\ No newline at end of file
+        s3_objects = self.list_s3_documents()
+        if not s3_objects:
+            print("No documents found in S3")
+            return self.create_placeholder_vector_store()
+
+        _, s3_documents_hash = self.build_vector_store(s3_objects)
+        # The retriever needs the whole chunk list; read it back from the snapshot
+        # written during the build rather than holding it through ingestion
+        docs = chunk_snapshot.load_chunk_snapshot(self.chroma_persist_dir, s3_documents_hash, compact=True)
+        if not docs:
+            print("Warning: No documents could be loaded successfully from S3")
+            return self.create_placeholder_vector_store()
+
+        print(f"Created and cached vector store with {len(docs)} documents from S3")
+        return self._serving_vector_store(), docs
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+Persisted BM25 index for the lexical leg of the hybrid retriever.
+
+The index is built once at ingestion, from the same chunks (and in the same
+order) as the chunk snapshot, and stored next to the Chroma store keyed by the
+same document hash. The retriever memory-maps it instead of re-tokenizing the
+whole corpus on every process start, so startup does not grow with corpus size
+and every worker on a host shares the same page-cache pages.
+
+Tokenization and IDF reproduce rank_bm25's BM25Okapi (k1=1.5, b=0.75,
+epsilon=0.25) over whitespace tokens, which is what BM25Retriever used. The
+postings are laid out as a CSR term x chunk matrix of term frequencies
+(postings_ptr / postings_doc / postings_tf = indptr / indices / data) that
+chain.retriever.SparseBM25Retriever scores directly.
+
+Layout (<persist_dir>/bm25_index/):
+    meta.json         -> {"version", "doc_hash", "doc_count", "term_count", "avgdl", "k1", "b", "epsilon"}
+    terms.npy         -> uint8, UTF-8 terms sorted bytewise and concatenated
+    term_offsets.npy  -> int64 [term_count + 1], term i is terms[off[i]:off[i+1]]
+    idf.npy           -> float64 [term_count]
+    postings_ptr.npy  -> int64 [term_count + 1], postings of term i are [ptr[i]:ptr[i+1]]
+    postings_doc.npy  -> int32, chunk position in the snapshot (ascending per term)
+    postings_tf.npy   -> uint32, term frequency in that chunk
+    doc_len.npy       -> int64 [doc_count], tokens per chunk
+"""
+
+import bisect
+import json
+import math
+import os
+import shutil
+from array import array
+from collections import Counter
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_community.retrievers.bm25 import default_preprocessing_func
+from langchain.schema import Document
+
+INDEX_VERSION = 1
+INDEX_DIRNAME = "bm25_index"
+
+# rank_bm25.BM25Okapi defaults, as used by BM25Retriever.from_documents
+K1 = 1.5
+B = 0.75
+EPSILON = 0.25
+
+_ARRAYS = ("terms", "term_offsets", "idf", "postings_ptr", "postings_doc", "postings_tf", "doc_len")
+
+
+def index_dir(persist_dir: str) -> str:
+    return os.path.join(persist_dir, INDEX_DIRNAME)
+
+
+class BM25IndexWriter:
+    """
+    Streaming index builder with the same interface as ChunkSnapshotWriter:
+    chunks are tokenized as they are written and the index is only moved into
+    place when the context exits cleanly.
+    """
+
+    def __init__(self, persist_dir: str, doc_hash: str):
+        self.persist_dir = persist_dir
+        self.doc_hash = doc_hash
+        self.count = 0
+        self.committed = False
+        self._vocab = {}
+        self._term_ids = array("q")
+        self._doc_ids = array("q")
+        self._tfs = array("q")
+        self._doc_len = array("q")
+
+    def __enter__(self):
+        return self
+
+    def write(self, docs: Iterable[Document]):
+        vocab = self._vocab
+        for d in docs:
+            tokens = default_preprocessing_func(d.page_content or "")
+            self._doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self._term_ids.append(vocab.setdefault(term, len(vocab)))
+                self._doc_ids.append(self.count)
+                self._tfs.append(tf)
+            self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            return False
+        if not self.count:
+            print("No chunks to index, skipping BM25 index")
+            return False
+        try:
+            self._save()
+            self.committed = True
+            print(f"Saved BM25 index with {self.count} chunks and {len(self._vocab)} terms to {index_dir(self.persist_dir)}")
+        except Exception as e:
+            print(f"Error saving BM25 index: {e}")
+        return False
+
+    def _idf(self, doc_freq: np.ndarray) -> np.ndarray:
+        # Same arithmetic and summation order as BM25Okapi._calc_idf, so scores match bit for bit
+        n = self.count
+        idf = np.array([math.log(n - df + 0.5) - math.log(df + 0.5) for df in doc_freq.tolist()], dtype=np.float64)
+        average_idf = float(np.cumsum(idf)[-1]) / len(idf) if len(idf) else 0.0
+        idf[idf < 0] = EPSILON * average_idf
+        return idf
+
+    def build(self) -> Tuple[dict, dict]:
+        """Return (arrays, meta) for the chunks written so far"""
+        term_count = len(self._vocab)
+        term_ids = np.frombuffer(self._term_ids, dtype=np.int64)
+        doc_ids = np.frombuffer(self._doc_ids, dtype=np.int64)
+        tfs = np.frombuffer(self._tfs, dtype=np.int64)
+        doc_len = np.frombuffer(self._doc_len, dtype=np.int64)
+
+        # Vocabulary is in first-seen order (like rank_bm25's); IDF is computed in that
+        # order, then terms are sorted bytewise so lookups can binary-search the mmap
+        doc_freq = np.bincount(term_ids, minlength=term_count)
+        idf = self._idf(doc_freq)
+        encoded = [t.encode("utf-8") for t in self._vocab]
+        order = sorted(range(term_count), key=encoded.__getitem__)
+        rank = np.empty(term_count, dtype=np.int64)
+        rank[order] = np.arange(term_count)
+
+        sorted_terms = [encoded[i] for i in order]
+        term_offsets = np.zeros(term_count + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in sorted_terms], out=term_offsets[1:])
+        postings_order = np.argsort(rank[term_ids], kind="stable")
+        postings_ptr = np.zeros(term_count + 1, dtype=np.int64)
+        np.cumsum(doc_freq[order], out=postings_ptr[1:])
+
+        arrays = {
+            "terms": np.frombuffer(b"".join(sorted_terms), dtype=np.uint8),
+            "term_offsets": term_offsets,
+            "idf": idf[order],
+            "postings_ptr": postings_ptr,
+            "postings_doc": doc_ids[postings_order].astype(np.int32),
+            "postings_tf": tfs[postings_order].astype(np.uint32),
+            "doc_len": doc_len,
+        }
+        meta = {
+            "version": INDEX_VERSION,
+            "doc_hash": self.doc_hash,
+            "doc_count": self.count,
+            "term_count": term_count,
+            "avgdl": int(doc_len.sum()) / self.count,
+            "k1": K1,
+            "b": B,
+            "epsilon": EPSILON,
+        }
+        return arrays, meta
+
+    def _save(self):
+        arrays, meta = self.build()
+        final_dir = index_dir(self.persist_dir)
+        tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            for name, values in arrays.items():
+                np.save(os.path.join(tmp_dir, name + ".npy"), values)
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump(meta, f)
+
+            # Swap directories; processes that already mapped the old index keep reading its (unlinked) files
+            old_dir = f"{final_dir}.old-{os.getpid()}"
+            if os.path.exists(final_dir):
+                os.replace(final_dir, old_dir)
+            os.replace(tmp_dir, final_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+
+def save_bm25_index(persist_dir: str, doc_hash: str, docs: List[Document]) -> bool:
+    """Build and write the index for an in-memory chunk list"""
+    with BM25IndexWriter(persist_dir, doc_hash) as writer:
+        writer.write(docs)
+    return writer.committed
+
+
+class _SortedTerms:
+    """Sequence view over the mmapped vocabulary so bisect can search it without loading it"""
+
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray):
+        self._terms = terms
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self._terms[self._offsets[i]:self._offsets[i + 1]].tobytes()
+
+
+class BM25Index:
+    """Read-only BM25 index, memory-mapped from disk or built in memory"""
+
+    def __init__(self, path: Optional[str], meta: dict, arrays: dict):
+        self.path = path
+        self.doc_hash = meta["doc_hash"]
+        self.doc_count = int(meta["doc_count"])
+        self.avgdl = float(meta["avgdl"])
+        self.k1 = float(meta["k1"])
+        self.b = float(meta["b"])
+        self.idf = arrays["idf"]
+        self.postings_ptr = arrays["postings_ptr"]
+        self.postings_doc = arrays["postings_doc"]
+        self.postings_tf = arrays["postings_tf"]
+        self.doc_len = arrays["doc_len"]
+        self._terms = _SortedTerms(arrays["terms"], arrays["term_offsets"])
+
+    @classmethod
+    def load(cls, persist_dir: str, doc_hash: Optional[str], doc_count: int) -> Optional["BM25Index"]:
+        """
+        Memory-map the index if it was built for doc_hash over doc_count chunks.
+        Returns None when it is missing, stale or unreadable.
+        """
+        path = index_dir(persist_dir)
+        meta_path = os.path.join(path, "meta.json")
+        if not doc_hash or not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if meta.get("version") != INDEX_VERSION:
+                print(f"BM25 index version {meta.get('version')} is not supported, ignoring it")
+                return None
+            if meta.get("doc_hash") != doc_hash or meta.get("doc_count") != doc_count:
+                print("BM25 index is stale (document hash or chunk count changed), ignoring it")
+                return None
+            arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in _ARRAYS}
+            index = cls(path, meta, arrays)
+            print(f"Memory-mapped BM25 index with {index.doc_count} chunks from {path}")
+            return index
+        except Exception as e:
+            print(f"Error loading BM25 index: {e}")
+            return None
+
+    @classmethod
+    def from_documents(cls, docs: List[Document]) -> "BM25Index":
+        """Build an index in memory, for chunk lists that have no persisted index"""
+        writer = BM25IndexWriter(None, None)
+        writer.write(docs)
+        arrays, meta = writer.build()
+        return cls(None, meta, arrays)
+
+    def terms(self) -> Iterator[str]:
+        """Vocabulary in term id order"""
+        for i in range(len(self._terms)):
+            yield self._terms[i].decode("utf-8")
+
+    def term_id(self, term: str) -> Optional[int]:
+        key = term.encode("utf-8")
+        i = bisect.bisect_left(self._terms, key)
+        if i < len(self._terms) and self._terms[i] == key:
+            return i
+        return None
+
+
+def load_or_build(persist_dir: str, doc_hash: Optional[str], docs: List[Document]) -> Optional[BM25Index]:
+    """
+    Memory-map the index for the loader's chunk list, building and persisting it
+    first if it is missing or stale (e.g. a cache written before the index existed).
+    """
+    if not doc_hash or not docs:
+        return None
+    index = BM25Index.load(persist_dir, doc_hash, len(docs))
+    if index is None and save_bm25_index(persist_dir, doc_hash, docs):
+        index = BM25Index.load(persist_dir, doc_hash, len(docs))
+    return index
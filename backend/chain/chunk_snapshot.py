@@ -0,0 +1,205 @@
+"""
+On-disk snapshot of the final chunk list produced by the loaders.
+
+The snapshot lives next to the Chroma store and is keyed by the same document
+hash the loaders already use for cache validation. When the cache is valid the
+loaders read the chunks (text + structured metadata) straight from here instead
+of re-parsing every PDF, re-running metadata extraction and re-splitting.
+
+Format (gzip-compressed JSON Lines):
+    line 1   -> header {"version", "doc_hash", "created_at"}
+    line 2.. -> one chunk per line {"page_content", "metadata"}
+    last     -> trailer {"chunk_count"}
+
+The chunk count lives in a trailer so the snapshot can be written while chunks
+are still streaming out of the ingestion pipeline.
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import IO, Iterable, Iterator, List, Optional, Union
+
+from langchain.schema import Document
+
+from chain.chunk_store import ChunkStore, ChunkStoreBuilder
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_FILENAME = "chunk_snapshot.jsonl.gz"
+
+
+def snapshot_path(persist_dir: str) -> str:
+    """Location of the chunk snapshot for a given Chroma persist directory"""
+    return os.path.join(persist_dir, SNAPSHOT_FILENAME)
+
+
+class ChunkSnapshotWriter:
+    """
+    Streaming snapshot writer. Chunks are appended as they are produced; the file
+    is written to a temp path and only renamed into place when the context exits
+    cleanly, so a crash never leaves a half-written snapshot that looks valid.
+    """
+
+    def __init__(self, persist_dir: str, doc_hash: str):
+        self.persist_dir = persist_dir
+        self.path = snapshot_path(persist_dir)
+        self.tmp_path = self.path + ".tmp"
+        self.doc_hash = doc_hash
+        self.count = 0
+        self.committed = False
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(self.persist_dir, exist_ok=True)
+        self._file = gzip.open(self.tmp_path, "wt", encoding="utf-8")
+        header = {
+            "version": SNAPSHOT_VERSION,
+            "doc_hash": self.doc_hash,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        self._file.write(json.dumps(header) + "\n")
+        return self
+
+    def write(self, docs: Iterable[Document]):
+        for d in docs:
+            record = {"page_content": d.page_content, "metadata": d.metadata or {}}
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._file.write(json.dumps({"chunk_count": self.count}) + "\n")
+            self._file.close()
+            if exc_type is None:
+                os.replace(self.tmp_path, self.path)
+                self.committed = True
+                print(f"Saved chunk snapshot with {self.count} chunks to {self.path}")
+                return False
+        except Exception as e:
+            print(f"Error saving chunk snapshot: {e}")
+        try:
+            os.unlink(self.tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def save_chunk_snapshot(persist_dir: str, doc_hash: str, docs: List[Document]) -> bool:
+    """Write an in-memory chunk list to disk keyed by doc_hash"""
+    try:
+        with ChunkSnapshotWriter(persist_dir, doc_hash) as writer:
+            writer.write(docs)
+        return writer.committed
+    except Exception as e:
+        print(f"Error saving chunk snapshot: {e}")
+        return False
+
+
+class TruncatedSnapshotError(Exception):
+    """The snapshot ends before the chunk count its trailer records"""
+
+
+def _open_snapshot(persist_dir: str, doc_hash: Optional[str], any_hash: bool) -> Optional[IO[str]]:
+    """The snapshot opened just past a header matching doc_hash (any header with any_hash=True), or None"""
+    path = snapshot_path(persist_dir)
+    if (not doc_hash and not any_hash) or not os.path.exists(path):
+        return None
+
+    f = gzip.open(path, "rt", encoding="utf-8")
+    try:
+        header = json.loads(f.readline() or "{}")
+        if header.get("version") != SNAPSHOT_VERSION:
+            print(f"Chunk snapshot version {header.get('version')} is not supported, ignoring it")
+        elif not any_hash and header.get("doc_hash") != doc_hash:
+            print("Chunk snapshot is stale (document hash changed), ignoring it")
+        else:
+            return f
+    except Exception:
+        f.close()
+        raise
+    f.close()
+    return None
+
+
+def _records(f: IO[str]) -> Iterator[dict]:
+    """Chunk records up to the trailer; raises TruncatedSnapshotError if they fall short of its count"""
+    count = 0
+    chunk_count = None
+    for line in f:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "page_content" not in record:
+            chunk_count = record.get("chunk_count")
+            break
+        yield record
+        count += 1
+    if count != chunk_count:
+        raise TruncatedSnapshotError(f"Chunk snapshot is truncated ({count}/{chunk_count} chunks)")
+
+
+def load_chunk_snapshot(
+    persist_dir: str,
+    doc_hash: Optional[str],
+    any_hash: bool = False,
+    compact: bool = False
+) -> Optional[Union[List[Document], ChunkStore]]:
+    """
+    Load the chunk list if a snapshot for doc_hash exists.
+    Returns None when the snapshot is missing, stale, from another format
+    version or unreadable, so callers can fall back to a full load.
+    any_hash=True skips the hash check.
+    compact=True streams the chunks into a ChunkStore instead of Documents.
+    """
+    try:
+        f = _open_snapshot(persist_dir, doc_hash, any_hash)
+        if f is None:
+            return None
+        docs = []
+        builder = ChunkStoreBuilder() if compact else None
+        with f:
+            for record in _records(f):
+                if builder is not None:
+                    builder.add(record["page_content"], record.get("metadata"))
+                else:
+                    docs.append(Document(page_content=record["page_content"], metadata=record.get("metadata") or {}))
+    except TruncatedSnapshotError as e:
+        print(f"{e}, ignoring it")
+        return None
+    except Exception as e:
+        print(f"Error loading chunk snapshot: {e}")
+        return None
+
+    result = builder.build() if builder is not None else docs
+    print(f"Loaded {len(result)} chunks from snapshot {snapshot_path(persist_dir)}")
+    return result
+
+
+def iter_chunk_snapshot(persist_dir: str, doc_hash: Optional[str], any_hash: bool = False) -> Optional[Iterator[Document]]:
+    """
+    Stream the snapshot one Document at a time, with the same checks as
+    load_chunk_snapshot (used by incremental re-indexing, which reads the
+    previous snapshot while the new one is written). Returns None when there
+    is no usable snapshot; a truncated one raises TruncatedSnapshotError at its end.
+    The file is only opened once iteration starts.
+    """
+    try:
+        f = _open_snapshot(persist_dir, doc_hash, any_hash)
+    except Exception as e:
+        print(f"Error loading chunk snapshot: {e}")
+        return None
+    if f is None:
+        return None
+    f.close()
+
+    def _documents() -> Iterator[Document]:
+        f = _open_snapshot(persist_dir, doc_hash, any_hash)
+        if f is None:
+            raise RuntimeError("Chunk snapshot changed while it was being read")
+        with f:
+            for record in _records(f):
+                yield Document(page_content=record["page_content"], metadata=record.get("metadata") or {})
+
+    return _documents()
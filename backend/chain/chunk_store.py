@@ -0,0 +1,235 @@
+"""
+Compact in-memory store for the loaded chunk list.
+
+The retriever keeps every chunk of the corpus in memory. As Document objects
+each chunk carried its own metadata dict, including a private copy of its
+file's aggregated_extracted_sections_norm / aggregated_extracted_acts_norm
+(the union over the whole PDF, often hundreds of entries), so a large act
+cost hundreds of MB of duplicated lists and strings per worker.
+ChunkStore keeps the same chunks column-wise:
+
+- text: one contiguous UTF-8 buffer plus an offsets array
+- per-file fields (FILE_FIELDS: source, aggregated lists, ...): one record per
+  file, referenced from each chunk by file ID
+- every other metadata key: an array of value IDs per key, into a table of
+  the distinct values of that key (chunks of one page share their page's
+  extracted_* lists); strings are interned, so section and act tokens are
+  stored once across tables
+
+Positions are the same as in the chunk list it was built from. Iterating the
+store yields ChunkView records (page_content / metadata like a Document, read
+in place) for the indexes built over all chunks at startup; store[i] creates a
+Document, which is how retrieval results leave the store.
+"""
+
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain.schema import Document
+
+# Metadata that is the same on every chunk of a source file
+FILE_FIELDS = (
+    "source",
+    "source_file",
+    "filename_norm",
+    "aggregated_extracted_sections_norm",
+    "aggregated_extracted_acts_norm",
+)
+
+
+def _freeze(value: Any):
+    """Hashable key identifying a metadata value by content"""
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(v) for v in value))
+    if isinstance(value, dict):
+        return ("dict", tuple((k, _freeze(v)) for k, v in value.items()))
+    try:
+        hash(value)
+    except TypeError:
+        return ("repr", repr(value))
+    return (type(value).__name__, value)
+
+
+def _intern(value: Any) -> Any:
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [_intern(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_intern(v) for v in value)
+    if isinstance(value, dict):
+        return {_intern(k) if isinstance(k, str) else k: _intern(v) for k, v in value.items()}
+    return value
+
+
+def _copy_metadata(meta: Dict) -> Dict:
+    """Metadata for a Document handed out of the store; lists are copied so callers cannot alter the shared values"""
+    return {k: (list(v) if isinstance(v, list) else dict(v) if isinstance(v, dict) else v) for k, v in meta.items()}
+
+
+class ChunkView:
+    """
+    One stored chunk read in place, with page_content and metadata like a
+    Document. The metadata values are shared with the store: read them only.
+    """
+
+    __slots__ = ("store", "position", "_page_content", "_metadata")
+
+    def __init__(self, store: "ChunkStore", position: int):
+        self.store = store
+        self.position = position
+        self._page_content: Optional[str] = None
+        self._metadata: Optional[Dict] = None
+
+    @property
+    def page_content(self) -> str:
+        if self._page_content is None:
+            self._page_content = self.store.text(self.position)
+        return self._page_content
+
+    @property
+    def metadata(self) -> Dict:
+        if self._metadata is None:
+            self._metadata = self.store.metadata(self.position)
+        return self._metadata
+
+    def to_document(self) -> Document:
+        return self.store[self.position]
+
+
+class ChunkStoreBuilder:
+    """Appends chunks one at a time (e.g. while streaming the chunk snapshot) and builds the store"""
+
+    def __init__(self):
+        self._text = bytearray()
+        self._offsets = array("q", [0])
+        self._file_ids = array("i")
+        self._files: List[Dict] = []
+        self._file_lookup: Dict = {}
+        self._columns: Dict[str, array] = {}
+        self._values: Dict[str, List] = {}
+        self._value_lookup: Dict[str, Dict] = {}
+        self._count = 0
+
+    def add(self, page_content: str, metadata: Optional[Dict]):
+        metadata = metadata or {}
+        self._text += (page_content or "").encode("utf-8")
+        self._offsets.append(len(self._text))
+
+        file_meta = {k: metadata[k] for k in FILE_FIELDS if k in metadata}
+        key = _freeze(file_meta)
+        file_id = self._file_lookup.get(key)
+        if file_id is None:
+            file_id = self._file_lookup[key] = len(self._files)
+            self._files.append(_intern(file_meta))
+        self._file_ids.append(file_id)
+
+        for name, value in metadata.items():
+            if name in FILE_FIELDS:
+                continue
+            column = self._columns.get(name)
+            if column is None:
+                column = self._columns[name] = array("i", [-1]) * self._count
+                self._values[name] = []
+                self._value_lookup[name] = {}
+            lookup = self._value_lookup[name]
+            key = _freeze(value)
+            value_id = lookup.get(key)
+            if value_id is None:
+                value_id = lookup[key] = len(self._values[name])
+                self._values[name].append(_intern(value))
+            column.append(value_id)
+
+        self._count += 1
+        for column in self._columns.values():
+            if len(column) < self._count:
+                column.append(-1)
+
+    def extend(self, docs: Iterable[Document]) -> "ChunkStoreBuilder":
+        for d in docs:
+            self.add(d.page_content, d.metadata)
+        return self
+
+    def build(self) -> "ChunkStore":
+        return ChunkStore(
+            bytes(self._text),
+            self._offsets,
+            self._file_ids,
+            self._files,
+            {name: (column, self._values[name]) for name, column in self._columns.items()},
+        )
+
+
+class ChunkStore:
+    """Read-only sequence of chunks in load order; store[i] is a Document, iteration yields ChunkViews"""
+
+    def __init__(
+        self,
+        text: bytes,
+        offsets: array,
+        file_ids: array,
+        files: List[Dict],
+        columns: Dict[str, Tuple[array, List]],
+    ):
+        self._text = text
+        self._offsets = offsets
+        self._file_ids = file_ids
+        self._files = files
+        self._columns = columns
+
+    @classmethod
+    def from_documents(cls, docs: Iterable[Document]) -> "ChunkStore":
+        if isinstance(docs, ChunkStore):
+            return docs
+        return ChunkStoreBuilder().extend(docs).build()
+
+    def __len__(self) -> int:
+        return len(self._file_ids)
+
+    def _position(self, i: int) -> int:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("chunk position out of range")
+        return i
+
+    def text(self, i: int) -> str:
+        i = self._position(i)
+        return self._text[self._offsets[i]:self._offsets[i + 1]].decode("utf-8")
+
+    def metadata(self, i: int) -> Dict:
+        """Metadata of chunk i; the values are shared with the store"""
+        i = self._position(i)
+        meta = dict(self._files[self._file_ids[i]])
+        for name, (ids, values) in self._columns.items():
+            value_id = ids[i]
+            if value_id >= 0:
+                meta[name] = values[value_id]
+        return meta
+
+    def file_id(self, i: int) -> int:
+        return self._file_ids[self._position(i)]
+
+    def file_metadata(self, i: int) -> Dict:
+        """FILE_FIELDS of chunk i's file (source, source_file, ...); shared with the store"""
+        return self._files[self._file_ids[self._position(i)]]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return Document(page_content=self.text(i), metadata=_copy_metadata(self.metadata(i)))
+
+    def __iter__(self) -> Iterator[ChunkView]:
+        for i in range(len(self)):
+            yield ChunkView(self, i)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "chunks": len(self),
+            "files": len(self._files),
+            "text_bytes": len(self._text),
+            "metadata_columns": len(self._columns),
+            "distinct_values": sum(len(values) for _, values in self._columns.values()),
+        }
@@ -0,0 +1,170 @@
+"""
+Exact-citation index: (act, section) -> the chunks of that section.
+
+Queries like "Section 302 IPC" or "CrPC 154" name the provision they want,
+yet they used to go through hybrid retrieval, filtering and the SBERT rerank
+like any other question. The index resolves them directly instead:
+
+- act: every source file is one statute; its act is the act most often
+  listed in its chunks' extracted_acts_norm (e.g. indian_penal_code_1860)
+- sections of a chunk: chunk_sections_norm when the file was chunked per
+  section (CHUNKING_MODE=section); otherwise the section headers that start
+  in the chunk, plus the section it continues from the previous chunk of the
+  same file when it does not start with a header
+
+Within a section, chunks in which the section's header appears come first,
+chunks covering fewer sections before those covering many (so a table of
+contents listing the section ranks after its body), then file order.
+
+A query resolves when it names an act (QueryProcessor's acts, or "ipc" /
+"crpc" in the query) and every section it cites (at most MAX_CITED_SECTIONS)
+belongs to exactly one indexed act among those it names. Anything else,
+including a bare "section 25" or "article 21", returns None and takes the
+normal retrieval path.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+from chain.metadata_index import to_list
+from chain.section_index import section_token, source_of
+from chain.utils.metadata_utils import find_section_headers
+
+MAX_CITED_SECTIONS = 3
+
+# "section 302", "sec. 302", "s. 154", "u/s 498a", "ipc 302", "302 ipc", "crpc 154"
+_CITATION_RES = [
+    re.compile(r'\b(?:section|sec\.?|s\.|u/s\.?)\s*(\d{1,4}[a-z]{0,3})\b'),
+    re.compile(r'\b(?:ipc|crpc)\s+(\d{1,4}[a-z]{0,3})\b'),
+    re.compile(r'\b(\d{1,4}[a-z]{0,3})\s+(?:of\s+(?:the\s+)?)?(?:ipc|crpc)\b'),
+]
+
+
+# Act abbreviations that name an act on their own, as act key fragments
+_ACT_ABBREVIATIONS = {
+    re.compile(r'\bipc\b'): 'indian_penal_code',
+    re.compile(r'\bcrpc\b'): 'code_of_criminal_procedure',
+}
+
+
+def act_key(act: str) -> str:
+    """Act name as compared between queries and chunks, e.g. 'Indian Penal Code, 1860' -> indian_penal_code_1860"""
+    return re.sub(r'[^a-z0-9]+', '_', str(act).lower()).strip('_')
+
+
+def cited_sections(query: str, query_analysis: Optional[Dict] = None) -> List[str]:
+    """Normalized section numbers cited in the query, in order of appearance"""
+    found = list((query_analysis or {}).get('sections') or [])
+    query_lower = (query or "").lower()
+    for pattern in _CITATION_RES:
+        found.extend(pattern.findall(query_lower))
+    return [t for t in dict.fromkeys(section_token(s) for s in found) if t]
+
+
+def named_acts(query: str, query_analysis: Optional[Dict] = None) -> List[str]:
+    """Acts the query names explicitly: QueryProcessor's acts plus the ipc / crpc abbreviations"""
+    named = list((query_analysis or {}).get('acts') or [])
+    query_lower = (query or "").lower()
+    named.extend(key for pattern, key in _ACT_ABBREVIATIONS.items() if pattern.search(query_lower))
+    return named
+
+
+def _chunk_sections(doc: Document, carry: Optional[str]) -> Tuple[List[str], List[str]]:
+    """(sections whose header starts in the chunk, every section the chunk covers)"""
+    listed = doc.metadata.get("chunk_sections_norm")
+    if listed is not None:
+        headed = [section_token(s) for s in to_list(listed)]
+        return headed, headed
+
+    text = doc.page_content or ""
+    headers = find_section_headers(text)
+    headed = [section_token(sec) for _, sec in headers]
+    covered = list(headed)
+    if carry and (not headers or text[:headers[0][0]].strip()):
+        covered.insert(0, carry)
+    return headed, covered
+
+
+class CitationIndex:
+    """(act key, normalized section) -> ranked positions of the section's chunks"""
+
+    def __init__(self, documents: List[Document]):
+        self.documents = documents
+
+        acts_by_file: Dict[Optional[str], Counter] = {}
+        for d in documents:
+            acts_by_file.setdefault(source_of(d), Counter()).update(
+                act_key(a) for a in to_list(d.metadata.get("extracted_acts_norm") or d.metadata.get("extracted_acts") or [])
+            )
+        self.file_acts: Dict[Optional[str], str] = {
+            src: counts.most_common(1)[0][0] for src, counts in acts_by_file.items() if counts
+        }
+
+        ranked: Dict[Tuple[str, str], List[Tuple[int, int, int]]] = {}
+        carry: Dict[Optional[str], Optional[str]] = {}
+        for pos, d in enumerate(self.documents):
+            src = source_of(d)
+            headed, covered = _chunk_sections(d, carry.get(src))
+            if covered:
+                carry[src] = covered[-1]
+            act = self.file_acts.get(src)
+            if act is None:
+                continue
+            for sec in dict.fromkeys(covered):
+                if sec:
+                    ranked.setdefault((act, sec), []).append((0 if sec in headed else 1, len(covered), pos))
+        self._sections: Dict[Tuple[str, str], List[int]] = {
+            key: [pos for _, _, pos in sorted(entries)] for key, entries in ranked.items()
+        }
+        self.acts = sorted(set(self.file_acts.values()))
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def acts_matching(self, names) -> List[str]:
+        """Indexed acts named by any of the given act names or keys (indian_penal_code -> indian_penal_code_1860)"""
+        keys = {act_key(n) for n in names}
+        return [a for a in self.acts if any(k and k in a for k in keys)]
+
+    def sections(self):
+        """((act, section), ranked chunk positions) of every indexed section"""
+        return self._sections.items()
+
+    def section_chunks(self, act: str, section) -> List[int]:
+        """Ranked positions of the chunks of one section"""
+        return self._sections.get((act, section_token(section)), [])
+
+    def resolve(self, query: str, query_analysis: Optional[Dict] = None) -> Optional[List[Tuple[str, str]]]:
+        """
+        The (act, section) pairs the query cites, or None unless it names an act
+        and each section is known and unambiguous among the named acts
+        """
+        sections = cited_sections(query, query_analysis)
+        if not sections or len(sections) > MAX_CITED_SECTIONS:
+            return None
+        named = named_acts(query, query_analysis)
+        if not named:
+            return None
+        acts = self.acts_matching(named)
+        citations = []
+        for sec in sections:
+            matches = [a for a in acts if (a, sec) in self._sections]
+            if len(matches) != 1:
+                return None
+            citations.append((matches[0], sec))
+        return citations
+
+    def documents_for(self, citations: List[Tuple[str, str]], k: int) -> List[Document]:
+        """Up to k chunks of the cited sections, taking each section's best chunk before any second one"""
+        queues = [self._sections.get(c, []) for c in citations]
+        picked: List[int] = []
+        for rank in range(max((len(q) for q in queues), default=0)):
+            for q in queues:
+                if rank < len(q) and q[rank] not in picked:
+                    picked.append(q[rank])
+                    if len(picked) >= k:
+                        return [self.documents[p] for p in picked]
+        return [self.documents[p] for p in picked]
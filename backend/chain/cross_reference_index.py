@@ -0,0 +1,110 @@
+"""
+Cross-reference adjacency between chunks.
+
+extract_legal_metadata records the provisions a page cites as
+referenced_sections ({"section": "154", "act": "code_of_criminal_procedure"}
+pairs), but they were only ever stored. This index resolves them once, when
+the retriever is created, against the citation index (the chunks of each
+(act, section)):
+
+- forward: chunk -> the chunk of every section it cites (the section's
+  top-ranked chunk), in citation order
+- reverse: chunk -> the chunks that cite the section it belongs to
+
+so the provisions around a retrieved chunk are two list lookups away, rather
+than a vector search per provision through the fetch_legal_citations /
+summarize_legal_section tools. A reference whose act matches no indexed act,
+or more than one, is skipped, as is a section the corpus does not hold.
+"""
+
+import ast
+from typing import Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+from chain.citation_index import CitationIndex
+from chain.section_index import section_token
+
+
+def referenced_sections(doc: Document) -> List[Tuple[str, str]]:
+    """
+    (act, normalized section) pairs a chunk cites. Metadata stored in Chroma
+    holds them as comma-joined dict reprs ("{'section': '59', 'act': ...}, {...}").
+    """
+    refs = doc.metadata.get("referenced_sections") or []
+    if isinstance(refs, str):
+        try:
+            refs = ast.literal_eval(refs)
+        except (ValueError, SyntaxError):
+            return []
+    if isinstance(refs, dict):
+        refs = [refs]
+    if not isinstance(refs, (list, tuple)):
+        return []
+    pairs = []
+    for r in refs:
+        if isinstance(r, dict) and r.get("section") and r.get("act"):
+            pairs.append((str(r["act"]), section_token(r["section"])))
+    return pairs
+
+
+class CrossReferenceIndex:
+    """Forward and reverse one-hop citation edges between chunk positions"""
+
+    def __init__(self, documents: List[Document], citation_index: CitationIndex):
+        self.documents = documents
+        self._forward: List[Tuple[int, ...]] = [()] * len(documents)
+        reverse: Dict[int, List[int]] = {}
+
+        act_cache: Dict[str, Optional[str]] = {}
+        for pos, d in enumerate(documents):
+            targets = []
+            for ref_act, sec in referenced_sections(d):
+                if ref_act not in act_cache:
+                    matches = citation_index.acts_matching([ref_act])
+                    act_cache[ref_act] = matches[0] if len(matches) == 1 else None
+                act = act_cache[ref_act]
+                chunks = citation_index.section_chunks(act, sec) if act else []
+                if chunks and chunks[0] != pos and chunks[0] not in targets:
+                    targets.append(chunks[0])
+            if targets:
+                self._forward[pos] = tuple(targets)
+                for t in targets:
+                    reverse.setdefault(t, []).append(pos)
+
+        # A chunk's referrers are those of the sections it belongs to, i.e. of their top chunks
+        referrers_of: Dict[int, List[int]] = {}
+        for _, chunks in citation_index.sections():
+            for r in reverse.get(chunks[0], ()):
+                for c in chunks:
+                    if c != r:
+                        referrers_of.setdefault(c, []).append(r)
+        self._reverse: Dict[int, Tuple[int, ...]] = {
+            c: tuple(dict.fromkeys(referrers)) for c, referrers in referrers_of.items()
+        }
+
+    def __len__(self) -> int:
+        return sum(len(t) for t in self._forward)
+
+    def references(self, position: int) -> Tuple[int, ...]:
+        return self._forward[position]
+
+    def referenced_by(self, position: int) -> Tuple[int, ...]:
+        return self._reverse.get(position, ())
+
+    def expand(self, positions: List[int], limit: int) -> List[int]:
+        """
+        Up to limit one-hop neighbours of the given chunks, not among them:
+        the provisions they cite first, then the chunks citing them.
+        """
+        seen = set(positions)
+        picked: List[int] = []
+        for edges in (self.references, self.referenced_by):
+            for pos in positions:
+                for n in edges(pos):
+                    if len(picked) >= limit:
+                        return picked
+                    if n not in seen:
+                        seen.add(n)
+                        picked.append(n)
+        return picked
@@ -0,0 +1,212 @@
+"""
+Content-addressed, persistent cache of chunk embeddings.
+
+Entries are keyed by (embedding model, SHA-256 of the chunk text), so a rebuild
+only pays the embedding provider for chunks whose text is new - changing
+chunking parameters or metadata fields no longer re-embeds the whole corpus.
+
+On-disk layout, one directory per model:
+    meta.json    -> {"version", "model", "dim"}
+    keys.bin     -> 32-byte SHA-256 digests, one per row (append-only)
+    vectors.f32  -> float32 matrix, one row per key (append-only, memory-mapped for reads)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from chain.query_embedding_cache import query_embedding_cache
+
+CACHE_VERSION = 1
+CACHE_DIRNAME = "embedding_cache"
+KEY_BYTES = 32
+
+
+def _model_slug(model: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_.-]+', '_', model or "unknown")
+
+
+class EmbeddingCache:
+    """Append-only embedding store for one embedding model"""
+
+    def __init__(self, persist_dir: str, model: str):
+        self.model = model
+        self.cache_dir = os.path.join(persist_dir, CACHE_DIRNAME, _model_slug(model))
+        self._meta_path = os.path.join(self.cache_dir, "meta.json")
+        self._keys_path = os.path.join(self.cache_dir, "keys.bin")
+        self._vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+
+        self._lock = threading.Lock()
+        self._index: Dict[bytes, int] = {}
+        self._dim: Optional[int] = None
+        self._rows = 0
+        self._matrix: Optional[np.memmap] = None
+        self._load()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @staticmethod
+    def key_for(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        try:
+            with open(self._meta_path, "r") as f:
+                meta = json.load(f)
+            if meta.get("version") != CACHE_VERSION or meta.get("model") != self.model:
+                print(f"Embedding cache at {self.cache_dir} is incompatible, ignoring it")
+                return
+            dim = int(meta["dim"])
+
+            keys = b""
+            if os.path.exists(self._keys_path):
+                with open(self._keys_path, "rb") as f:
+                    keys = f.read()
+            vectors_size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+
+            # A crash between the two appends can leave one file longer than the other;
+            # keep only complete rows and truncate the rest so later appends stay aligned
+            rows = min(len(keys) // KEY_BYTES, vectors_size // (4 * dim))
+            if len(keys) != rows * KEY_BYTES:
+                with open(self._keys_path, "r+b") as f:
+                    f.truncate(rows * KEY_BYTES)
+            if vectors_size != rows * dim * 4:
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(rows * dim * 4)
+
+            self._dim = dim
+            self._rows = rows
+            self._index = {keys[i * KEY_BYTES:(i + 1) * KEY_BYTES]: i for i in range(rows)}
+            print(f"Embedding cache for {self.model}: {rows} cached vectors")
+        except Exception as e:
+            print(f"Error loading embedding cache: {e}")
+            self._index, self._dim, self._rows = {}, None, 0
+
+    def _vectors(self) -> Optional[np.memmap]:
+        """Memory-mapped view of all complete rows (re-opened after appends)"""
+        if self._rows == 0:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != self._rows:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._rows, self._dim))
+        return self._matrix
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached vector for each text, or None where there is no entry"""
+        with self._lock:
+            rows = [self._index.get(self.key_for(t)) for t in texts]
+            matrix = self._vectors()
+            return [matrix[r].tolist() if r is not None else None for r in rows]
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """Append vectors for texts not cached yet. Written to disk immediately."""
+        with self._lock:
+            new_keys, new_vectors, seen = [], [], set()
+            for t, v in zip(texts, vectors):
+                k = self.key_for(t)
+                if k in self._index or k in seen:
+                    continue
+                seen.add(k)
+                new_keys.append(k)
+                new_vectors.append(v)
+            if not new_keys:
+                return
+
+            block = np.asarray(new_vectors, dtype=np.float32)
+            if self._dim is None:
+                self._dim = int(block.shape[1])
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(self._meta_path, "w") as f:
+                    json.dump({"version": CACHE_VERSION, "model": self.model, "dim": self._dim}, f)
+            elif block.shape[1] != self._dim:
+                print(f"Embedding dimension changed ({block.shape[1]} != {self._dim}), not caching")
+                return
+
+            # Vectors first, then keys: a key is only ever visible once its row is complete
+            with open(self._vectors_path, "ab") as f:
+                f.write(block.tobytes())
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(new_keys))
+
+            for k in new_keys:
+                self._index[k] = self._rows
+                self._rows += 1
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that consults an EmbeddingCache before calling the provider.
+    Document embeddings are cached here; queries go through the shared
+    query-embedding cache (chain.query_embedding_cache).
+    When wrapping a BatchedEmbeddings pipeline, each completed batch is written
+    to the cache immediately, which makes interrupted builds resumable.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        results = self.cache.get_many(texts)
+
+        missing: Dict[str, List[int]] = {}
+        for i, v in enumerate(results):
+            if v is None:
+                missing.setdefault(texts[i], []).append(i)
+
+        if missing:
+            missing_texts = list(missing.keys())
+            if hasattr(self.embeddings, "iter_batches"):
+                # Batched pipeline: checkpoint every batch as soon as it completes
+                batches = self.embeddings.iter_batches(missing_texts)
+            else:
+                batches = [(0, self.embeddings.embed_documents(missing_texts))]
+
+            for start, vectors in batches:
+                batch_texts = missing_texts[start:start + len(vectors)]
+                self.cache.put_many(batch_texts, vectors)
+                for text, v in zip(batch_texts, vectors):
+                    for i in missing[text]:
+                        results[i] = v
+
+        missed = sum(len(ix) for ix in missing.values())
+        with self._stats_lock:
+            self.hits += len(texts) - missed
+            self.misses += missed
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return query_embedding_cache.get_or_embed(self.cache.model, text, self.embeddings.embed_query).tolist()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "cached_vectors": len(self.cache),
+        }
+
+    def report(self):
+        s = self.stats()
+        print(
+            f"Embedding cache: {s['hits']} hits, {s['misses']} misses "
+            f"({s['hit_rate']:.1%} hit rate, {s['cached_vectors']} vectors cached)"
+        )
+
+
+def with_embedding_cache(embeddings: Embeddings, persist_dir: str) -> CachedEmbeddings:
+    """Wrap a provider embedding function with the persistent cache for its model"""
+    model = getattr(embeddings, "model", None) or embeddings.__class__.__name__
+    return CachedEmbeddings(embeddings, EmbeddingCache(persist_dir, model))
@@ -0,0 +1,187 @@
+"""
+Batched, concurrent embedding stage for index builds.
+
+BatchedEmbeddings splits the texts of a build into fixed-size batches and sends
+them to the provider with bounded concurrency, a shared requests-per-minute
+limit and retries with backoff (honouring Retry-After on 429s). Batches are
+yielded as they complete, so CachedEmbeddings can checkpoint each one into the
+persistent embedding cache - an interrupted build resumes from the cache
+instead of starting over.
+
+LocalHashEmbeddings is a deterministic, offline stand-in for the provider,
+used by the benchmark scripts and for exercising the pipeline without network
+access or API spend.
+"""
+
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+
+
+class RateLimiter:
+    """Spaces out requests across threads to stay under a requests-per-minute budget"""
+
+    def __init__(self, requests_per_minute: int = 0):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Push every worker's next slot back, e.g. after the provider returned 429"""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Retry-After hint from a provider rate-limit error, if there is one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    if getattr(error, "status_code", None) == 429:
+        return True
+    return type(error).__name__ == "RateLimitError"
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that embeds documents in batches with bounded concurrency.
+    Queries pass straight through.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        max_retries: int = 5,
+        base_backoff: float = 1.0
+    ):
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size or settings.embedding_batch_size)
+        self.max_concurrency = max(1, max_concurrency or settings.embedding_max_concurrency)
+        rpm = settings.embedding_requests_per_minute if requests_per_minute is None else requests_per_minute
+        self.rate_limiter = RateLimiter(rpm)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        # Forwarded so the embedding cache keys entries by the real provider model
+        self.model = getattr(embeddings, "model", None) or embeddings.__class__.__name__
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = self.base_backoff * (2 ** (attempt - 1)) * (1 + random.random() * 0.25)
+                if _is_rate_limit_error(e):
+                    delay = _retry_after_seconds(e) or delay
+                    self.rate_limiter.pause(delay)
+                print(f"Embedding batch failed ({type(e).__name__}: {e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def iter_batches(self, texts: List[str]) -> Iterator[Tuple[int, List[List[float]]]]:
+        """
+        Yield (start_offset, vectors) for each batch as it completes (not in order).
+        If a batch still fails after retries, pending batches are cancelled and the
+        error is raised; batches yielded before that are complete and can be kept.
+        """
+        if not texts:
+            return
+
+        starts = list(range(0, len(texts), self.batch_size))
+        total_batches = len(starts)
+        done_chunks = 0
+        started = time.time()
+        print(
+            f"Embedding {len(texts)} chunks in {total_batches} batches "
+            f"(batch_size={self.batch_size}, concurrency={self.max_concurrency})"
+        )
+
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            futures = {
+                executor.submit(self._embed_batch, texts[s:s + self.batch_size]): s
+                for s in starts
+            }
+            for i, future in enumerate(as_completed(futures), start=1):
+                start = futures[future]
+                vectors = future.result()
+                done_chunks += len(vectors)
+                yield start, vectors
+
+                if i % 10 == 0 or i == total_batches:
+                    elapsed = max(time.time() - started, 1e-9)
+                    print(f"  {i}/{total_batches} batches, {done_chunks / elapsed:.1f} chunks/sec")
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        elapsed = max(time.time() - started, 1e-9)
+        print(f"Embedded {done_chunks} chunks in {elapsed:.1f}s ({done_chunks / elapsed:.1f} chunks/sec)")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        for start, vectors in self.iter_batches(texts):
+            results[start:start + len(vectors)] = vectors
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class LocalHashEmbeddings(Embeddings):
+    """
+    Deterministic feature-hashing embeddings (L2-normalised bag of words).
+    Offline stand-in for the provider; latency simulates a network round-trip.
+    """
+
+    def __init__(self, dim: int = 256, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.model = f"local-hash-{dim}"
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        for token in re.findall(r'\w+', text.lower()):
+            h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) == 0 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
@@ -0,0 +1,181 @@
+"""
+Per-file index manifest for incremental re-indexing.
+
+The manifest maps each source file (local path or S3 key) to the content hash
+it was indexed with and the Chroma IDs of the chunks it produced. When the
+document hash changes, the loaders diff the manifest against the current files
+and only delete/upsert the chunks of added, modified or removed files instead
+of re-embedding the whole corpus.
+
+Chunk IDs depend on how files were chunked, so a manifest written under a
+different settings.chunking_mode is ignored and forces a full rebuild.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Tuple
+
+from langchain.schema import Document
+
+from chain import chunk_snapshot
+from config.settings import settings
+
+MANIFEST_VERSION = 1
+MANIFEST_FILENAME = "index_manifest.json"
+
+
+def manifest_path(persist_dir: str) -> str:
+    return os.path.join(persist_dir, MANIFEST_FILENAME)
+
+
+def load_manifest(persist_dir: str) -> Dict[str, Dict]:
+    """Return {source_key: {"content_hash", "chunk_ids"}} or {} if there is no usable manifest"""
+    path = manifest_path(persist_dir)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            print(f"Index manifest version {data.get('version')} is not supported, ignoring it")
+            return {}
+        if data.get("chunking_mode", "recursive") != settings.chunking_mode:
+            print(f"Index manifest was built with chunking mode {data.get('chunking_mode', 'recursive')}, ignoring it")
+            return {}
+        return data.get("files") or {}
+    except Exception as e:
+        print(f"Error loading index manifest: {e}")
+        return {}
+
+
+def save_manifest(persist_dir: str, files: Dict[str, Dict]):
+    path = manifest_path(persist_dir)
+    os.makedirs(persist_dir, exist_ok=True)
+    try:
+        with open(path + ".tmp", "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "chunking_mode": settings.chunking_mode, "files": files}, f)
+        os.replace(path + ".tmp", path)
+    except Exception as e:
+        print(f"Error saving index manifest: {e}")
+
+
+def file_content_hash(path: str) -> str:
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def plan_changes(manifest_files: Dict[str, Dict], current_hashes: Dict[str, str]) -> Dict[str, List[str]]:
+    """Diff the manifest against the current {source_key: content_hash} mapping"""
+    changes = {"added": [], "modified": [], "removed": [], "unchanged": []}
+    for key, content_hash in current_hashes.items():
+        entry = manifest_files.get(key)
+        if entry is None:
+            changes["added"].append(key)
+        elif entry.get("content_hash") != content_hash:
+            changes["modified"].append(key)
+        else:
+            changes["unchanged"].append(key)
+    changes["removed"] = [key for key in manifest_files if key not in current_hashes]
+    return changes
+
+
+def chunk_id_for(source_key: str, content_hash: str, index: int) -> str:
+    """Deterministic Chroma ID for the index-th chunk of a file version"""
+    return hashlib.sha1(f"{source_key}|{content_hash}|{index}".encode()).hexdigest()
+
+
+def stamp_chunk_ids(chunks: List[Document], source_key: str, content_hash: str) -> None:
+    """
+    Stamp content_hash and a deterministic chunk_id into the metadata of one
+    file's chunks (in place), numbered in the order the splitter produced them.
+    """
+    for index, c in enumerate(chunks):
+        c.metadata["content_hash"] = content_hash
+        c.metadata["chunk_id"] = chunk_id_for(source_key, content_hash, index)
+
+
+def manifest_entry(chunks: List[Document]) -> Dict:
+    """{"content_hash", "chunk_ids"} manifest entry for one file's stamped chunks"""
+    return {
+        "content_hash": chunks[0].metadata.get("content_hash", "") if chunks else "",
+        "chunk_ids": [c.metadata["chunk_id"] for c in chunks if c.metadata.get("chunk_id")],
+    }
+
+
+class ReusedChunks:
+    """
+    Chunks of unchanged files, read from the previous chunk snapshot one file at
+    a time as the re-index reaches them, so only the file being written is held
+    in memory. Used as a context manager, which closes the snapshot.
+
+    A file's chunks are contiguous in the snapshot and files are usually taken
+    in snapshot order, so each take() continues where the last one stopped; a
+    file that lies behind that point is found by reading the snapshot again.
+    """
+
+    def __init__(self, persist_dir: str, manifest_files: Dict[str, Dict], unchanged_keys: List[str]):
+        self.persist_dir = persist_dir
+        self._ids = {key: manifest_files[key].get("chunk_ids") or [] for key in unchanged_keys}
+        self._owner = {cid: key for key, ids in self._ids.items() for cid in ids}
+        self._runs = self._open()
+
+    def _open(self) -> Iterator[Tuple[str, List[Document]]]:
+        docs = chunk_snapshot.iter_chunk_snapshot(self.persist_dir, None, any_hash=True)
+        if docs is None:
+            raise RuntimeError("No chunk snapshot available to reuse unchanged chunks from")
+        return self._file_runs(docs)
+
+    def _file_runs(self, docs: Iterator[Document]) -> Iterator[Tuple[str, List[Document]]]:
+        """(file, chunks) for each run of consecutive chunks of an unchanged file; other chunks are skipped"""
+        key, run = None, []
+        try:
+            for d in docs:
+                owner = self._owner.get(d.metadata.get("chunk_id"))
+                if owner != key:
+                    if run:
+                        yield key, run
+                    key, run = owner, []
+                if owner is not None:
+                    run.append(d)
+            if run:
+                yield key, run
+        finally:
+            docs.close()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._ids
+
+    def take(self, key: str) -> List[Document]:
+        """
+        The chunks of one unchanged file, in manifest order. Raises if any are
+        missing, in which case the caller should fall back to a full rebuild.
+        """
+        ids = self._ids[key]
+        if not ids:
+            return []
+        for attempt in range(2):
+            for owner, run in self._runs:
+                if owner == key:
+                    by_id = {d.metadata["chunk_id"]: d for d in run}
+                    missing = [cid for cid in ids if cid not in by_id]
+                    if missing:
+                        raise RuntimeError(f"{len(missing)} chunks of {key} missing from the chunk snapshot")
+                    return [by_id[cid] for cid in ids]
+            if attempt == 0:
+                self._runs = self._open()
+        raise RuntimeError(f"{len(ids)} chunks of {key} missing from the chunk snapshot")
+
+    def close(self):
+        self._runs.close()
+
+    def __enter__(self) -> "ReusedChunks":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,248 @@
+"""
+Shared ingestion pipeline used by both the local and the S3 loader.
+
+Ingestion is a chain of generators that works one file at a time:
+
+    discover -> parse -> extract metadata -> aggregate -> chunk -> embed batch -> upsert
+
+Only a bounded window of files is in flight at any point (parsed pages for at
+most `workers * FILES_IN_FLIGHT_PER_WORKER` files, plus one upsert batch of
+chunks), so corpora larger than RAM can be indexed on small ingestion workers.
+
+Parsing and metadata extraction can be spread across a process pool
+(settings.ingestion_workers). Upcoming files are parsed in the background while
+the pages of the current file are fanned out in batches to
+`extract_legal_metadata`, so a single large act does not pin one core. Files
+are emitted in input order, so the output is identical to the sequential path.
+"""
+
+import re
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import PyPDFLoader
+
+from chain import index_manifest
+from chain.section_chunker import SectionChunker
+from chain.utils import metadata_utils
+from config.settings import settings
+
+# Pages handed to a worker per task during metadata extraction
+METADATA_BATCH_SIZE = 32
+
+# Files parsed ahead of the one currently being emitted, per worker
+FILES_IN_FLIGHT_PER_WORKER = 2
+
+
+def _load_pdf_pages(pdf_path: str) -> Tuple[Optional[List[Tuple[str, Dict]]], Optional[str]]:
+    """Parse one PDF into (page_content, metadata) pairs. Runs inside a worker process."""
+    try:
+        loader = PyPDFLoader(pdf_path)
+        return [(d.page_content, d.metadata) for d in loader.load()], None
+    except Exception as e:
+        return None, str(e)
+
+
+def _extract_page_metadata(task: Tuple[str, str, bool]) -> Dict:
+    """Run legal metadata extraction for one page. Runs inside a worker process."""
+    text, filename, sanitize = task
+    metadata = metadata_utils.extract_legal_metadata(text, filename)
+    if sanitize:
+        metadata = metadata_utils.sanitize_extracted_metadata(metadata)
+    return metadata
+
+
+def iter_parsed_pdfs(
+    files: Iterable[Tuple[str, str]],
+    sanitize: bool = True,
+    workers: Optional[int] = None
+) -> Iterator[Tuple[str, Optional[List[Document]]]]:
+    """
+    Parse PDFs and attach extracted legal metadata to every page.
+
+    `files` yields (pdf_path, display_name) pairs and is consumed lazily, so it
+    can itself be a stream (e.g. downloads). Yields (pdf_path, pages) in input
+    order, where pages is None if that file could not be parsed (the error is
+    printed, matching the loaders' skip-and-continue behaviour).
+    """
+    workers = max(1, workers or settings.ingestion_workers)
+    if workers == 1:
+        for path, name in files:
+            yield path, _attach_page_metadata(path, name, _load_pdf_pages(path), sanitize, map)
+        return
+
+    window = workers * FILES_IN_FLIGHT_PER_WORKER
+    files = iter(files)
+    pending = deque()
+    pool = ProcessPoolExecutor(max_workers=workers)
+
+    def _map(fn, tasks):
+        return pool.map(fn, tasks, chunksize=METADATA_BATCH_SIZE)
+
+    try:
+        while True:
+            # Keep the next few files parsing in the background
+            while len(pending) < window:
+                nxt = next(files, None)
+                if nxt is None:
+                    break
+                path, name = nxt
+                pending.append((path, name, pool.submit(_load_pdf_pages, path)))
+            if not pending:
+                break
+
+            path, name, future = pending.popleft()
+            yield path, _attach_page_metadata(path, name, future.result(), sanitize, _map)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _attach_page_metadata(path, name, parsed, sanitize, _map) -> Optional[List[Document]]:
+    pages, error = parsed
+    if pages is None:
+        print(f"Error loading {path}: {error}")
+        return None
+
+    extracted = _map(_extract_page_metadata, [(text, name, sanitize) for text, _ in pages])
+    docs = []
+    for (text, page_metadata), metadata in zip(pages, extracted):
+        merged = dict(page_metadata)
+        merged.update(metadata)
+        docs.append(Document(page_content=text, metadata=merged))
+    return docs
+
+
+def make_text_splitter():
+    """Splitter for settings.chunking_mode; both expose split_documents(pages of one file)"""
+    if settings.chunking_mode == "section":
+        return SectionChunker(chunk_size=1000)
+    return RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len,
+    )
+
+
+def iter_file_chunks(
+    files: Iterable[Tuple[str, str]],
+    sanitize: bool = True,
+    aggregate: bool = True,
+    workers: Optional[int] = None
+) -> Iterator[Tuple[str, Optional[List[Document]]]]:
+    """
+    Yield (pdf_path, chunks) one file at a time, in input order.
+    Per-file section/act aggregation (when enabled) is attached to the file's
+    pages before they are split, so no step needs the whole corpus in memory.
+    chunks is None for files that could not be parsed.
+    """
+    text_splitter = make_text_splitter()
+    for path, pages in iter_parsed_pdfs(files, sanitize=sanitize, workers=workers):
+        if pages is None:
+            yield path, None
+            continue
+        if aggregate:
+            attach_aggregated_metadata(pages)
+        yield path, text_splitter.split_documents(pages)
+
+
+def attach_aggregated_metadata(docs: List[Document]) -> None:
+    """
+    Compute the per-PDF union of sections/acts and attach it to every page of
+    the same PDF (in place).
+    """
+    aggregate_sections = defaultdict(set)
+    aggregate_acts = defaultdict(set)
+
+    for d in docs:
+        src = d.metadata.get("source_file") or d.metadata.get("source")
+
+        raw_sections = d.metadata.get("extracted_sections_norm") or d.metadata.get("extracted_sections") or []
+        if isinstance(raw_sections, str):
+            section_parts = re.split(r'\s*(?:,|;|\||/|and)\s*', raw_sections)
+        else:
+            section_parts = raw_sections
+
+        for s in section_parts:
+            token = re.sub(r'[^0-9a-z]', '', str(s or "").lower())
+            if token:
+                aggregate_sections[src].add(token)
+
+        raw_acts = d.metadata.get("extracted_acts_norm") or d.metadata.get("extracted_acts") or []
+        if isinstance(raw_acts, str):
+            act_parts = re.split(r'\s*(?:,|;|\||/|and)\s*', raw_acts)
+        else:
+            act_parts = raw_acts
+        for a in act_parts:
+            token = re.sub(r'[^0-9a-z_]', '', str(a or "").lower().replace(' ', '_'))
+            if token:
+                aggregate_acts[src].add(token)
+
+    # Attach aggregated normalized lists to every page of the same PDF
+    for d in docs:
+        src = d.metadata.get("source_file") or d.metadata.get("source")
+        d.metadata["aggregated_extracted_sections_norm"] = sorted(list(aggregate_sections.get(src, [])))
+        d.metadata["aggregated_extracted_acts_norm"] = sorted(list(aggregate_acts.get(src, [])))
+
+
+def documents_for_store(docs: List[Document]) -> List[Document]:
+    """
+    Chroma requires primitive metadata types. Create a separate list of Documents
+    with serialized metadata for storage, but keep original 'docs' intact for runtime.
+    """
+    docs_for_store = []
+    for d in docs:
+        # Make a shallow copy of metadata then serialize
+        meta_copy = dict(d.metadata or {})
+        meta_serial = metadata_utils.serialize_metadata_for_storage(meta_copy)
+        docs_for_store.append(Document(page_content=d.page_content, metadata=meta_serial))
+    return docs_for_store
+
+
+def default_upsert_batch_size() -> int:
+    """Chunks per upsert: enough to keep every concurrent embedding request busy"""
+    return max(1, settings.embedding_batch_size * settings.embedding_max_concurrency)
+
+
+def write_index(
+    vector_store,
+    files: Iterable[Tuple[str, List[Document], bool]],
+    writers: Sequence,
+    batch_size: Optional[int] = None
+) -> Tuple[Dict[str, Dict], int]:
+    """
+    Sink of the pipeline. `files` yields (source_key, chunks, needs_upsert) in
+    final order; every file's chunks go to each of the writers (chunk snapshot,
+    BM25 index), and those that
+    need it are embedded and upserted into Chroma in fixed-size batches, so at
+    most one batch plus one file's chunks are held in memory.
+
+    Returns (manifest_files, upserted_chunk_count).
+    """
+    batch_size = batch_size or default_upsert_batch_size()
+    manifest_files: Dict[str, Dict] = {}
+    pending: List[Document] = []
+    upserted = 0
+
+    def _flush(batch: List[Document]):
+        vector_store.add_documents(documents_for_store(batch), ids=[d.metadata["chunk_id"] for d in batch])
+
+    for key, chunks, needs_upsert in files:
+        for writer in writers:
+            writer.write(chunks)
+        manifest_files[key] = index_manifest.manifest_entry(chunks)
+        if not needs_upsert:
+            continue
+        pending.extend(chunks)
+        while len(pending) >= batch_size:
+            _flush(pending[:batch_size])
+            upserted += batch_size
+            pending = pending[batch_size:]
+
+    if pending:
+        _flush(pending)
+        upserted += len(pending)
+
+    return manifest_files, upserted
@@ -3,9 +3,15 @@ Main loader module using Singleton pattern for vector store management.
 This ensures vector store is loaded only once regardless of import frequency.
 """
 
-from chain.vector_store_manager import get_vector_store
+from chain.vector_store_manager import get_bm25_index, get_persist_dir, get_vector_store
 
 # Get the vector store through singleton manager
 vectorstore, docs = get_vector_store()
 
+# Memory-mapped BM25 index persisted at ingestion (None if it could not be loaded)
+bm25_index = get_bm25_index()
+
+# Directory holding the vector store and the indexes persisted next to it
+persist_dir = get_persist_dir()
+
 print("📚 Vector Store loaded successfully")
\ No newline at end of file
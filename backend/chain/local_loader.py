@@ -3,16 +3,13 @@ import os
 import hashlib
 import json
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
 from langchain.schema import Document
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
-import re
-from collections import defaultdict
 
-from chain.utils import metadata_utils
+from chain import bm25_index, chunk_snapshot, embedding_cache, index_manifest, ingestion, query_embedding_cache
+from chain.embedding_pipeline import BatchedEmbeddings
 from config.settings import settings
 from config.secrets import secrets_manager
 
@@ -62,83 +59,35 @@ def discover_documents() -> List[str]:
 
     return [str(pdf_file) for pdf_file in pdf_files]
 
-def load_documents() -> List[Document]:
-    """Load and process documents from the documents directory"""
-    pdf_files = discover_documents()
+def iter_document_chunks(pdf_files: List[str]) -> Iterator[Tuple[str, List[Document]]]:
+    """
+    Stream (pdf_file, chunks) one file at a time, in discovery order.
+    Files that fail to parse are skipped.
+    """
+    print(f"Loading {len(pdf_files)} documents with {settings.ingestion_workers} worker(s)...")
+    for pdf_file, chunks in ingestion.iter_file_chunks((f, Path(f).name) for f in pdf_files):
+        if chunks is None:
+            continue
+        # Give every chunk a stable ID derived from its file's content so later runs can re-index per file
+        index_manifest.stamp_chunk_ids(chunks, pdf_file, index_manifest.file_content_hash(pdf_file))
+        print(f"Loaded {len(chunks)} chunks from {pdf_file}")
+        yield pdf_file, chunks
+
+def load_documents(pdf_files: Optional[List[str]] = None) -> List[Document]:
+    """Load and process documents from the documents directory (or only the given files)"""
+    if pdf_files is None:
+        pdf_files = discover_documents()
     if not pdf_files:
         print("No documents found. Creating empty document list.")
         return []
-    
-    all_docs = []
-    
-    for pdf_file in pdf_files:
-        try:
-            print(f"Loading document: {pdf_file}")
-            loader = PyPDFLoader(pdf_file)
-            docs = loader.load()
-
-            # Add metadata
-            for doc in docs:
-                enhanced_metadata = metadata_utils.extract_legal_metadata(
-                    doc.page_content,
-                    Path(pdf_file).name
-                )
-                enhanced_metadata = metadata_utils.sanitize_extracted_metadata(enhanced_metadata)
-                
-                doc.metadata.update(enhanced_metadata)
-            all_docs.extend(docs)
-            print(f"Loaded {len(docs)} pages from {pdf_file}")
-        except Exception as e:
-            print(f"Error loading {pdf_file}: {e}")
-            continue
 
-    if not all_docs:
+    chunks = []
+    for _, file_chunks in iter_document_chunks(pdf_files):
+        chunks.extend(file_chunks)
+
+    if not chunks:
         print("Warning: No documents were loaded successfully.")
         return []
-    
-    # --- Ingestion aggregation: compute per-PDF union of sections/acts and attach to every page ---
-    aggregate_sections = defaultdict(set)
-    aggregate_acts = defaultdict(set)
-
-    for d in all_docs:
-        src = d.metadata.get("source_file") or d.metadata.get("source")
-        
-        raw_sections = d.metadata.get("extracted_sections_norm") or d.metadata.get("extracted_sections") or []
-        if isinstance(raw_sections, str):
-            section_parts = re.split(r'\s*(?:,|;|\||/|and)\s*', raw_sections)
-        else:
-            section_parts = raw_sections
-        
-        for s in section_parts:
-            token = re.sub(r'[^0-9a-z]', '', str(s or "").lower())
-            if token:
-                aggregate_sections[src].add(token)
-        
-        raw_acts = d.metadata.get("extracted_acts_norm") or d.metadata.get("extracted_acts") or []
-        if isinstance(raw_acts, str):
-            act_parts = re.split(r'\s*(?:,|;|\||/|and)\s*', raw_acts)
-        else:
-            act_parts = raw_acts
-        for a in act_parts:
-            token = re.sub(r'[^0-9a-z_]', '', str(a or "").lower().replace(' ', '_'))
-            if token:
-                aggregate_acts[src].add(token)
-
-    # Attach aggregated normalized lists to every page of the same PDF
-    for d in all_docs:
-        src = d.metadata.get("source_file") or d.metadata.get("source")
-        d.metadata["aggregated_extracted_sections_norm"] = sorted(list(aggregate_sections.get(src, [])))
-        d.metadata["aggregated_extracted_acts_norm"] = sorted(list(aggregate_acts.get(src, [])))
-    # --- end aggregation ---
-
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
-    )
-
-    print(f"Splitting {len(all_docs)} documents into chunks...")
-    chunks = text_splitter.split_documents(all_docs)
 
     print(f"Created {len(chunks)} chunks from documents.")
     return chunks
@@ -159,6 +108,11 @@ def get_document_hash() -> str:
         except OSError:
             continue
 
+    # A different chunking mode yields different chunks, so it invalidates the cache
+    # (the default mode is left out to keep existing hashes valid)
+    if settings.chunking_mode != "recursive":
+        hash_data.append(f"chunking_mode:{settings.chunking_mode}")
+
     return hashlib.md5("\n".join(hash_data).encode()).hexdigest()
 
 def load_cache_metadata() -> dict:
@@ -191,72 +145,155 @@ def is_cache_valid() -> bool:
 
     return cache_metadata.get("doc_hash") == current_hash
 
-def create_vector_store(docs: List[Document]):
-    """Create vector store from documents"""
+def _openai_embeddings(**kwargs) -> OpenAIEmbeddings:
     openai_key = resolve_openai_key()
-    if not docs:
-        # Create a minimal document to initialize the vector store
-        dummy_doc = Document(
-            page_content="This is a placeholder document. No legal documents were found.",
-            metadata={"source_file": "placeholder", "document_type": "placeholder"}
+    if not openai_key:
+        raise RuntimeError(
+            "OpenAI API key not found. Set OPENAI_API_KEY env var or ensure secret "
+            "ai-legal-assistant-openai_api_key-<env> exists and is readable by the task role."
         )
+    return OpenAIEmbeddings(api_key=openai_key, **kwargs)
+
+def _cached_embeddings():
+    # Only chunks whose text is not in the embedding cache are sent to OpenAI, in concurrent batches
+    return embedding_cache.with_embedding_cache(BatchedEmbeddings(_openai_embeddings()), CHROMA_PERSIST_DIR)
+
+def _serving_vector_store() -> Chroma:
+    """
+    The collection as the retriever queries it. Repeated questions reuse the
+    cached query embedding; the embedding call times out with the semantic
+    retrieval leg (and is not retried), so a call the leg has given up on does
+    not keep holding a retrieval thread.
+    """
+    timeout_ms = settings.retrieval_semantic_timeout_ms
+    limits = {"timeout": timeout_ms / 1000, "max_retries": 0} if timeout_ms > 0 else {}
+    embeddings = query_embedding_cache.with_query_cache(_openai_embeddings(**limits))
+    return Chroma(embedding_function=embeddings, persist_directory=CHROMA_PERSIST_DIR)
+
+def _empty_vector_store(embeddings) -> Chroma:
+    """Open the collection after dropping it, so a full rebuild never leaves stale chunks behind"""
+    os.makedirs(CHROMA_PERSIST_DIR, exist_ok=True)
+    Chroma(embedding_function=embeddings, persist_directory=CHROMA_PERSIST_DIR).delete_collection()
+    return Chroma(embedding_function=embeddings, persist_directory=CHROMA_PERSIST_DIR)
+
+def _write_index(vector_store: Chroma, files: Iterator[Tuple[str, List[Document], bool]]) -> str:
+    """
+    Stream files into the vector store, the chunk snapshot, the BM25 index and the
+    per-file manifest, then record the cache metadata. Returns the document hash the snapshot is keyed by.
+    """
+    doc_hash = get_document_hash()
+    with chunk_snapshot.ChunkSnapshotWriter(CHROMA_PERSIST_DIR, doc_hash) as snapshot, \
+            bm25_index.BM25IndexWriter(CHROMA_PERSIST_DIR, doc_hash) as lexical:
+        manifest_files, upserted = ingestion.write_index(vector_store, files, [snapshot, lexical])
+    print(f"Upserted {upserted} chunks, index holds {snapshot.count} chunks")
+
+    index_manifest.save_manifest(CHROMA_PERSIST_DIR, manifest_files)
+    save_cache_metadata({
+        "document_hash": doc_hash,
+        "document_count": snapshot.count,
+        "created_at": datetime.utcnow().isoformat()
+    })
+    return doc_hash
+
+def create_placeholder_vector_store():
+    """Vector store holding one placeholder document, for when there are no documents to index"""
+    openai_key = resolve_openai_key()
+    # Create a minimal document to initialize the vector store
+    dummy_doc = Document(
+        page_content="This is a placeholder document. No legal documents were found.",
+        metadata={"source_file": "placeholder", "document_type": "placeholder"}
+    )
 
-        if not openai_key:
-            print("No OpenAI key available — returning placeholder document without embeddings/vector store")
-            return None, [dummy_doc]
-        
-        print("Warning: No documents provided for vector store creation.")
-        # Create an empty vector store that can be used
-        embeddings = OpenAIEmbeddings(api_key=openai_key)
+    if not openai_key:
+        print("No OpenAI key available — returning placeholder document without embeddings/vector store")
+        return None, [dummy_doc]
 
-        os.makedirs(CHROMA_PERSIST_DIR, exist_ok=True)
+    print("Warning: No documents provided for vector store creation.")
+    embeddings = OpenAIEmbeddings(api_key=openai_key)
 
-        vector_store = Chroma.from_documents(
-            documents=dummy_doc,
-            embedding=embeddings,
-            persist_directory=CHROMA_PERSIST_DIR
-        )
+    os.makedirs(CHROMA_PERSIST_DIR, exist_ok=True)
 
-        print("Created vector store with placeholder document")
-        return vector_store, [dummy_doc]
-    
-    try:
-        if not openai_key:
-            raise RuntimeError(
-                "OpenAI API key not found. Set OPENAI_API_KEY env var or ensure secret "
-                "ai-legal-assistant-openai_api_key-<env> exists and is readable by the task role."
-            )
-        embeddings = OpenAIEmbeddings(api_key=openai_key)
-        os.makedirs(CHROMA_PERSIST_DIR, exist_ok=True)
-
-         # Chroma requires primitive metadata types. Create a separate list of Documents
-        # with serialized metadata for storage, but keep original 'docs' intact for runtime.
-        docs_for_store = []
-        for d in docs:
-            # Make a shallow copy of metadata then serialize
-            meta_copy = dict(d.metadata or {})
-            meta_serial = metadata_utils.serialize_metadata_for_storage(meta_copy)
-            docs_for_store.append(Document(page_content=d.page_content, metadata=meta_serial))
-
-        vector_store = Chroma.from_documents(
-            documents=docs_for_store,
-            embedding=embeddings,
-            persist_directory=CHROMA_PERSIST_DIR
-        )
+    vector_store = Chroma.from_documents(
+        documents=[dummy_doc],
+        embedding=embeddings,
+        persist_directory=CHROMA_PERSIST_DIR
+    )
 
-        cache_metadata = {
-            "document_hash": get_document_hash(),
-            "document_count": len(docs),
-            "created_at": datetime.utcnow().isoformat()
-        }
-        save_cache_metadata(cache_metadata)
+    print("Created vector store with placeholder document")
+    return vector_store, [dummy_doc]
+
+def build_vector_store(pdf_files: List[str]):
+    """
+    Full build, streamed file by file (parse -> extract -> chunk -> embed -> upsert)
+    so memory stays bounded regardless of corpus size.
+    Returns the vector store and the document hash of the written chunk snapshot.
+    """
+    embeddings = _cached_embeddings()
+    vector_store = _empty_vector_store(embeddings)
+    files = ((f, chunks, True) for f, chunks in iter_document_chunks(pdf_files))
+    doc_hash = _write_index(vector_store, files)
+    embeddings.report()
+    return vector_store, doc_hash
+
+def update_vector_store(manifest_files: Dict[str, Dict]):
+    """
+    Re-index only the files that were added, modified or removed since the last build.
+    Chunks of unchanged files are reused from the chunk snapshot, so neither they
+    nor their embeddings are recomputed.
+    """
+    pdf_files = discover_documents()
+    if not pdf_files:
+        raise RuntimeError("No documents found to re-index")
 
-        print(f"Created and cached vector store with {len(docs)} documents.")
-        return vector_store, docs
-    
-    except Exception as e:
-        print(f"Error creating vector store in local loader: {e}")
-        raise
+    current_hashes = {f: index_manifest.file_content_hash(f) for f in pdf_files}
+    changes = index_manifest.plan_changes(manifest_files, current_hashes)
+    print(
+        f"Incremental re-index: {len(changes['added'])} added, {len(changes['modified'])} modified, "
+        f"{len(changes['removed'])} removed, {len(changes['unchanged'])} unchanged"
+    )
+
+    # Unchanged files' chunks are read from the previous snapshot as the new one reaches them
+    reused = index_manifest.ReusedChunks(CHROMA_PERSIST_DIR, manifest_files, changes["unchanged"])
+
+    embeddings = _cached_embeddings()
+    vector_store = Chroma(
+        embedding_function=embeddings,
+        persist_directory=CHROMA_PERSIST_DIR
+    )
+
+    stale_ids = []
+    for key in changes["modified"] + changes["removed"]:
+        stale_ids.extend(manifest_files[key].get("chunk_ids") or [])
+    if stale_ids:
+        vector_store.delete(ids=stale_ids)
+        print(f"Deleted {len(stale_ids)} stale chunks")
+
+    changed = set(changes["added"] + changes["modified"])
+    new_files = iter_document_chunks([f for f in pdf_files if f in changed]) if changed else iter(())
+
+    def _files():
+        # Interleave reused and freshly chunked files so the snapshot stays in discovery order
+        pending = next(new_files, None)
+        for f in pdf_files:
+            if f in reused:
+                yield f, reused.take(f), False
+            elif pending is not None and pending[0] == f:
+                yield f, pending[1], True
+                pending = next(new_files, None)
+
+    with reused:
+        doc_hash = _write_index(vector_store, _files())
+    embeddings.report()
+
+    docs = chunk_snapshot.load_chunk_snapshot(CHROMA_PERSIST_DIR, doc_hash, compact=True)
+    if docs is None:
+        raise RuntimeError("Chunk snapshot could not be read back after re-indexing")
+    print(f"Re-indexed vector store now holds {len(docs)} chunks.")
+    return _serving_vector_store(), docs
+
+def load_bm25_index(docs: List[Document]) -> Optional[bm25_index.BM25Index]:
+    """Memory-map the persisted BM25 index for the chunk list returned by get_or_create_vector_store"""
+    return bm25_index.load_or_build(CHROMA_PERSIST_DIR, load_cache_metadata().get("doc_hash"), docs)
 
 def get_or_create_vector_store():
     """Get existing vector store or create new one"""
@@ -265,33 +302,46 @@ def get_or_create_vector_store():
     if is_cache_valid():
         try:
             print("Cache is valid, loading vector store from cache...")
-            openai_key = resolve_openai_key()
-            if not openai_key:
-                raise RuntimeError(
-                    "OpenAI API key not found. Set OPENAI_API_KEY env var or ensure secret "
-                    "ai-legal-assistant-openai_api_key-<env> exists and is readable by the task role."
-                )
-            print("Loading vector store from cache...")
-            embeddings = OpenAIEmbeddings(api_key=openai_key)
-            vector_store = Chroma(
-                embedding_function=embeddings,
-                persist_directory=CHROMA_PERSIST_DIR
-            )
+            vector_store = _serving_vector_store()
 
             # Load document list from cache
             cache_metadata = load_cache_metadata()
             print(f"Loaded cached vector store with {cache_metadata.get('document_count', 'unknown')} documents")
             
-            # We need to reload docs for the retriever
-            docs = load_documents()
+            # The retriever needs the chunk list; read it from the snapshot and
+            # only fall back to re-parsing every PDF if the snapshot is missing or stale
+            doc_hash = cache_metadata.get("doc_hash")
+            docs = chunk_snapshot.load_chunk_snapshot(CHROMA_PERSIST_DIR, doc_hash, compact=True)
+            if docs is None:
+                print("No usable chunk snapshot, re-parsing documents for the retriever...")
+                docs = load_documents()
+                chunk_snapshot.save_chunk_snapshot(CHROMA_PERSIST_DIR, doc_hash, docs)
             return vector_store, docs
         except Exception as e:
             print(f"Error loading from cache: {e}")
             print("Creating new vector store...")
 
+    # Re-index only the changed files if a previous build left a manifest behind
+    manifest_files = index_manifest.load_manifest(CHROMA_PERSIST_DIR)
+    if manifest_files:
+        try:
+            return update_vector_store(manifest_files)
+        except Exception as e:
+            print(f"Incremental re-index failed: {e}")
+
     # Create new vector store
     print("Creating new vector store...")
-    docs = load_documents()
-    vector_store, docs = create_vector_store(docs)
+    pdf_files = discover_documents()
+    if not pdf_files:
+        return create_placeholder_vector_store()
+
+    _, doc_hash = build_vector_store(pdf_files)
+    # The retriever needs the whole chunk list; read it back from the snapshot
+    # written during the build rather than holding it through ingestion
+    docs = chunk_snapshot.load_chunk_snapshot(CHROMA_PERSIST_DIR, doc_hash, compact=True)
+    if not docs:
+        print("Warning: No documents were loaded successfully.")
+        return create_placeholder_vector_store()
 
-    return vector_store, docs
\ No newline at end of file
+    print(f"Created and cached vector store with {len(docs)} documents.")
+    return _serving_vector_store(), docs
\ No newline at end of file
@@ -0,0 +1,331 @@
+"""
+Bitmap inverted index over chunk metadata, used to evaluate retrieval filters.
+
+Built once when the retriever is created: every filterable value (document
+type, legal topic, normalized section token, act text) maps to a packed bit
+array with one bit per chunk. A filter then becomes a handful of vectorized
+OR / AND operations over those bit arrays (match_any_filter picks which), and
+each candidate is a single bit test, instead of re-splitting and re-normalizing
+every candidate's metadata on every query.
+
+Candidates are mapped back to their chunk by object identity (when the chunks
+are a list, BM25 returns the loaded chunks themselves) or by
+metadata["chunk_id"] (Chroma and the ChunkStore return copies).
+Documents the index does not know are reported as None so callers can fall
+back to evaluating them one by one with doc_matches_filters, which applies
+the same rules.
+"""
+
+import re
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+
+_LIST_SPLIT_RE = re.compile(r'\s*(?:,|;|\||/|and)\s*')
+_NON_ALNUM_RE = re.compile(r'[^0-9a-z]')
+
+# Distinct act filter strings whose bitmaps are kept (QueryProcessor emits a handful)
+_ACT_CACHE_SIZE = 1024
+
+
+def to_list(v) -> List[str]:
+    """Metadata value (list or comma/semicolon/pipe/slash/'and'-joined string) as lowercased tokens"""
+    if v is None:
+        return []
+    if isinstance(v, (list, tuple, set)):
+        return [str(x).strip().lower() for x in v if str(x).strip()]
+    if isinstance(v, str):
+        s = v.strip()
+        if s == "":
+            return []
+        parts = _LIST_SPLIT_RE.split(s)
+        return [p.strip().lower() for p in parts if p.strip()]
+    return [str(v).strip().lower()]
+
+
+@lru_cache(maxsize=65536)
+def _section_token(t: str) -> str:
+    return _NON_ALNUM_RE.sub('', t.lower())
+
+
+def normalize_section_tokens(tokens: Iterable, content: Optional[str] = None) -> List[str]:
+    out = []
+    for t in tokens:
+        tok = _section_token(str(t))
+        if not tok:
+            continue
+        if len(tok) >= 2:
+            out.append(tok)
+            continue
+        # single-char token: include only when context confirms it's a section
+        if content and re.search(rf'\b(?:section|sec\.?|s\.)\s*{re.escape(tok)}\b', content, re.IGNORECASE):
+            out.append(tok)
+    return out
+
+
+def document_sections(doc: Document) -> List[str]:
+    """Normalized section tokens of a chunk, page-level and aggregated per document"""
+    raw_page = doc.metadata.get('extracted_sections_norm') or doc.metadata.get('extracted_sections') or []
+    raw_agg = doc.metadata.get('aggregated_extracted_sections_norm') or []
+    doc_sections = list(dict.fromkeys(to_list(raw_page) + to_list(raw_agg)))
+    return normalize_section_tokens(doc_sections, getattr(doc, "page_content", None))
+
+
+def document_acts(doc: Document) -> List[str]:
+    """Act tokens/names of a chunk, page-level and aggregated per document, deduplicated in order"""
+    raw_page = doc.metadata.get('extracted_acts_norm') or doc.metadata.get('extracted_acts') or []
+    raw_agg = doc.metadata.get('aggregated_extracted_acts_norm') or []
+    return list(dict.fromkeys(to_list(raw_page) + to_list(raw_agg)))
+
+
+def filter_topics(filters: Dict) -> List[str]:
+    return [str(t).strip().lower() for t in filters.get('legal_topics', [])]
+
+
+def filter_sections(filters: Dict) -> List[str]:
+    out = []
+    for s in filters.get('sections', []):
+        if s is None:
+            continue
+        fs = _NON_ALNUM_RE.sub('', str(s).lower())
+        if fs:
+            out.append(fs)
+    return out
+
+
+def filter_acts(filters: Dict) -> List[str]:
+    return [str(a).strip().lower() for a in filters.get('acts', []) if a is not None]
+
+
+def doc_matches_filters(doc: Document, filters: Dict) -> bool:
+    """
+    Evaluate filters against one document's own metadata.
+    By default a document is kept if it matches ANY provided filter (OR);
+    "match_any_filter": False requires all of them to match (AND).
+    """
+    match_results = []
+
+    # document_type (exact match)
+    if 'document_type' in filters:
+        match_results.append(doc.metadata.get('document_type') == filters['document_type'])
+
+    # legal_topics (any overlap)
+    if 'legal_topics' in filters:
+        match_results.append(bool(set(to_list(doc.metadata.get('legal_topics', []))) & set(filter_topics(filters))))
+
+    # sections (normalized exact tokens)
+    if 'sections' in filters:
+        doc_sections = document_sections(doc)
+        fsecs = filter_sections(filters)
+        match_results.append(any(fs == ds for fs in fsecs for ds in doc_sections) if fsecs else False)
+
+    # acts (substring / token match)
+    if 'acts' in filters:
+        doc_acts_list = document_acts(doc)
+        doc_acts_text = " ".join(doc_acts_list)
+        match_results.append(any(
+            fa in doc_acts_text or any(fa in a for a in doc_acts_list) for fa in filter_acts(filters)
+        ))
+
+    # If no specific filter keys were present, keep doc
+    if not match_results:
+        return True
+    return any(match_results) if bool(filters.get("match_any_filter", True)) else all(match_results)
+
+
+def _value_key(v):
+    """Hashable key for a metadata value, or None if it should not be memoized"""
+    if isinstance(v, (list, tuple)):
+        try:
+            return (type(v), tuple(v))
+        except TypeError:
+            return None
+    if isinstance(v, str):
+        return v
+    return None
+
+
+class MetadataIndex:
+    def __init__(self, documents: List[Document]):
+        self.size = len(documents)
+        self._nbytes = (self.size + 7) // 8
+        self._by_object: Dict[int, int] = {}
+        self._by_chunk_id: Dict[str, int] = {}
+        self._chunk_ids: List[Optional[str]] = []
+        self._documents = documents  # keeps the objects alive so their ids stay valid
+        # A ChunkStore hands out new objects on every access, so only chunk IDs identify its chunks
+        track_objects = isinstance(documents, list)
+
+        doc_types: Dict = {}
+        topics: Dict[str, array] = {}
+        sections: Dict[str, array] = {}
+        act_texts: Dict[str, array] = {}
+
+        # The aggregated per-document lists are the same (and long) on every chunk of a
+        # file: normalize each distinct list once and post its tokens per group of chunks
+        agg_sections: Dict = {}
+        agg_section_groups: Dict = {}
+        agg_acts: Dict = {}
+        act_text_cache: Dict = {}
+
+        for pos, doc in enumerate(documents):
+            meta = doc.metadata
+            if track_objects:
+                self._by_object[id(doc)] = pos
+            chunk_id = meta.get("chunk_id")
+            if chunk_id is not None:
+                self._by_chunk_id.setdefault(str(chunk_id), pos)
+            self._chunk_ids.append(str(chunk_id) if chunk_id is not None else None)
+
+            doc_type = meta.get('document_type')
+            try:
+                doc_types.setdefault(doc_type, array("q")).append(pos)
+            except TypeError:
+                pass  # unhashable type: never equal to a filter value anyway
+            for topic in set(to_list(meta.get('legal_topics', []))):
+                topics.setdefault(topic, array("q")).append(pos)
+
+            # Sections: as a set, document_sections() is the union of the page-level
+            # and aggregated tokens; single-character tokens depend on the chunk text
+            content = getattr(doc, "page_content", None)
+            raw_page = meta.get('extracted_sections_norm') or meta.get('extracted_sections') or []
+            page_tokens = set(normalize_section_tokens(to_list(raw_page), content))
+            raw_agg = meta.get('aggregated_extracted_sections_norm') or []
+            agg_key = _value_key(raw_agg)
+            if agg_key is None:
+                page_tokens.update(normalize_section_tokens(to_list(raw_agg), content))
+            else:
+                if agg_key not in agg_sections:
+                    tokens = set(_section_token(t) for t in to_list(raw_agg))
+                    tokens.discard('')
+                    agg_sections[agg_key] = (
+                        frozenset(t for t in tokens if len(t) >= 2),
+                        [t for t in tokens if len(t) == 1],
+                    )
+                group_tokens, single_chars = agg_sections[agg_key]
+                agg_section_groups.setdefault(agg_key, array("q")).append(pos)
+                page_tokens.difference_update(group_tokens)
+                if single_chars:
+                    page_tokens.update(normalize_section_tokens(single_chars, content))
+            for section in page_tokens:
+                sections.setdefault(section, array("q")).append(pos)
+
+            # Acts: the joined act text of the chunk
+            raw_page = meta.get('extracted_acts_norm') or meta.get('extracted_acts') or []
+            raw_agg = meta.get('aggregated_extracted_acts_norm') or []
+            page_key, agg_key = _value_key(raw_page), _value_key(raw_agg)
+            if page_key is None or agg_key is None:
+                text = " ".join(document_acts(doc))
+            else:
+                text = act_text_cache.get((page_key, agg_key))
+                if text is None:
+                    if agg_key not in agg_acts:
+                        agg_acts[agg_key] = to_list(raw_agg)
+                    text = " ".join(dict.fromkeys(to_list(raw_page) + agg_acts[agg_key]))
+                    act_text_cache[(page_key, agg_key)] = text
+            act_texts.setdefault(text, array("q")).append(pos)
+
+        for agg_key, positions in agg_section_groups.items():
+            for section in agg_sections[agg_key][0]:
+                sections.setdefault(section, array("q")).extend(positions)
+
+        self._doc_types = self._pack_all(doc_types)
+        self._topics = self._pack_all(topics)
+        self._sections = self._pack_all(sections)
+        self._act_texts = self._pack_all(act_texts)
+        self._act_cache: Dict[str, np.ndarray] = {}
+
+    def _pack_all(self, postings: Dict) -> Dict:
+        packed = {}
+        for key, positions in postings.items():
+            bits = np.zeros(self.size, dtype=bool)
+            bits[np.frombuffer(positions, dtype=np.int64)] = True
+            packed[key] = np.packbits(bits)
+        return packed
+
+    def _empty(self) -> np.ndarray:
+        return np.zeros(self._nbytes, dtype=np.uint8)
+
+    def _union(self, table: Dict, keys: Iterable) -> np.ndarray:
+        mask = self._empty()
+        for key in keys:
+            bits = table.get(key)
+            if bits is not None:
+                np.bitwise_or(mask, bits, out=mask)
+        return mask
+
+    def _act_bits(self, fa: str) -> np.ndarray:
+        # Acts match by substring, so resolve each filter string against the distinct
+        # act texts once and keep the resulting bitmap
+        bits = self._act_cache.get(fa)
+        if bits is None:
+            bits = self._union(self._act_texts, [text for text in self._act_texts if fa in text])
+            if len(self._act_cache) >= _ACT_CACHE_SIZE:
+                self._act_cache.clear()
+            self._act_cache[fa] = bits
+        return bits
+
+    def mask(self, filters: Dict) -> Optional[np.ndarray]:
+        """Packed bitmap of the chunks the filters keep, or None when no filter key is present"""
+        parts = []
+        if 'document_type' in filters:
+            try:
+                parts.append(self._doc_types.get(filters['document_type'], self._empty()))
+            except TypeError:
+                parts.append(self._empty())
+        if 'legal_topics' in filters:
+            parts.append(self._union(self._topics, filter_topics(filters)))
+        if 'sections' in filters:
+            parts.append(self._union(self._sections, filter_sections(filters)))
+        if 'acts' in filters:
+            acts = self._empty()
+            for fa in filter_acts(filters):
+                np.bitwise_or(acts, self._act_bits(fa), out=acts)
+            parts.append(acts)
+        if not parts:
+            return None
+
+        combine = np.bitwise_or if bool(filters.get("match_any_filter", True)) else np.bitwise_and
+        mask = parts[0].copy()
+        for part in parts[1:]:
+            combine(mask, part, out=mask)
+        return mask
+
+    def allowed(self, filters: Dict) -> Optional[np.ndarray]:
+        """Boolean array over chunk positions the filters keep, or None when no filter key is present"""
+        mask = self.mask(filters)
+        if mask is None:
+            return None
+        return np.unpackbits(mask, count=self.size).astype(bool)
+
+    def chunk_ids(self, allowed: np.ndarray) -> Optional[List[str]]:
+        """Chunk IDs of the allowed chunks, or None if some of them have no ID"""
+        ids = [self._chunk_ids[pos] for pos in np.flatnonzero(allowed).tolist()]
+        return None if any(i is None for i in ids) else ids
+
+    def position(self, doc: Document) -> Optional[int]:
+        pos = self._by_object.get(id(doc))
+        if pos is not None and self._documents[pos] is doc:
+            return pos
+        chunk_id = (doc.metadata or {}).get("chunk_id")
+        return self.chunk_position(chunk_id) if chunk_id is not None else None
+
+    def chunk_position(self, chunk_id) -> Optional[int]:
+        return self._by_chunk_id.get(str(chunk_id))
+
+    def keeps(self, positions: List[int], filters: Dict) -> List[bool]:
+        """Per chunk position: whether the filters keep it"""
+        mask = self.mask(filters)
+        if mask is None:
+            return [True] * len(positions)
+        pos = np.asarray(positions, dtype=np.int64)
+        return ((mask[pos >> 3] >> (7 - (pos & 7))) & 1).astype(bool).tolist()
+
+    def matches(self, docs: List[Document], filters: Dict) -> List[Optional[bool]]:
+        """Per document: whether the filters keep it, or None if it is not in the index"""
+        positions = [self.position(d) for d in docs]
+        hits = iter(self.keeps([p for p in positions if p is not None], filters))
+        return [next(hits) if p is not None else None for p in positions]
@@ -0,0 +1,197 @@
+"""
+Cache of query embeddings shared by retrieval, reranking and tools.
+
+One question used to be embedded several times per request (OpenAI for the
+Chroma search, SBERT in rerank, OpenAI again for every tool that builds its
+own vectorstore retriever) and again on every repeat of a popular question.
+Query embeddings now go through one cache keyed by (embedding model,
+normalized query text):
+
+- L1: in-process LRU with a TTL, bounded by QUERY_EMBEDDING_CACHE_SIZE
+- L2: optional Redis (the shared redis_cache connection), so workers and
+  restarts reuse each other's embeddings; entries expire after the same TTL
+
+Normalization (Unicode NFKC, case folding, collapsed whitespace, trailing
+punctuation dropped) makes near-identical questions share an entry. On a miss
+the query is embedded as the user typed it.
+
+Hit and miss counters are exposed through stats() (GET /api/cache/query-embeddings).
+"""
+
+import base64
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import settings
+
+REDIS_KEY_PREFIX = "qemb:"
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_TRAILING_PUNCT_RE = re.compile(r'[\s?!.;:,]+$')
+
+
+def normalize_query(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _TRAILING_PUNCT_RE.sub("", _WHITESPACE_RE.sub(" ", text).strip())
+
+
+def embeddings_model(embeddings: Any) -> str:
+    """Provider model behind an embeddings wrapper chain (CachedEmbeddings -> BatchedEmbeddings -> OpenAIEmbeddings)"""
+    seen = set()
+    while embeddings is not None and id(embeddings) not in seen:
+        seen.add(id(embeddings))
+        model = getattr(embeddings, "model", None)
+        if isinstance(model, str) and model:
+            return model
+        embeddings = getattr(embeddings, "embeddings", None)
+    return "unknown"
+
+
+class QueryEmbeddingCache:
+    """Two-level (LRU + optional Redis) cache of query embeddings"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, use_redis: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(model: str, text: str) -> str:
+        digest = hashlib.sha256(f"{model}\n{normalize_query(text)}".encode("utf-8")).hexdigest()
+        return REDIS_KEY_PREFIX + digest
+
+    def _redis(self):
+        if not self.use_redis:
+            return None
+        try:
+            from redis_cache.redis_cache import cache
+        except Exception:
+            return None
+        return cache.client
+
+    def _get_local(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, vector = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def _put_local(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_redis(self, key: str) -> Optional[np.ndarray]:
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            raw = client.get(key)
+            if raw is None:
+                return None
+            dtype, data = raw.split(":", 1)
+            return np.frombuffer(base64.b64decode(data), dtype=dtype)
+        except Exception as e:
+            print(f"Warning: query embedding cache read from Redis failed: {e}")
+            return None
+
+    def _put_redis(self, key: str, vector: np.ndarray):
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            payload = f"{vector.dtype.str}:{base64.b64encode(vector.tobytes()).decode('ascii')}"
+            client.setex(key, self.ttl_seconds, payload)
+        except Exception as e:
+            print(f"Warning: query embedding cache write to Redis failed: {e}")
+
+    def get_or_embed(self, model: str, text: str, embed: Callable[[str], Any]) -> np.ndarray:
+        """Cached embedding of text under model, computing it with embed(text) on a miss"""
+        if self.max_entries <= 0:
+            return np.asarray(embed(text))
+        key = self.key_for(model, text)
+        vector = self._get_local(key)
+        if vector is not None:
+            with self._lock:
+                self.hits += 1
+            return vector
+
+        vector = self._get_redis(key)
+        if vector is not None:
+            with self._lock:
+                self.redis_hits += 1
+            self._put_local(key, vector)
+            return vector
+
+        vector = np.asarray(embed(text))
+        vector.setflags(write=False)
+        with self._lock:
+            self.misses += 1
+        self._put_local(key, vector)
+        self._put_redis(key, vector)
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.redis_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.redis_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "redis_enabled": self._redis() is not None,
+                "hits": self.hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": ((self.hits + self.redis_hits) / lookups) if lookups else 0.0,
+            }
+
+
+class QueryCachedEmbeddings(Embeddings):
+    """Embeddings wrapper whose embed_query goes through the shared query-embedding cache"""
+
+    def __init__(self, embeddings: Embeddings, cache: Optional[QueryEmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.cache = cache or query_embedding_cache
+        self.model = embeddings_model(embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.cache.get_or_embed(self.model, text, self.embeddings.embed_query).tolist()
+
+
+def with_query_cache(embeddings: Embeddings) -> QueryCachedEmbeddings:
+    return QueryCachedEmbeddings(embeddings)
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    max_entries=settings.query_embedding_cache_size,
+    ttl_seconds=settings.query_embedding_cache_ttl_seconds,
+    use_redis=settings.query_embedding_cache_redis
+)
@@ -0,0 +1,204 @@
+"""
+Precomputed SBERT embeddings of every chunk for the reranker.
+
+The reranker used to encode each candidate's text with the SBERT model on
+every request. Instead, all chunks are encoded once (when the reranker is first
+loaded) into an L2-normalized float32 matrix that is persisted next to the
+Chroma store and memory-mapped afterwards, so at query time only the query is
+encoded and candidate similarities are a dot product against looked-up rows.
+
+Rows are keyed by chunk ID. Each row also records a digest of the text it was
+computed from, so after re-ingestion the rows of unchanged chunks are reused
+and only new or changed chunks are encoded before the matrix is rewritten.
+
+Layout (<persist_dir>/rerank_embeddings/):
+    meta.json       -> {"version", "model", "dim", "max_chars", "count"}
+    chunk_ids.json  -> [chunk_id of each row]
+    digests.npy     -> uint8 [count, 16], blake2b of the embedded text
+    vectors.npy     -> float32 [count, dim], L2-normalized
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+
+EMBEDDINGS_VERSION = 1
+EMBEDDINGS_DIRNAME = "rerank_embeddings"
+
+# Prefix of the chunk text the reranker embeds
+RERANK_TEXT_CHARS = 1500
+
+ENCODE_BATCH_SIZE = 64
+DIGEST_SIZE = 16
+
+
+def embeddings_dir(persist_dir: str) -> str:
+    return os.path.join(persist_dir, EMBEDDINGS_DIRNAME)
+
+
+def rerank_text(doc: Document) -> str:
+    return (getattr(doc, "page_content", "") or "")[:RERANK_TEXT_CHARS]
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+def normalize(vectors) -> np.ndarray:
+    """L2-normalize rows as float32; zero vectors stay zero (cosine 0 against anything)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def encode(model, texts: List[str]) -> np.ndarray:
+    """Normalized embeddings of texts with a SentenceTransformer-like model"""
+    return normalize(model.encode(texts, convert_to_numpy=True, batch_size=ENCODE_BATCH_SIZE))
+
+
+class RerankEmbeddings:
+    """Normalized chunk embeddings, memory-mapped from disk or held in memory"""
+
+    def __init__(self, path: Optional[str], model_name: str, chunk_ids: List[str], digests: np.ndarray, vectors: np.ndarray):
+        self.path = path
+        self.model_name = model_name
+        self.chunk_ids = chunk_ids
+        self.digests = digests
+        self.vectors = vectors
+        self._rows: Dict[str, int] = {cid: i for i, cid in enumerate(chunk_ids)}
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1])
+
+    def row(self, chunk_id: Optional[str]) -> int:
+        return self._rows.get(chunk_id, -1) if chunk_id is not None else -1
+
+    def rows(self, docs: List[Document]) -> np.ndarray:
+        """Row of each document's chunk ID, -1 where it has no precomputed embedding"""
+        return np.fromiter(
+            (self.row((getattr(d, "metadata", None) or {}).get("chunk_id")) for d in docs),
+            dtype=np.int64, count=len(docs)
+        )
+
+    @classmethod
+    def load(cls, persist_dir: str, model_name: str) -> Optional["RerankEmbeddings"]:
+        """Memory-map the persisted embeddings if they were computed with model_name, else None"""
+        path = embeddings_dir(persist_dir)
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if meta.get("version") != EMBEDDINGS_VERSION:
+                print(f"Rerank embeddings version {meta.get('version')} is not supported, ignoring them")
+                return None
+            if meta.get("model") != model_name or meta.get("max_chars") != RERANK_TEXT_CHARS:
+                print("Rerank embeddings were computed with a different model or text length, ignoring them")
+                return None
+            with open(os.path.join(path, "chunk_ids.json"), "r") as f:
+                chunk_ids = json.load(f)
+            digests = np.load(os.path.join(path, "digests.npy"), mmap_mode="r")
+            vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+            if not (len(chunk_ids) == len(digests) == len(vectors) == meta.get("count")):
+                print("Rerank embeddings are inconsistent, ignoring them")
+                return None
+            return cls(path, model_name, chunk_ids, digests, vectors)
+        except Exception as e:
+            print(f"Error loading rerank embeddings: {e}")
+            return None
+
+    def save(self, persist_dir: str):
+        final_dir = embeddings_dir(persist_dir)
+        tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            np.save(os.path.join(tmp_dir, "digests.npy"), np.ascontiguousarray(self.digests, dtype=np.uint8))
+            np.save(os.path.join(tmp_dir, "vectors.npy"), np.ascontiguousarray(self.vectors, dtype=np.float32))
+            with open(os.path.join(tmp_dir, "chunk_ids.json"), "w") as f:
+                json.dump(self.chunk_ids, f)
+            meta = {
+                "version": EMBEDDINGS_VERSION,
+                "model": self.model_name,
+                "dim": self.dim,
+                "max_chars": RERANK_TEXT_CHARS,
+                "count": len(self),
+            }
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump(meta, f)
+
+            # Same directory swap as the BM25 index: readers of the old files keep their mapping
+            old_dir = f"{final_dir}.old-{os.getpid()}"
+            if os.path.exists(final_dir):
+                os.replace(final_dir, old_dir)
+            os.replace(tmp_dir, final_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+
+def load_or_build(persist_dir: Optional[str], docs: List[Document], model, model_name: str) -> Optional[RerankEmbeddings]:
+    """
+    Embeddings for every chunk in docs that has a chunk ID. Rows persisted for
+    the same chunk ID and text are reused; the rest are encoded with model and,
+    if anything changed, the matrix is rewritten and memory-mapped again.
+    Without a persist_dir the embeddings are only kept in memory.
+    """
+    keyed = {}
+    for d in docs or []:
+        chunk_id = (d.metadata or {}).get("chunk_id")
+        if chunk_id is not None:
+            keyed.setdefault(str(chunk_id), d)
+    if not keyed:
+        return None
+
+    existing = RerankEmbeddings.load(persist_dir, model_name) if persist_dir else None
+    chunk_ids = list(keyed)
+    digests = np.frombuffer(b"".join(_digest(rerank_text(keyed[c])) for c in chunk_ids), dtype=np.uint8)
+    digests = digests.reshape(len(chunk_ids), DIGEST_SIZE)
+
+    reuse = np.full(len(chunk_ids), -1, dtype=np.int64)
+    if existing is not None:
+        rows = np.fromiter((existing.row(c) for c in chunk_ids), dtype=np.int64, count=len(chunk_ids))
+        known = rows >= 0
+        same = np.zeros(len(chunk_ids), dtype=bool)
+        same[known] = (np.asarray(existing.digests[rows[known]]) == digests[known]).all(axis=1)
+        reuse[same] = rows[same]
+        if same.all() and len(existing) == len(chunk_ids):
+            print(f"Memory-mapped rerank embeddings for {len(existing)} chunks from {existing.path}")
+            return existing
+
+    missing = np.flatnonzero(reuse < 0)
+    print(f"Computing rerank embeddings for {len(missing)} of {len(chunk_ids)} chunks")
+    fresh = encode(model, [rerank_text(keyed[chunk_ids[i]]) for i in missing]) if len(missing) else None
+    dim = fresh.shape[1] if fresh is not None else existing.dim
+    vectors = np.empty((len(chunk_ids), dim), dtype=np.float32)
+    kept = np.flatnonzero(reuse >= 0)
+    if len(kept):
+        vectors[kept] = existing.vectors[reuse[kept]]
+    if fresh is not None:
+        vectors[missing] = fresh
+
+    embeddings = RerankEmbeddings(None, model_name, chunk_ids, digests, vectors)
+    if not persist_dir:
+        return embeddings
+    try:
+        embeddings.save(persist_dir)
+        print(f"Saved rerank embeddings for {len(embeddings)} chunks to {embeddings_dir(persist_dir)}")
+        return RerankEmbeddings.load(persist_dir, model_name) or embeddings
+    except Exception as e:
+        print(f"Error saving rerank embeddings: {e}")
+        return embeddings
@@ -0,0 +1,164 @@
+"""
+Precomputed heuristic features for the reranker.
+
+The heuristic half of the rerank score used to be recomputed per candidate in
+Python on every request: a regex search for a section reference, a document
+type check and a substring test per query word. The query-independent parts
+are now computed once per chunk when the retriever is created:
+
+- section_ref: the chunk text mentions "section <number>"
+- criminal_doc: document_type is a criminal or procedure code
+
+and query-word overlap is read from the BM25 index instead of the text: the
+vocabulary is folded (lowercased, surrounding punctuation stripped) into a
+map from folded word to term ids, so each query word becomes a binary search
+of the candidates' chunk positions in its (ascending) postings. A rerank then
+scores all candidates with a few array operations over their positions; the
+whole-query phrase test still reads the text, but only of candidates that
+contain the query's inner words as tokens.
+
+Candidates the index does not know (no position in the loaded chunk list)
+are scored one by one from their own text with the same rules.
+"""
+
+import re
+import string
+from collections import Counter
+from typing import Dict, List, Set
+
+import numpy as np
+from langchain.schema import Document
+
+SECTION_REF_RE = re.compile(r'section\s+\d+', re.IGNORECASE)
+CRIMINAL_DOC_TYPES = ('criminal_code', 'procedure_code')
+CRIMINAL_QUERY_WORDS = ('criminal', 'police', 'arrest', 'bail')
+
+# Score contributions (unchanged from the per-document scorer)
+PHRASE_WEIGHT = 2.0
+WORD_OVERLAP_WEIGHT = 1.5
+SECTION_REF_WEIGHT = 0.5
+CRIMINAL_DOC_WEIGHT = 0.8
+
+
+def fold_token(token: str) -> str:
+    """Token as compared for query-word overlap: lowercased, surrounding punctuation stripped"""
+    return token.lower().strip(string.punctuation)
+
+
+def token_set(text: str) -> Set[str]:
+    """Folded whitespace tokens of a text (the BM25 tokenization, folded)"""
+    return {t for t in (fold_token(tok) for tok in (text or "").split()) if t}
+
+
+def is_criminal_query(query_lower: str) -> bool:
+    return any(word in query_lower for word in CRIMINAL_QUERY_WORDS)
+
+
+def heuristic_score(doc: Document, query: str) -> float:
+    """Heuristic relevance of a single document, computed from its text"""
+    content = (doc.page_content or "").lower()
+    query_lower = query.lower()
+    score = PHRASE_WEIGHT if query_lower in content else 0.0
+
+    query_words = [fold_token(w) for w in query_lower.split()]
+    if query_words:
+        tokens = token_set(content)
+        score += sum(1 for w in query_words if w in tokens) / len(query_words) * WORD_OVERLAP_WEIGHT
+
+    if SECTION_REF_RE.search(content):
+        score += SECTION_REF_WEIGHT
+    if (doc.metadata or {}).get('document_type', '') in CRIMINAL_DOC_TYPES and is_criminal_query(query_lower):
+        score += CRIMINAL_DOC_WEIGHT
+    return score
+
+
+class RerankFeatures:
+    """Per-chunk heuristic features, aligned with the loaded chunk list"""
+
+    def __init__(self, documents: List[Document], metadata_index=None, bm25_index=None):
+        self.metadata_index = metadata_index
+        self.section_ref = np.fromiter(
+            (SECTION_REF_RE.search(d.page_content or "") is not None for d in documents),
+            dtype=bool, count=len(documents)
+        )
+        self.criminal_doc = np.fromiter(
+            ((d.metadata or {}).get('document_type', '') in CRIMINAL_DOC_TYPES for d in documents),
+            dtype=bool, count=len(documents)
+        )
+
+        # Folded word -> ids of the BM25 terms it covers (e.g. "bail" -> "Bail", "bail,", "bail.")
+        self._bm25_index = None
+        self._folded_terms: Dict[str, np.ndarray] = {}
+        if bm25_index is not None and bm25_index.doc_count == len(documents):
+            folded: Dict[str, List[int]] = {}
+            for term_id, term in enumerate(bm25_index.terms()):
+                key = fold_token(term)
+                if key:
+                    folded.setdefault(key, []).append(term_id)
+            self._folded_terms = {k: np.array(v, dtype=np.int64) for k, v in folded.items()}
+            self._bm25_index = bm25_index
+
+    def positions(self, docs: List[Document]) -> np.ndarray:
+        """Chunk position of each document, -1 where the index does not know it"""
+        if self.metadata_index is None:
+            return np.full(len(docs), -1, dtype=np.int64)
+        return np.fromiter(
+            (p if p is not None else -1 for p in (self.metadata_index.position(d) for d in docs)),
+            dtype=np.int64, count=len(docs)
+        )
+
+    def _word_presence(self, word: str, positions: np.ndarray) -> np.ndarray:
+        """Boolean mask over the given chunk positions: the chunk contains the folded word as a token"""
+        index = self._bm25_index
+        present = np.zeros(len(positions), dtype=bool)
+        term_ids = self._folded_terms.get(word)
+        if term_ids is None or not len(positions):
+            return present
+        ptr = index.postings_ptr
+        for t in term_ids:
+            # Postings of a term are in ascending chunk order, so look the candidates up in the slice
+            postings = index.postings_doc[ptr[t]:ptr[t + 1]]
+            at = np.searchsorted(postings, positions)
+            inside = at < len(postings)
+            present[inside] |= postings[at[inside]] == positions[inside]
+        return present
+
+    def scores(self, docs: List[Document], query: str) -> np.ndarray:
+        """Heuristic relevance of every document for the query (same rules as heuristic_score)"""
+        scores = np.zeros(len(docs), dtype=np.float64)
+        if not docs:
+            return scores
+        query_lower = query.lower()
+        raw_words = query_lower.split()
+        query_words = [fold_token(w) for w in raw_words]
+        positions = self.positions(docs)
+        if self._bm25_index is None:
+            positions[:] = -1
+        known = np.flatnonzero(positions >= 0)
+        pos = positions[known]
+
+        # Which known candidates contain each distinct query word as a token
+        presence = {word: self._word_presence(word, pos) for word in set(query_words)}
+
+        # Whole-query phrase test. Words inside the phrase are whitespace-delimited,
+        # so they must be tokens of any chunk containing it; only chunks that have
+        # all of them get the (per-candidate) substring test
+        maybe_phrase = np.ones(len(known), dtype=bool)
+        for word in {fold_token(w) for w in raw_words[1:-1]} - {""}:
+            maybe_phrase &= presence[word]
+        for i in known[maybe_phrase]:
+            if query_lower in (docs[i].page_content or "").lower():
+                scores[i] += PHRASE_WEIGHT
+
+        if query_words and len(known):
+            matches = np.zeros(len(known), dtype=np.float64)
+            for word, repeats in Counter(query_words).items():
+                matches += repeats * presence[word]
+            scores[known] += matches / len(query_words) * WORD_OVERLAP_WEIGHT
+        scores[known] += SECTION_REF_WEIGHT * self.section_ref[pos]
+        if is_criminal_query(query_lower):
+            scores[known] += CRIMINAL_DOC_WEIGHT * self.criminal_doc[pos]
+
+        for i in np.flatnonzero(positions < 0):
+            scores[i] = heuristic_score(docs[i], query)
+        return scores
@@ -0,0 +1,85 @@
+"""
+CPU inference backends for the SBERT reranker model.
+
+Full-precision PyTorch inference of all-MiniLM-L6-v2 is the largest CPU cost
+of a request, so the same model can be loaded through a cheaper runtime,
+selected with RERANK_BACKEND:
+
+    torch       full-precision PyTorch SentenceTransformer (default)
+    torch-int8  the same model with its Linear layers dynamically quantized to
+                int8 (torch.quantization.quantize_dynamic); no extra packages
+    onnx        the model's ONNX export run by onnxruntime
+    onnx-int8   an int8-quantized ONNX export from the model repo
+                (RERANK_ONNX_FILE, default onnx/model_quint8_avx2.onnx)
+
+The ONNX backends need sentence-transformers>=3.2 with its onnx extra
+(pip install "sentence-transformers[onnx]"). Every backend is a
+SentenceTransformer, so callers keep using encode().
+
+The optional cross-encoder second stage is loaded here too, optionally with
+the same dynamic int8 quantization.
+
+Tolerance: per text, the normalized embedding of any backend has a cosine
+similarity of at least MIN_COSINE_TO_REFERENCE with the torch backend's, and
+query-chunk similarities move by at most MAX_SIMILARITY_DRIFT (the onnx
+backend agrees to float32 precision; the int8 backends account for the
+bound). benchmarks/bench_reranker_backends.py measures both, along with
+throughput, on the local CPU.
+"""
+
+from typing import Optional
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+DEFAULT_BACKEND = "torch"
+DEFAULT_ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+MIN_COSINE_TO_REFERENCE = 0.99
+MAX_SIMILARITY_DRIFT = 0.03
+
+
+def backend_key(model_name: str, backend: str, onnx_file: Optional[str] = None) -> str:
+    """
+    Identifies the embeddings a backend produces, e.g. to key precomputed chunk
+    embeddings. The full-precision backend keeps the bare model name.
+    """
+    if backend == DEFAULT_BACKEND:
+        return model_name
+    if backend == "onnx-int8":
+        return f"{model_name}@{backend}:{onnx_file or DEFAULT_ONNX_INT8_FILE}"
+    return f"{model_name}@{backend}"
+
+
+def load_reranker(model_name: str, backend: str = DEFAULT_BACKEND, onnx_file: Optional[str] = None):
+    """Load model_name as a SentenceTransformer running on the given backend"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown reranker backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    if backend == "torch-int8":
+        import torch
+        # Dynamic quantization: int8 weights, activations quantized on the fly (CPU only)
+        model = SentenceTransformer(model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    model_kwargs = {"file_name": onnx_file or DEFAULT_ONNX_INT8_FILE} if backend == "onnx-int8" else None
+    try:
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+    except TypeError as e:
+        raise RuntimeError(
+            "ONNX reranker backends need sentence-transformers>=3.2 "
+            "(pip install \"sentence-transformers[onnx]\")"
+        ) from e
+
+
+def load_cross_encoder(model_name: str, quantize: bool = False):
+    """Load a sentence-transformers CrossEncoder for CPU inference"""
+    from sentence_transformers import CrossEncoder
+
+    model = CrossEncoder(model_name, device="cpu")
+    if quantize:
+        import torch
+        model.model = torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
@@ -1,27 +1,189 @@
 from pathlib import Path
 import re
+import threading
+import time
 import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from langchain.retrievers import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
+from langchain_community.retrievers.bm25 import default_preprocessing_func
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.pydantic_v1 import Field
+from langchain_core.retrievers import BaseRetriever
 from langchain.schema import Document
-from typing import List, Dict, Optional, Any
+from typing import Callable, List, Dict, Optional, Any, Tuple
 import numpy as np
+from scipy.sparse import csr_matrix
 from sentence_transformers import SentenceTransformer
 
+from chain import rerank_embeddings, reranker_backends
+from chain.query_embedding_cache import query_embedding_cache
+from chain.bm25_index import BM25Index
+from chain.metadata_index import MetadataIndex, doc_matches_filters
+from chain.rerank_features import RerankFeatures
+from chain.section_index import SectionPageIndex
+from chain.citation_index import CitationIndex
+from chain.cross_reference_index import CrossReferenceIndex
+from chain.chunk_store import ChunkStore
 from chain.loader import vectorstore
+from config.settings import settings
 
 RERANK_MODEL_NAME = "all-MiniLM-L6-v2"
+# Pairs per cross-encoder call; the time budget is checked between batches
+CROSS_ENCODER_BATCH_SIZE = 8
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, selected with np.argpartition.
+    Ties are broken by position, as a stable descending sort would.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        # Everything above the k-th best score, then the earliest entries tied with it
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:k - len(above)]
+        top = np.concatenate([above, tied])
+    else:
+        top = np.arange(n)
+    return top[np.lexsort((top, -scores[top]))]
+
+def fuse_rerank_scores(sem_sims: np.ndarray, heur_scores: np.ndarray, alpha: float) -> np.ndarray:
+    """alpha * semantic similarity + (1 - alpha) * min-max normalized heuristic score"""
+    spread = heur_scores.max() - heur_scores.min() if len(heur_scores) else 0.0
+    if spread > 1e-6:
+        heur_norm = (heur_scores - heur_scores.min()) / spread
+    else:
+        heur_norm = np.zeros(len(heur_scores))
+    return alpha * sem_sims + (1.0 - alpha) * heur_norm
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[List[Tuple[int, float]]], weights: List[float], c: int
+) -> List[Tuple[int, float]]:
+    """
+    Weighted Reciprocal Rank Fusion of ranked (chunk position, score) lists, as
+    EnsembleRetriever.weighted_reciprocal_rank does it for Documents: each
+    position scores sum(weight / (rank + c)); returns (position, fused score),
+    best first, ties in order of first appearance.
+    """
+    fused: Dict[int, float] = {}
+    for ranked, weight in zip(ranked_lists, weights):
+        for rank, (pos, _) in enumerate(ranked, start=1):
+            fused[pos] = fused.get(pos, 0.0) + weight / (rank + c)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+class SparseBM25Retriever(BaseRetriever):
+    """
+    Okapi BM25 over a CSR term x chunk matrix of term frequencies.
+
+    A query only touches the rows of its own terms: their postings are scored in
+    one vectorized pass, summed per chunk with np.bincount and the top k picked
+    with np.argpartition, instead of scoring every chunk in Python per query term
+    like rank_bm25. Scores are the same as BM25Okapi's; ties are broken by chunk
+    order.
+    """
+
+    index: Any
+    """ BM25Index (memory-mapped or in memory) the matrix is read from."""
+    docs: Any = Field(repr=False)
+    """ Chunks in index order (a list of Documents or a ChunkStore)."""
+    tf_matrix: Any = Field(repr=False)
+    """ CSR term x chunk matrix of term frequencies."""
+    doc_norm: Any = Field(repr=False)
+    """ Per-chunk length normalization k1 * (1 - b + b * len / avgdl)."""
+    k: int = 4
+    """ Number of documents to return."""
+    preprocess_func: Callable[[str], List[str]] = default_preprocessing_func
+    """ Tokenizer; must match the one the index was built with."""
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @classmethod
+    def from_index(cls, index: BM25Index, docs: List[Document], **kwargs) -> "SparseBM25Retriever":
+        if index.doc_count != len(docs):
+            raise ValueError(f"BM25 index holds {index.doc_count} chunks but {len(docs)} documents were given")
+        tf_matrix = csr_matrix(
+            (index.postings_tf, index.postings_doc, index.postings_ptr),
+            shape=(len(index.idf), index.doc_count),
+            copy=False
+        )
+        doc_norm = index.k1 * (1 - index.b + index.b * np.asarray(index.doc_len, dtype=np.float64) / index.avgdl)
+        return cls(index=index, docs=docs, tf_matrix=tf_matrix, doc_norm=doc_norm, **kwargs)
+
+    @classmethod
+    def from_documents(cls, documents: List[Document], **kwargs) -> "SparseBM25Retriever":
+        """Tokenize the chunks in process (when no persisted index is available)"""
+        return cls.from_index(BM25Index.from_documents(list(documents)), documents, **kwargs)
+
+    def get_scores(self, query: str, allowed: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        BM25 score of every chunk for the query. With a boolean `allowed` mask only
+        the postings of allowed chunks are scored; the others keep a score of 0.
+        """
+        term_counts = Counter(
+            t for t in (self.index.term_id(token) for token in self.preprocess_func(query)) if t is not None
+        )
+        if not term_counts:
+            return np.zeros(self.index.doc_count)
+
+        # A term repeated in the query counts once per occurrence, as in BM25Okapi
+        rows = np.fromiter(term_counts.keys(), dtype=np.int64, count=len(term_counts))
+        repeats = np.fromiter(term_counts.values(), dtype=np.float64, count=len(term_counts))
+        postings = self.tf_matrix[rows]
+        indices = postings.indices
+        tf = postings.data
+        row_weight = np.repeat(np.asarray(self.index.idf)[rows] * repeats, np.diff(postings.indptr))
+        if allowed is not None:
+            keep = allowed[indices]
+            indices, tf, row_weight = indices[keep], tf[keep], row_weight[keep]
+        tf = tf.astype(np.float64)
+        weights = row_weight * (tf * (self.index.k1 + 1) / (tf + self.doc_norm[indices]))
+        return np.bincount(indices, weights=weights, minlength=self.index.doc_count)
+
+    def search_positions(self, query: str, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """(chunk position, score) of the top k chunks, only among the `allowed` ones when a mask is given"""
+        scores = self.get_scores(query, allowed)
+        candidates = np.flatnonzero(allowed) if allowed is not None else np.arange(len(scores))
+        k = min(self.k, len(candidates))
+        if k <= 0:
+            return []
+        top = candidates[top_k_indices(scores[candidates], k)]
+        return list(zip(top.tolist(), scores[top].tolist()))
+
+    def search(self, query: str, allowed: Optional[np.ndarray] = None) -> List[Document]:
+        """Top k chunks for the query, only among the `allowed` ones when a mask is given"""
+        return [self.docs[i] for i, _ in self.search_positions(query, allowed)]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search(query)
 
 class LegalHybridRetriever:
-    def __init__(self, vectorstore, documents: List[Document]):
+    def __init__(self, vectorstore, documents: List[Document], bm25_index=None, persist_dir: Optional[str] = None):
         self.vectorstore = vectorstore
         self.documents = documents
+        self.persist_dir = persist_dir
         self._reranker_model = None
         self.reranker_model_name = RERANK_MODEL_NAME
+        self.reranker_backend = settings.rerank_backend
+        # Normalized SBERT embeddings of every chunk, loaded with the reranker
+        self._chunk_embeddings = None
+        # Optional second-stage cross-encoder over the top of the rerank output
+        self.cross_encoder_enabled = settings.cross_encoder_enabled
+        self._cross_encoder = None
 
         try:
-            # Create BM25 retriever for keyword-based search
-            self.bm25_retriever = BM25Retriever.from_documents(documents)
+            # Create BM25 retriever for keyword-based search; prefer the index
+            # persisted at ingestion over tokenizing the whole corpus again
+            if bm25_index is not None:
+                self.bm25_retriever = SparseBM25Retriever.from_index(bm25_index, documents)
+            else:
+                self.bm25_retriever = SparseBM25Retriever.from_documents(documents)
             self.has_bm25 = True
         except Exception as e:
             print(f"Warning: BM25 retriever not available: {e}")
@@ -41,6 +203,218 @@ class LegalHybridRetriever:
             # Fallback to just semantic retriever
             self.ensemble_retriever = self.semantic_retriever
 
+        try:
+            # Bitmap index over chunk metadata for evaluating filters
+            self.metadata_index = MetadataIndex(documents)
+        except Exception as e:
+            print(f"Warning: metadata index not available: {e}")
+            self.metadata_index = None
+
+        try:
+            # (source file, section) -> pages, for picking representative pages
+            self.section_index = SectionPageIndex(documents, self.metadata_index)
+        except Exception as e:
+            print(f"Warning: section page index not available: {e}")
+            self.section_index = SectionPageIndex([])
+
+        try:
+            # (act, section) -> chunks, for answering exact citations without retrieval
+            self.citation_index = CitationIndex(documents)
+        except Exception as e:
+            print(f"Warning: citation index not available: {e}")
+            self.citation_index = None
+
+        try:
+            # Chunk -> chunks of the sections it cites, and back
+            self.cross_reference_index = (
+                CrossReferenceIndex(documents, self.citation_index) if self.citation_index is not None else None
+            )
+        except Exception as e:
+            print(f"Warning: cross-reference index not available: {e}")
+            self.cross_reference_index = None
+
+        try:
+            # Query-independent heuristic features of every chunk for the reranker
+            self.rerank_features = RerankFeatures(
+                documents, self.metadata_index, self.bm25_retriever.index if self.has_bm25 else None
+            )
+        except Exception as e:
+            print(f"Warning: precomputed rerank features not available: {e}")
+            self.rerank_features = RerankFeatures([])
+
+        # retrieve_with_filters works on chunk positions until the final pages are
+        # picked; that needs the metadata index and the Chroma collection itself
+        self.lazy_hydration = self.metadata_index is not None and hasattr(vectorstore, "_collection")
+
+        # Runs the lexical and semantic legs of a query concurrently
+        self._fanout_workers = settings.retrieval_fanout_workers
+        self._fanout_pool = ThreadPoolExecutor(
+            max_workers=self._fanout_workers,
+            thread_name_prefix="retrieval"
+        )
+        # Legs still running after their deadline, each holding a pool thread
+        self._abandoned_legs = set()
+        self._abandoned_lock = threading.Lock()
+        # The cross-encoder scores on its own thread, so retrieval legs (including
+        # ones past their deadline) never hold up its budget
+        self._cross_encoder_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cross-encoder")
+        # Load the model now rather than inside the first request's budget
+        self._ensure_cross_encoder_loaded()
+
+    def _semantic_where(self, allowed: np.ndarray) -> Optional[Dict]:
+        """
+        Chroma where clause selecting the allowed chunks. Section, act and topic
+        lists are stored as joined strings Chroma cannot match on, so the filter is
+        pushed down as the chunk IDs it resolved to. Returns None (post-filter
+        instead) when every chunk is allowed, some lack an ID or the set is too large.
+        """
+        if allowed.all():
+            return None
+        ids = self.metadata_index.chunk_ids(allowed)
+        if ids is None or len(ids) > settings.retrieval_pushdown_max_ids:
+            return None
+        return {"chunk_id": {"$in": ids}}
+
+    def _retrieve_legs(self, query: str, allowed: Optional[np.ndarray] = None) -> Tuple[List[Document], List[Document]]:
+        """
+        Run BM25 and semantic retrieval concurrently and return (bm25_docs, semantic_docs).
+        The semantic leg waits on the query embedding call while BM25 is pure CPU,
+        so retrieval takes as long as the slower leg rather than both added up.
+        Each leg has its own deadline, counted from the start of the fan-out; a leg
+        that misses it or fails contributes no documents instead of failing the query.
+
+        `allowed` (boolean mask over chunk positions) pushes metadata filters down:
+        BM25 only scores allowed chunks and the semantic leg queries Chroma with a
+        matching where clause, so both return matching chunks instead of a fixed
+        candidate set that filtering may empty afterwards.
+        """
+        if allowed is not None and not allowed.any():
+            return [], []
+
+        bm25_call = self.bm25_retriever.get_relevant_documents if self.has_bm25 else None
+        semantic_call = self.semantic_retriever.get_relevant_documents
+        if allowed is not None:
+            if isinstance(self.bm25_retriever, SparseBM25Retriever):
+                bm25_call = lambda q: self.bm25_retriever.search(q, allowed=allowed)
+            where = self._semantic_where(allowed)
+            if where is not None:
+                search_kwargs = {**self.semantic_retriever.search_kwargs, "filter": where}
+                semantic_call = lambda q: self.vectorstore.similarity_search(q, **search_kwargs)
+
+        return self._fan_out(query, bm25_call, semantic_call)
+
+    def _retrieve_positions(
+        self, query: str, allowed: Optional[np.ndarray] = None
+    ) -> Optional[Tuple[List[Tuple[int, float]], List[Tuple[int, float]]]]:
+        """
+        _retrieve_legs without Documents: (bm25_hits, semantic_hits) as ranked
+        (chunk position, score) lists. Returns None when Chroma returns a chunk
+        that is not in the loaded chunk list (the index is out of date).
+        """
+        if allowed is not None and not allowed.any():
+            return [], []
+
+        bm25_call = (lambda q: self.bm25_retriever.search_positions(q, allowed)) if self.has_bm25 else None
+        where = self._semantic_where(allowed) if allowed is not None else None
+        bm25_hits, sem_hits = self._fan_out(query, bm25_call, lambda q: self._semantic_positions(q, where))
+        if sem_hits is None:
+            return None
+        return bm25_hits, sem_hits
+
+    def _semantic_positions(self, query: str, where: Optional[Dict] = None) -> Optional[List[Tuple[int, float]]]:
+        """
+        (chunk position, distance) of the semantic top k. Chroma is asked for IDs
+        and distances only, so no document text or metadata is read or
+        deserialized. None if an ID is not in the loaded chunk list.
+        """
+        k = self.semantic_retriever.search_kwargs.get("k", 4)
+        embeddings = getattr(self.vectorstore, "embeddings", None)
+        if embeddings is not None:
+            query_args = {"query_embeddings": [embeddings.embed_query(query)]}
+        else:
+            query_args = {"query_texts": [query]}
+        result = self.vectorstore._collection.query(n_results=k, where=where, include=["distances"], **query_args)
+
+        ids, distances = result["ids"][0], result["distances"][0]
+        positions = [self.metadata_index.chunk_position(i) for i in ids]
+        if any(p is None for p in positions):
+            return None
+        return list(zip(positions, distances))
+
+    def _fan_out(self, query: str, bm25_call: Optional[Callable], semantic_call: Callable) -> Tuple[Any, Any]:
+        """Run the two legs on the retrieval pool, each against its deadline; a failed or late leg yields []"""
+        start = time.monotonic()
+        legs = []
+        if self.has_bm25:
+            legs.append(("bm25", bm25_call, settings.retrieval_lexical_timeout_ms))
+        legs.append(("semantic", semantic_call, settings.retrieval_semantic_timeout_ms))
+        futures = [
+            (name, self._fanout_pool.submit(call, query), timeout_ms)
+            for name, call, timeout_ms in legs
+        ]
+
+        results = {}
+        for name, future, timeout_ms in futures:
+            remaining = None
+            if timeout_ms > 0:
+                remaining = max(0.0, timeout_ms / 1000 - (time.monotonic() - start))
+            try:
+                results[name] = future.result(timeout=remaining)
+            except FuturesTimeoutError:
+                if not future.cancel():
+                    self._track_abandoned(future)
+                print(f"Warning: {name} retrieval missed its {timeout_ms}ms deadline, continuing without it.")
+                results[name] = []
+            except Exception as e:
+                print(f"Warning: {name} retriever failed: {e}")
+                results[name] = []
+
+        return results.get("bm25", []), results["semantic"]
+
+    def _track_abandoned(self, future):
+        """
+        Keep count of a leg that is still running past its deadline (a running
+        future cannot be cancelled) and warn once such legs hold half the pool,
+        since later queries' legs queue behind them.
+        """
+        with self._abandoned_lock:
+            self._abandoned_legs.add(future)
+            abandoned = len(self._abandoned_legs)
+        future.add_done_callback(self._release_abandoned)
+        if abandoned * 2 >= self._fanout_workers:
+            print(
+                f"Warning: {abandoned} of {self._fanout_workers} retrieval threads are held by legs "
+                f"past their deadline; later queries' legs wait for them."
+            )
+
+    def _release_abandoned(self, future):
+        with self._abandoned_lock:
+            self._abandoned_legs.discard(future)
+
+    def citation_lookup(self, query: str, query_analysis: Optional[Dict] = None, k: int = 5) -> Optional[List[Document]]:
+        """
+        Chunks of the sections an exact-citation query names ("Section 302 IPC",
+        "CrPC 154"), straight from the citation index. Returns None when the query
+        does not resolve to known (act, section) pairs; it then needs retrieve_with_filters.
+        """
+        if self.citation_index is None or not settings.citation_fast_path_enabled:
+            return None
+        citations = self.citation_index.resolve(query, query_analysis)
+        if not citations:
+            return None
+        return self.citation_index.documents_for(citations, k) or None
+
+    def related_sections(self, docs: List[Document], limit: int = 2) -> List[Document]:
+        """
+        Chunks one cross-reference hop away from docs (the provisions they cite,
+        then the chunks citing them), for adding cited provisions to the context
+        without another search. Docs the index does not know are skipped.
+        """
+        if self.cross_reference_index is None or self.metadata_index is None or limit <= 0:
+            return []
+        positions = [p for p in (self.metadata_index.position(d) for d in docs) if p is not None]
+        return [self.documents[p] for p in self.cross_reference_index.expand(positions, limit)]
+
     def retrieve_with_filters(
         self,
         query: str,
@@ -49,35 +423,29 @@ class LegalHybridRetriever:
     ) -> List[Document]:
         """Retrieve documents with metadata filtering"""
 
-        # Get initial results from ensemble retriever
+        # Resolve the filters to the chunks they allow so both legs only retrieve matching chunks
+        allowed = None
+        if filters and self.metadata_index is not None:
+            allowed = self.metadata_index.allowed(filters)
+
+        if self.lazy_hydration:
+            positions = self._pick_positions(query, filters, allowed, k)
+            if positions is not None:
+                # Text and metadata are only read for the chunks returned
+                return [self.documents[p] for p in positions]
+            print("Warning: semantic results include chunks missing from the loaded chunk list, retrieving documents")
+
+        # Get initial results from both legs concurrently, fused the same way the ensemble retriever does
+        bm25_docs, sem_docs = self._retrieve_legs(query, allowed)
         if self.has_bm25:
-            docs = self.ensemble_retriever.get_relevant_documents(query)
+            docs = self.ensemble_retriever.weighted_reciprocal_rank([bm25_docs, sem_docs])
         else:
-            docs = self.semantic_retriever.get_relevant_documents(query)
+            docs = sem_docs
 
         # Apply metadata-based filtering if filters are provided
         if filters:
             docs = self._apply_filters(docs, filters)
 
-        def _pick_representative_page(pages: List[Document], prefer_section: Optional[str] = None) -> Document:
-            # prefer a page that contains the section token in content
-            if prefer_section:
-                tok = re.sub(r'[^0-9a-z]', '', prefer_section.lower())
-                for p in pages:
-                    if re.search(rf'\bsection\s{re.escape(tok)}\b', (p.page_content or "").lower()):
-                        return p
-                # then prefer a page whose page-level metadata matches
-                for p in pages:
-                    es = p.metadata.get("extracted_sections") or p.metadata.get("extracted_sections_norm") or p.metadata.get("aggregated_extracted_sections_norm") or ""
-                    if isinstance(es, (list, tuple, set)):
-                        meta_list = [str(x).lower() for x in es]
-                    else:
-                        meta_list = [x.strip().lower() for x in re.split(r'\s*(?:,|;|\||/|and)\s*', str(es)) if x.strip()]
-                    if any(re.sub(r'[^0-9a-z]', '', m) == tok for m in meta_list):
-                        return p
-            # fallback to top-ranked page
-            return pages[0]
-
         # Build representative list preserving rerank order and returning at most one page per source
         by_file = {}
         for d in docs:
@@ -86,16 +454,14 @@ class LegalHybridRetriever:
 
         picked = []
         seen = set()
-        preferred_section = None
-        if filters and 'sections' in filters and filters.get('sections'):
-            preferred_section = str(filters['sections'][0])
+        preferred_section = self._preferred_section(filters)
 
         for d in docs:
             src = d.metadata.get("source_file") or d.metadata.get("source")
             if src in seen:
                 continue
             pages = by_file.get(src, [])
-            rep = _pick_representative_page(pages, preferred_section)
+            rep = self.section_index.pick(pages, preferred_section)
             picked.append(rep)
             seen.add(src)
             if len(picked) >= k:
@@ -103,187 +469,102 @@ class LegalHybridRetriever:
 
         return picked[:k]
 
+    @staticmethod
+    def _preferred_section(filters: Optional[Dict]) -> Optional[str]:
+        if filters and 'sections' in filters and filters.get('sections'):
+            return str(filters['sections'][0])
+        return None
+
+    def _source_at(self, position: int) -> Optional[str]:
+        """Source file of a chunk position, read without creating a Document"""
+        if isinstance(self.documents, ChunkStore):
+            meta = self.documents.file_metadata(position)
+        else:
+            meta = self.documents[position].metadata
+        return meta.get("source_file") or meta.get("source")
+
+    def _pick_positions(
+        self,
+        query: str,
+        filters: Optional[Dict],
+        allowed: Optional[np.ndarray],
+        k: int
+    ) -> Optional[List[int]]:
+        """
+        retrieve_with_filters over chunk positions: fuse, filter, group by source
+        file and pick one page per file without touching chunk text or metadata.
+        Returns the picked positions, or None when the legs cannot be resolved
+        to positions.
+        """
+        legs = self._retrieve_positions(query, allowed)
+        if legs is None:
+            return None
+        bm25_hits, sem_hits = legs
+        if self.has_bm25:
+            fused = reciprocal_rank_fusion(
+                [bm25_hits, sem_hits], self.ensemble_retriever.weights, self.ensemble_retriever.c
+            )
+        else:
+            fused = sem_hits
+        positions = [pos for pos, _ in fused]
+
+        if filters:
+            positions = [pos for pos, keep in zip(positions, self.metadata_index.keeps(positions, filters)) if keep]
+
+        by_file: Dict[Optional[str], List[int]] = {}
+        for pos in positions:
+            by_file.setdefault(self._source_at(pos), []).append(pos)
+
+        preferred_section = self._preferred_section(filters)
+        return [
+            self.section_index.pick_position(src, pages, preferred_section)
+            for src, pages in list(by_file.items())[:k]
+        ]
+
     def _apply_filters(
         self,
         docs: List[Document],
         filters: Dict
     ) -> List[Document]:
         """Apply metadata-based filtering.
-        By default all provided filter criteria must match (AND).
-        If filters contains "match_any_filter": True then a document is kept if it matches ANY filter (OR).
+        By default a document is kept if it matches ANY filter (OR).
+        If filters contains "match_any_filter": False then all provided filter criteria must match (AND).
+        Chunks are looked up in the metadata bitmap index; documents it does not
+        know are evaluated one by one with the same rules.
         """
-        filtered_docs = []
-
-        def _to_list(v):
-            if v is None:
-                return []
-            if isinstance(v, (list, tuple, set)):
-                return [str(x).strip().lower() for x in v if str(x).strip()]
-            if isinstance(v, str):
-                s = v.strip()
-                if s == "":
-                    return []
-                parts = re.split(r'\s*(?:,|;|\||/|and)\s*', s)
-                return [p.strip().lower() for p in parts if p.strip()]
-            return [str(v).strip().lower()]
-
-        def _normalize_section_tokens(tokens, content: Optional[str] = None):
-            out = []
-            for t in tokens:
-                tok = re.sub(r'[^0-9a-z]', '', str(t).lower())
-                if not tok:
-                    continue
-                if len(tok) >= 2:
-                    out.append(tok)
-                    continue
-                # single-char token: include only when context confirms it's a section
-                if content and re.search(rf'\b(?:section|sec\.?|s\.)\s*{re.escape(tok)}\b', content, re.IGNORECASE):
-                    out.append(tok)
-            return out
-
-        # mode: OR vs AND
-        match_any_mode = bool(filters.get("match_any_filter", True))
-
-        for doc in docs:
-            # collect per-filter match results for filters that are present
-            match_results = []
-
-            # document_type (exact match)
-            if 'document_type' in filters:
-                match_results.append(doc.metadata.get('document_type') == filters['document_type'])
-
-            # legal_topics (any overlap)
-            if 'legal_topics' in filters:
-                doc_topics = _to_list(doc.metadata.get('legal_topics', []))
-                filter_topics = [str(t).strip().lower() for t in filters.get('legal_topics', [])]
-                match_results.append(bool(set(doc_topics) & set(filter_topics)))
-
-            # sections (normalized exact tokens)
-            if 'sections' in filters:
-                # include both page-level and aggregated-per-document section tokens
-                raw_doc_secs_page = doc.metadata.get('extracted_sections_norm') or doc.metadata.get('extracted_sections') or []
-                raw_doc_secs_agg = doc.metadata.get('aggregated_extracted_sections_norm') or []
-                doc_sections = _to_list(raw_doc_secs_page) + _to_list(raw_doc_secs_agg)
-                # dedupe
-                doc_sections = list(dict.fromkeys(doc_sections))
-                doc_sections = _normalize_section_tokens(doc_sections, getattr(doc, "page_content", None))
-                
-                filter_secs = []
-                for s in filters.get('sections', []):
-                    if s is None:
-                        continue
-                    fs = re.sub(r'[^0-9a-z]', '', str(s).lower())
-                    if fs:
-                        filter_secs.append(fs)
-                match_results.append(any(fs == ds for fs in filter_secs for ds in doc_sections) if filter_secs else False)
-
-            # acts (substring / token match)
-            if 'acts' in filters:
-                 # include both page-level and aggregated-per-document act tokens/names
-                raw_doc_acts_page = doc.metadata.get('extracted_acts_norm') or doc.metadata.get('extracted_acts') or []
-                raw_doc_acts_agg = doc.metadata.get('aggregated_extracted_acts_norm') or []
-                doc_acts_list = _to_list(raw_doc_acts_page) + _to_list(raw_doc_acts_agg)
-                # dedupe while preserving order
-                doc_acts_list = list(dict.fromkeys(doc_acts_list))
-                doc_acts_text = " ".join(doc_acts_list)
-                
-                filter_acts = [str(a).strip().lower() for a in filters.get('acts', []) if a is not None]
-                act_match = False
-                for fa in filter_acts:
-                    if fa in doc_acts_text or any(fa in a for a in doc_acts_list):
-                        act_match = True
-                        break
-                match_results.append(act_match)
-
-            # If no specific filter keys were present, keep doc
-            if not match_results:
-                include_doc = True
-            else:
-                include_doc = any(match_results) if match_any_mode else all(match_results)
-
-            if include_doc:
-                filtered_docs.append(doc)
+        if self.metadata_index is not None:
+            matches = self.metadata_index.matches(docs, filters)
+        else:
+            matches = [None] * len(docs)
 
-        return filtered_docs
+        return [
+            doc for doc, match in zip(docs, matches)
+            if (match if match is not None else doc_matches_filters(doc, filters))
+        ]
 
     def _rerank_documents(self, docs: List[Document], query: str) -> List[Document]:
         """Rerank documents based on relevance scoring"""
-        scored_docs = []
-
-        for doc in docs:
-            score = self._calculate_relevance_score(doc, query)
-            scored_docs.append((doc, score))
-
-        # sort by score (descending)
-        scored_docs.sort(key = lambda x: x[1], reverse=True)
-
-        return [doc for doc, score in scored_docs]
+        scores = self.rerank_features.scores(docs, query)
+        return [docs[i] for i in top_k_indices(scores, len(docs))]
 
     def _calculate_relevance_score(self, doc: Document, query: str) -> float:
-        """Calculate relevance score for a document"""
-        score = 0.0
-        content = doc.page_content.lower()
-        query_lower = query.lower()
-
-        # Extract phrase matching
-        if query_lower in content:
-            score += 2.0
-
-        # Individual word matching
-        """
-        This will rewards documents that contain more of the query words.
-            - If the doc contains all query words → higher boost.
-
-            - If only a few words match → smaller boost.
-
-            - If no words match → no boost.
-        """
-        query_words = query_lower.split()
-        word_matches = sum(1 for word in query_words if word in content)
-        score += (word_matches / len(query_words)) * 1.5
-
-        # Section reference bonus
-        if re.search(r'section\s+\d+', content):
-            score += 0.5
-
-        # Document type relevance
         """
-        This is a domain aware boost
-            - If the query is about criminal matters (mentions “criminal, police, arrest, bail”)
-            - And the document is from the criminal or procedure code
-            Then increase its ranking (+0.8) because it’s highly likely to be relevant.
+        Calculate relevance score for a document:
+            - +2.0 if the whole query appears in the text
+            - up to +1.5 for the share of query words the text contains as tokens
+            - +0.5 if the text cites a section ("section 302")
+            - +0.8 for criminal / procedure code chunks when the query is about
+              criminal matters (criminal, police, arrest, bail)
         """
-        doc_type = doc.metadata.get('document_type', '')
-        if doc_type in ['criminal_code', 'procedure_code'] and any(
-            word in query_lower for word in ['criminal', 'police', 'arrest', 'bail']
-        ):
-            score += 0.8
-
-        return score
+        return float(self.rerank_features.scores([doc], query)[0])
     
     def hybrid_retrieve(self, query: str, k: int = 50) -> List[Document]:
         """
         Hybrid retrieval: combine lexical (BM25) and semantic retrievers, dedupe,
         then rerank the combined candidate set and return top-k Documents.
         """
-        candidates = []
-
-        # collect BM25 candidates if available
-        if self.has_bm25 and getattr(self, "bm25_retriever", None):
-            try:
-                bm25_docs = self.bm25_retriever.get_relevant_documents(query)
-            except Exception:
-                print("Warning: BM25 retriever failed during hybrid retrieval.")
-                bm25_docs = []
-        else:
-            bm25_docs = []
-
-        # collect semantic candidates
-        try:
-            sem_docs = self.semantic_retriever.get_relevant_documents(query)
-        except Exception:
-            print("Warning: Semantic retriever failed during hybrid retrieval.")
-            sem_docs = []
+        # collect BM25 and semantic candidates concurrently
+        bm25_docs, sem_docs = self._retrieve_legs(query)
 
         # merge while preserving order: BM25 first then semantic (will be re-ranked)
         combined = bm25_docs + sem_docs
@@ -319,14 +600,58 @@ class LegalHybridRetriever:
             self._reranker_model = None
             return
         try:
-            self._reranker_model = SentenceTransformer(self.reranker_model_name)
-        except Exception:
+            self._reranker_model = reranker_backends.load_reranker(
+                self.reranker_model_name, self.reranker_backend, settings.rerank_onnx_file
+            )
+        except Exception as e:
             self._reranker_model = None
+            if self.reranker_backend == reranker_backends.DEFAULT_BACKEND:
+                return
+            # Optional runtime missing or model file not found: keep reranking at full precision
+            print(f"Warning: {self.reranker_backend} reranker backend not available ({e}), using torch")
+            self.reranker_backend = reranker_backends.DEFAULT_BACKEND
+            try:
+                self._reranker_model = reranker_backends.load_reranker(self.reranker_model_name)
+            except Exception:
+                self._reranker_model = None
+                return
+        try:
+            # Encode the corpus once (or memory-map the persisted matrix) so
+            # requests only have to encode the query. Keyed by backend, so
+            # query and chunk embeddings always come from the same runtime
+            self._chunk_embeddings = rerank_embeddings.load_or_build(
+                self.persist_dir, self.documents, self._reranker_model, self._reranker_key()
+            )
+        except Exception as e:
+            print(f"Warning: precomputed rerank embeddings not available: {e}")
+            self._chunk_embeddings = None
+
+    def _reranker_key(self) -> str:
+        """Identifies the embeddings of the loaded reranker (model + backend)"""
+        return reranker_backends.backend_key(self.reranker_model_name, self.reranker_backend, settings.rerank_onnx_file)
+
+    def _candidate_embeddings(self, candidates: List[Document]) -> np.ndarray:
+        """Normalized embeddings of the candidates: precomputed rows, encoding only chunks without one"""
+        store = self._chunk_embeddings
+        rows = store.rows(candidates) if store is not None else np.full(len(candidates), -1, dtype=np.int64)
+        missing = np.flatnonzero(rows < 0)
+        if len(missing) == len(candidates):
+            return rerank_embeddings.encode(self._reranker_model, [rerank_embeddings.rerank_text(d) for d in candidates])
+
+        doc_embs = np.empty((len(candidates), store.dim), dtype=np.float32)
+        hit = np.flatnonzero(rows >= 0)
+        doc_embs[hit] = store.vectors[rows[hit]]
+        if len(missing):
+            doc_embs[missing] = rerank_embeddings.encode(
+                self._reranker_model, [rerank_embeddings.rerank_text(candidates[i]) for i in missing]
+            )
+        return doc_embs
 
     def rerank(self, candidates: List[Document], query: str, top_k: Optional[int] = None, alpha: float = 0.5) -> List[Document]:
         """
         Strong semantic reranker using SBERT:
-         - compute embedding for query and candidate pages
+         - encode the query; candidate page embeddings come from the precomputed
+           chunk matrix (chunks without a row are encoded on the fly)
          - compute cosine similarity
          - combine SBERT similarity with existing heuristic score:
              final_score = alpha * semantic_sim + (1-alpha) * normalized_heuristic_score
@@ -343,46 +668,111 @@ class LegalHybridRetriever:
             # fallback: no SBERT available — use existing heuristic reranker
             return self._rerank_documents(candidates, query)
 
-        # build texts to embed (use page content or small snippet)
-        texts = [(getattr(d, "page_content", "") or "")[:1500] for d in candidates]
-
         try:
-            q_emb = self._reranker_model.encode([query], convert_to_numpy=True)[0]
-            doc_embs = self._reranker_model.encode(texts, convert_to_numpy=True)
+            # Only the query is encoded per request (and only on a query-cache miss);
+            # candidate embeddings are normalized rows of the precomputed matrix,
+            # so cosine is a dot product
+            q_emb = query_embedding_cache.get_or_embed(
+                self._reranker_key(), query, lambda q: rerank_embeddings.encode(self._reranker_model, [q])[0]
+            )
+            doc_embs = self._candidate_embeddings(candidates)
         except Exception:
             # embedding failed — fallback to existing heuristic reranker
             return self._rerank_documents(candidates, query)
-        
-        def cosine(a, b):
-            da = np.linalg.norm(a)
-            db = np.linalg.norm(b)
-            if da == 0 or db == 0:
-                return 0.0
-            return float(np.dot(a, b) / (da * db))
 
-        sem_sims = [cosine(q_emb, de) for de in doc_embs]
+        sem_sims = (doc_embs @ q_emb).astype(np.float64)
 
-        heur_scores = [self._calculate_relevance_score(d, query) for d in candidates]
-        min_h, max_h = min(heur_scores), max(heur_scores)
+        final_scores = fuse_rerank_scores(sem_sims, self.rerank_features.scores(candidates, query), alpha)
+        top = top_k_indices(final_scores, top_k or len(candidates))
+        return [candidates[i] for i in top]
 
-        heur_norm = []
-        if max_h - min_h > 1e-6:
-            heur_norm = [(s - min_h) / (max_h - min_h) for s in heur_scores]
-        else:
-            heur_norm = [0.0 for _ in heur_scores]
+    def candidate_k(self, k: int) -> int:
+        """
+        Documents to retrieve for a final list of k: CROSS_ENCODER_TOP_N when the
+        cross-encoder is on, so it can promote candidates from outside the
+        stage-one top k; k otherwise.
+        """
+        return max(k, settings.cross_encoder_top_n) if self.cross_encoder_enabled else k
+
+    def _ensure_cross_encoder_loaded(self):
+        """Load the cross-encoder (no-op when disabled, already loaded or unavailable)."""
+        if self._cross_encoder is not None or not self.cross_encoder_enabled:
+            return
+        try:
+            self._cross_encoder = reranker_backends.load_cross_encoder(
+                settings.cross_encoder_model, settings.cross_encoder_quantize
+            )
+        except Exception as e:
+            print(f"Warning: cross-encoder {settings.cross_encoder_model} not available, disabling it: {e}")
+            self._cross_encoder = None
+            self.cross_encoder_enabled = False
 
-        final_scores = []
-        for i, d in enumerate(candidates):
-            sem = sem_sims[i]
-            h = heur_norm[i]
-            final = alpha * sem + (1.0 - alpha) * h
-            final_scores.append((d, final))
+    def cross_encode_rerank(
+        self,
+        ranked: List[Document],
+        query: str,
+        top_k: Optional[int] = None,
+        budget_ms: Optional[int] = None
+    ) -> Tuple[List[Document], Dict[str, Any]]:
+        """
+        Second rerank stage: rescore the first CROSS_ENCODER_TOP_N documents of an
+        already ranked list (the rerank output) with the cross-encoder and put them
+        in its order; the rest keep their place behind them.
+
+        Pairs are scored in small batches on the cross-encoder's own thread
+        against a per-request time budget, counted from when scoring starts;
+        waiting for the thread is bounded by the same budget. If either runs out
+        (or the cross-encoder is unavailable) the stage-one order is returned
+        unchanged.
+
+        Returns (documents, stats) where stats holds "applied", "timed_out",
+        "candidates" and "budget_ms" for latency metadata.
+        """
+        budget_ms = settings.cross_encoder_budget_ms if budget_ms is None else budget_ms
+        head = ranked[:settings.cross_encoder_top_n]
+        stage_one = ranked[:top_k] if top_k else ranked
+        stats = {"applied": False, "timed_out": False, "candidates": len(head), "budget_ms": budget_ms}
+
+        if self._cross_encoder is None or len(head) < 2:
+            return stage_one, stats
+
+        pairs = [(query, rerank_embeddings.rerank_text(d)) for d in head]
+        cancelled = threading.Event()
+        started = threading.Event()
+        started_at = []
+
+        def _score() -> Optional[np.ndarray]:
+            started_at.append(time.monotonic())
+            started.set()
+            scores = []
+            for start in range(0, len(pairs), CROSS_ENCODER_BATCH_SIZE):
+                if cancelled.is_set():
+                    return None
+                batch = pairs[start:start + CROSS_ENCODER_BATCH_SIZE]
+                scores.extend(self._cross_encoder.predict(batch, batch_size=len(batch), show_progress_bar=False))
+            return np.asarray(scores, dtype=np.float64)
+
+        budget = budget_ms / 1000.0 if budget_ms > 0 else None
+        future = self._cross_encoder_pool.submit(_score)
+        try:
+            if budget is not None and not started.wait(budget):
+                raise FuturesTimeoutError()
+            remaining = max(0.0, started_at[0] + budget - time.monotonic()) if budget is not None else None
+            scores = future.result(timeout=remaining)
+        except FuturesTimeoutError:
+            # Skip the remaining batches; the stage-one order stands
+            cancelled.set()
+            future.cancel()
+            stats["timed_out"] = True
+            print(f"Warning: cross-encoder exceeded its {budget_ms}ms budget, keeping stage-one order")
+            return stage_one, stats
+        except Exception as e:
+            print(f"Warning: cross-encoder rerank failed: {e}")
+            return stage_one, stats
 
-        final_scores.sort(key=lambda x: x[1], reverse=True)
-        ranked = [d for d, s in final_scores]
-        if top_k:
-            return ranked[:top_k]
-        return ranked
+        reranked = [head[i] for i in top_k_indices(scores, len(head))] + ranked[len(head):]
+        stats["applied"] = True
+        return (reranked[:top_k] if top_k else reranked), stats
 
 class QueryProcessor:
     """Preprocess queries to enhance retrieval"""
@@ -460,8 +850,8 @@ class QueryProcessor:
         }
     
 try:
-    from chain.loader import vectorstore, docs
-    enhanced_retriever = LegalHybridRetriever(vectorstore, docs)
+    from chain.loader import vectorstore, docs, bm25_index, persist_dir
+    enhanced_retriever = LegalHybridRetriever(vectorstore, docs, bm25_index=bm25_index, persist_dir=persist_dir)
     query_processor = QueryProcessor()
     print("Enhanced retriever initialized successfully with cached documents.")
 except ImportError as e:
@@ -0,0 +1,124 @@
+"""
+On-disk cache of S3 objects keyed by S3 key + ETag, with concurrent fetching.
+
+A restart only downloads objects whose ETag changed (or that were never seen);
+everything else is read straight from the cache directory. Downloads run on a
+bounded thread pool and are handed back in listing order as soon as each one
+(and everything before it) has arrived, so parsing can start on the first
+object while the rest of the bucket is still downloading.
+
+Cache layout: <cache_dir>/<sha1(s3_key)>/<etag>.pdf
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Set, Tuple
+
+from botocore.exceptions import ClientError
+
+from config.settings import settings
+
+
+def _object_version(s3_obj: dict) -> str:
+    """ETag, or size + last-modified for listings that did not return one"""
+    version = s3_obj.get("etag") or f"{s3_obj.get('size', 0)}-{s3_obj.get('last_modified') or ''}"
+    return re.sub(r'[^a-zA-Z0-9_.-]+', '_', version)
+
+
+class S3ObjectCache:
+    def __init__(self, s3_client, bucket: str, cache_dir: str, max_concurrency: Optional[int] = None):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.cache_dir = cache_dir
+        self.max_concurrency = max(1, max_concurrency or settings.s3_download_concurrency)
+        self.hits = 0
+        self.downloads = 0
+        self._stats_lock = threading.Lock()
+
+    def _key_dir(self, s3_key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(s3_key.encode()).hexdigest())
+
+    def path_for(self, s3_obj: dict) -> str:
+        return os.path.join(self._key_dir(s3_obj["key"]), _object_version(s3_obj) + ".pdf")
+
+    def fetch(self, s3_obj: dict) -> Optional[str]:
+        """Local path of the object's current version, downloading it only if it is not cached"""
+        path = self.path_for(s3_obj)
+        if os.path.exists(path):
+            with self._stats_lock:
+                self.hits += 1
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            self.s3_client.download_file(self.bucket, s3_obj["key"], tmp_path)
+            # Older versions of the same key are superseded by this one
+            for name in os.listdir(os.path.dirname(path)):
+                if name.endswith(".pdf"):
+                    os.unlink(os.path.join(os.path.dirname(path), name))
+            os.replace(tmp_path, path)
+            print(f"Downloaded {s3_obj['key']} to {path}")
+            with self._stats_lock:
+                self.downloads += 1
+            return path
+        except ClientError as e:
+            print(f"Error downloading {s3_obj['key']}: {e}")
+        except OSError as e:
+            print(f"Error caching {s3_obj['key']}: {e}")
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return None
+
+    def iter_fetched(self, s3_objects: Iterable[dict]) -> Iterator[Tuple[dict, Optional[str]]]:
+        """
+        Yield (s3_obj, local_path or None) in input order while up to
+        max_concurrency downloads run ahead in the background.
+        """
+        objects = iter(s3_objects)
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            while True:
+                while len(pending) < self.max_concurrency:
+                    s3_obj = next(objects, None)
+                    if s3_obj is None:
+                        break
+                    pending.append((s3_obj, executor.submit(self.fetch, s3_obj)))
+                if not pending:
+                    break
+                s3_obj, future = pending.popleft()
+                yield s3_obj, future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def prune(self, s3_objects: Iterable[dict]):
+        """Drop cached objects that are no longer in the bucket listing (or were superseded)"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        keep: Set[str] = {self.path_for(obj) for obj in s3_objects}
+        keep_dirs = {os.path.dirname(p) for p in keep}
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            key_dir = os.path.join(self.cache_dir, name)
+            if key_dir not in keep_dirs:
+                shutil.rmtree(key_dir, ignore_errors=True)
+                removed += 1
+                continue
+            for file_name in os.listdir(key_dir):
+                path = os.path.join(key_dir, file_name)
+                if path not in keep:
+                    os.unlink(path)
+                    removed += 1
+        if removed:
+            print(f"Pruned {removed} stale entries from the S3 object cache")
+
+    def report(self):
+        print(f"S3 object cache: {self.hits} cached, {self.downloads} downloaded")
@@ -0,0 +1,104 @@
+"""
+Section-boundary-aware chunking for statutes.
+
+RecursiveCharacterTextSplitter cuts IPC/CrPC text at arbitrary character
+offsets, so one section ends up spread over several overlapping chunks.
+SectionChunker instead splits a file at the section headers that
+metadata_utils already recognises (em-dash headers, numbered titles):
+
+- each chunk is one section, or a bounded part of one if the section is
+  longer than chunk_size (parts do not overlap)
+- sections shorter than min_section_chars (table-of-contents lines, one-line
+  repeals) are packed together with their neighbours up to chunk_size
+- sections may span pages; a chunk takes the page metadata of the page it
+  starts on, and lists the sections it covers in chunk_sections_norm
+
+It works on all pages of one file at once, which is how the ingestion
+pipeline hands them over.
+"""
+
+import copy
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from chain.utils.metadata_utils import find_section_headers
+
+# (page index, text) pieces making up one section
+Pieces = List[Tuple[int, str]]
+
+
+class SectionChunker:
+    def __init__(self, chunk_size: int = 1000, min_section_chars: int = 200):
+        self.chunk_size = chunk_size
+        self.min_section_chars = min_section_chars
+        self._part_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=0,
+            length_function=len,
+        )
+
+    def _sections(self, pages: List[Document]) -> List[Tuple[Optional[str], Pieces]]:
+        """Cut the file at section headers; text before the first header is a preamble (None)"""
+        sections: List[Tuple[Optional[str], Pieces]] = []
+        for page_idx, page in enumerate(pages):
+            text = page.page_content or ""
+            headers = find_section_headers(text)
+
+            # Text above the first header continues the previous page's section
+            head = text[:headers[0][0] if headers else len(text)].strip()
+            if head:
+                if not sections:
+                    sections.append((None, []))
+                sections[-1][1].append((page_idx, head))
+
+            for i, (start, sec) in enumerate(headers):
+                end = headers[i + 1][0] if i + 1 < len(headers) else len(text)
+                body = text[start:end].strip()
+                if body:
+                    sections.append((sec, [(page_idx, body)]))
+        return sections
+
+    def _pack(self, sections: List[Tuple[Optional[str], Pieces]]) -> List[Tuple[List[str], Pieces]]:
+        """Merge undersized sections with their neighbours, never exceeding chunk_size"""
+        units: List[Tuple[List[str], Pieces]] = []
+        size = 0
+        for sec, pieces in sections:
+            length = sum(len(t) for _, t in pieces) + len(pieces) - 1
+            if units and (size < self.min_section_chars or length < self.min_section_chars) \
+                    and size + 1 + length <= self.chunk_size:
+                tokens, unit_pieces = units[-1]
+                if sec:
+                    tokens.append(sec)
+                unit_pieces.extend(pieces)
+                size += 1 + length
+            else:
+                units.append(([sec] if sec else [], list(pieces)))
+                size = length
+        return units
+
+    def split_documents(self, pages: List[Document]) -> List[Document]:
+        chunks = []
+        for tokens, pieces in self._pack(self._sections(pages)):
+            text = "\n".join(t for _, t in pieces)
+
+            # Offsets of each piece in the joined text, to attribute parts to pages
+            starts, offset = [], 0
+            for _, t in pieces:
+                starts.append(offset)
+                offset += len(t) + 1
+
+            parts = [text] if len(text) <= self.chunk_size else self._part_splitter.split_text(text)
+            cursor = 0
+            for part in parts:
+                found = text.find(part, cursor)
+                if found >= 0:
+                    cursor = found
+                page_idx = pieces[max(0, bisect_right(starts, cursor) - 1)][0]
+
+                metadata = copy.deepcopy(pages[page_idx].metadata)
+                metadata["chunk_sections_norm"] = [t.lower() for t in tokens]
+                chunks.append(Document(page_content=part, metadata=metadata))
+        return chunks
@@ -0,0 +1,99 @@
+"""
+Section -> page index over the loaded chunks.
+
+retrieve_with_filters returns one representative page per source file and,
+when a section filter is present, prefers the page that is about that
+section. That used to be decided per query by regex-searching every candidate
+page's text for "section <n>" and re-splitting its metadata. Both signals are
+now precomputed once per chunk, keyed by (source file, normalized section):
+
+- mentions: chunks whose text contains "section <n>" (the same
+  \\bsection\\s<n>\\b rule as before)
+- listed: chunks whose page-level section metadata (extracted_sections,
+  else extracted_sections_norm, else aggregated_extracted_sections_norm)
+  includes <n>
+
+so choosing the page is a set lookup per candidate (pick_position works on
+chunk positions alone). Pages the index does not know (no chunk position) are
+checked one by one with the same rules.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from langchain.schema import Document
+
+from chain.metadata_index import to_list
+
+_NON_ALNUM_RE = re.compile(r'[^0-9a-z]')
+# Zero-width after "section " so "section section 302" still yields 302
+_SECTION_MENTION_RE = re.compile(r'\bsection\s(?=(\w+))')
+
+
+def source_of(doc: Document) -> Optional[str]:
+    return doc.metadata.get("source_file") or doc.metadata.get("source")
+
+
+def section_token(section) -> str:
+    return _NON_ALNUM_RE.sub('', str(section).lower())
+
+
+def page_section_tokens(doc: Document) -> Set[str]:
+    """Normalized sections listed in a page's own section metadata"""
+    meta = doc.metadata
+    es = meta.get("extracted_sections") or meta.get("extracted_sections_norm") or meta.get("aggregated_extracted_sections_norm") or ""
+    return {t for t in (section_token(m) for m in to_list(es)) if t}
+
+
+def mentions_section(doc: Document, tok: str) -> bool:
+    return re.search(rf'\bsection\s{re.escape(tok)}\b', (doc.page_content or "").lower()) is not None
+
+
+class SectionPageIndex:
+    """(source file, normalized section) -> positions of the chunks that mention / list it"""
+
+    def __init__(self, documents: List[Document], metadata_index=None):
+        self.metadata_index = metadata_index
+        self._mentions: Dict[Tuple[Optional[str], str], Set[int]] = {}
+        self._listed: Dict[Tuple[Optional[str], str], Set[int]] = {}
+        for pos, d in enumerate(documents):
+            src = source_of(d)
+            for m in _SECTION_MENTION_RE.finditer((d.page_content or "").lower()):
+                self._mentions.setdefault((src, m.group(1)), set()).add(pos)
+            for tok in page_section_tokens(d):
+                self._listed.setdefault((src, tok), set()).add(pos)
+
+    def pick(self, pages: List[Document], section: Optional[str]) -> Document:
+        """
+        Representative page among ranked pages of one source file: the first
+        that mentions the section in its text, else the first whose section
+        metadata lists it, else the top-ranked page.
+        """
+        tok = section_token(section) if section else ""
+        if not tok:
+            return pages[0]
+
+        src = source_of(pages[0])
+        mentions = self._mentions.get((src, tok), ())
+        listed = self._listed.get((src, tok), ())
+        positions = [
+            self.metadata_index.position(p) if self.metadata_index is not None else None for p in pages
+        ]
+        for p, pos in zip(pages, positions):
+            if (pos in mentions) if pos is not None else mentions_section(p, tok):
+                return p
+        for p, pos in zip(pages, positions):
+            if (pos in listed) if pos is not None else (tok in page_section_tokens(p)):
+                return p
+        return pages[0]
+
+    def pick_position(self, source: Optional[str], positions: Sequence[int], section: Optional[str]) -> int:
+        """pick() over the ranked chunk positions of one source file"""
+        tok = section_token(section) if section else ""
+        if tok:
+            for table in (self._mentions, self._listed):
+                hits = table.get((source, tok), ())
+                for pos in positions:
+                    if pos in hits:
+                        return pos
+        return positions[0]
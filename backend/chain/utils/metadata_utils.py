@@ -1,11 +1,19 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import re
 import unicodedata
 
+# extract_legal_metadata runs on every page during ingestion, so every pattern is
+# compiled once here rather than looked up in re's cache per call/per line.
+_SECTION_TOKEN_STRIP_RE = re.compile(r"[\s\-]+")
+_SECTION_TOKEN_RE = re.compile(r"^(\d{1,4})([A-Za-z]{0,3})$")
+_NORM_TOKEN_RE = re.compile(r"[^a-zA-Z0-9_\-]")
+_MULTI_DIGIT_SECTION_RE = re.compile(r"\d{2,4}[A-Za-z]{0,3}")
+_SUFFIXED_SECTION_RE = re.compile(r"\d[A-Za-z]{1,3}")
+
 def _norm_section_token(raw: str) -> str:
         """Normalize '153-b'/'153B'/'376AB'/'41' -> '153B','376AB','41' (no hyphens, suffix upper)."""
-        tok = re.sub(r"[\s\-]+", "", raw or "")
-        m = re.match(r"^(\d{1,4})([A-Za-z]{0,3})$", tok)
+        tok = _SECTION_TOKEN_STRIP_RE.sub("", raw or "")
+        m = _SECTION_TOKEN_RE.match(tok)
         if not m:
             return tok.upper()
         num, suf = m.groups()
@@ -15,87 +23,243 @@ def _norm_token(s: str) -> str:
         s = str(s or "")
         s = s.strip()
         s = s.replace(" ", "_")
-        s = re.sub(r"[^a-zA-Z0-9_\-]", "", s)
+        s = _NORM_TOKEN_RE.sub("", s)
         return s.lower()
 
-def extract_legal_metadata(text: str, filename: str) -> Dict:
+def _is_valid_section_token(sec: str) -> bool:
     """
-    Extract legal metadata with improved section detection and better filtering.
+    Improved validation for section tokens:
+    - Accept sections like 120A, 120B, 376AB
+    - Accept multi-digit sections like 196, 197, 153B
+    - Reject single digits (1-9) and obvious page numbers
+    - Accept sections with letter suffixes even if single digit (9A, but not plain 9)
     """
+    sec = sec.strip()
 
-    # ----------------- helpers -----------------
-
-    def _is_valid_section_token(sec: str) -> bool:
-        """
-        Improved validation for section tokens:
-        - Accept sections like 120A, 120B, 376AB
-        - Accept multi-digit sections like 196, 197, 153B
-        - Reject single digits (1-9) and obvious page numbers
-        - Accept sections with letter suffixes even if single digit (9A, but not plain 9)
-        """
-        sec = sec.strip()
-        
-        # Reject obvious non-sections
-        if not sec or len(sec) > 6:
-            return False
-            
-        # Multi-digit sections (10+) with optional letters are always valid
-        if re.fullmatch(r"\d{2,4}[A-Za-z]{0,3}", sec):
-            return True
-            
-        # Single digit with required letter suffix (9A, 9B, etc.)
-        if re.fullmatch(r"\d[A-Za-z]{1,3}", sec):
-            return True
-            
+    # Reject obvious non-sections
+    if not sec or len(sec) > 6:
         return False
 
-    def _infer_primary_act(filename: str, head_text: str) -> Tuple[str, str]:
-        f = (filename or "").lower()
-        t = (head_text or "")
-        
-        if "repealedfileopen" in f or "indian_penal_code" in f or "ipc" in f:
-            return ("indian_penal_code", "Indian Penal Code, 1860")
-        if "code_of_criminal_procedure" in f or "crpc" in f:
-            return ("code_of_criminal_procedure", "Code of Criminal Procedure, 1973")
-        if "constitution" in f:
-            return ("constitution_of_india", "Constitution of India")
-            
-        # Check content for act identification
-        if re.search(r"\bTHE\s+INDIAN\s+PENAL\s+CODE\b", t, re.IGNORECASE):
-            return ("indian_penal_code", "Indian Penal Code, 1860")
-        if re.search(r"\bTHE\s+CODE\s+OF\s+CRIMINAL\s+PROCEDURE\b", t, re.IGNORECASE):
-            return ("code_of_criminal_procedure", "Code of Criminal Procedure, 1973")
-        if re.search(r"\bTHE\s+CONSTITUTION\s+OF\s+INDIA\b", t, re.IGNORECASE):
-            return ("constitution_of_india", "Constitution of India")
-            
-        return ("unknown_act", "Unknown")
-
-    def _looks_like_page_or_counter(line: str) -> bool:
-        """Detect page numbers and other counter-like content"""
-        line = line.strip()
-        
-        # Pure numbers (especially small ones) on their own line
-        if re.fullmatch(r"\d{1,3}", line):
-            return True
-            
-        # Roman numerals
-        if re.fullmatch(r"[ivxlcdm]{1,6}[.)]?", line, flags=re.IGNORECASE):
-            return True
-            
-        # Page indicators
-        if re.fullmatch(r"(?:page\s*)?\d{1,4}(?:\s*of\s*\d{1,4})?", line, flags=re.IGNORECASE):
-            return True
-            
-        return False
+    # Multi-digit sections (10+) with optional letters are always valid
+    if _MULTI_DIGIT_SECTION_RE.fullmatch(sec):
+        return True
+
+    # Single digit with required letter suffix (9A, 9B, etc.)
+    if _SUFFIXED_SECTION_RE.fullmatch(sec):
+        return True
+
+    return False
+
+# Section header at the start of a line: "302. Punishment for murder.—" (em-dash header)
+# or "302. Punishment for murder" (numbered title)
+SECTION_HEADER_RE = re.compile(
+    r'^[ \t]*(\d{1,4}[A-Za-z]{0,3})\.[ \t]+(?=[A-Z])(?:[^—\n]*—|[^\n.]{9,})',
+    re.MULTILINE
+)
+
+def find_section_headers(text: str) -> List[Tuple[int, str]]:
+    """
+    Offsets of section headers in text, as (line_start_offset, normalized_section) pairs.
+    Uses the same em-dash / numbered-title header shapes as extract_legal_metadata.
+    """
+    headers = []
+    for m in SECTION_HEADER_RE.finditer(text):
+        sec = _norm_section_token(m.group(1))
+        if _is_valid_section_token(sec):
+            headers.append((m.start(), sec))
+    return headers
+
+# ---------- patterns used by extract_legal_metadata ----------
+
+_IPC_TITLE_RE = re.compile(r"\bTHE\s+INDIAN\s+PENAL\s+CODE\b", re.IGNORECASE)
+_CRPC_TITLE_RE = re.compile(r"\bTHE\s+CODE\s+OF\s+CRIMINAL\s+PROCEDURE\b", re.IGNORECASE)
+_CONSTITUTION_TITLE_RE = re.compile(r"\bTHE\s+CONSTITUTION\s+OF\s+INDIA\b", re.IGNORECASE)
+
+_ACT_REFERENCE_PATTERNS = [
+    re.compile(r'\bAct\s+(\d+)\s+of\s+(\d{4})\b', re.IGNORECASE),  # "Act 8 of 1913"
+    re.compile(r'\b(\d+)\s+of\s+(\d{4})\b', re.IGNORECASE),        # "45 of 1860" (Indian Penal Code reference)
+]
+
+SECTION_WITH_EMDASH_RE = re.compile(
+    r'\b(\d{1,4}[A-Za-z]{0,3})\.\s+[A-Z][^—\n]*\s*—',  # Handle space before em-dash
+    re.IGNORECASE
+)
+
+SECTION_WITH_TITLE_RE = re.compile(
+    r'\b(\d{1,4}[A-Za-z]{0,3})\.\s+[A-Z][^\n.]{8,}',  # Section with title, more flexible
+    re.IGNORECASE
+)
+
+_PAGE_OR_COUNTER_RE = re.compile(
+    r"\d{1,3}"                                      # pure numbers on their own line
+    r"|[ivxlcdm]{1,6}[.)]?"                         # roman numerals
+    r"|(?:page\s*)?\d{1,4}(?:\s*of\s*\d{1,4})?",    # page indicators
+    re.IGNORECASE
+)
+_SECTIONS_HEADING_RE = re.compile(r'\bSECTIONS?\b', re.IGNORECASE)
+_CHAPTER_RE = re.compile(r'^CHAPTER\b', re.IGNORECASE)
+_CAPS_HEADING_RE = re.compile(r'^[A-Z][A-Z ]{8,}$')
+_LISTED_SECTION_RE = re.compile(r'\b(\d{1,4}[A-Za-z]{0,3})\.\s')
+_LINE_SECTION_RE = re.compile(r'^(\d{1,4}[A-Za-z]{0,3})\.\s+[A-Z]')
+# First characters _PAGE_OR_COUNTER_RE can match (digits aside), including re.IGNORECASE equivalents
+_COUNTER_LEADS = frozenset("ivxlcdmpIVXLCDMP\u0130\u0131")
+
+# Every position SECTION_WITH_EMDASH_RE / SECTION_WITH_TITLE_RE can match at is the start
+# of one of these ('İ'/'ı' are what [A-Za-z] also matches under re.IGNORECASE after NFKC)
+_NUMBERED_HEADING_CANDIDATE_RE = re.compile(r'\b\d{1,4}[A-Za-z\u0130\u0131]{0,3}\.\s')
+
+INLINE_SECTION_RE = re.compile(r'\bsection[s]?\s*\.?\s*\(?\s*([0-9]{1,4}[A-Za-z]{0,3})\b', re.IGNORECASE)
+
+_IPC_KEYWORDS = ("ipc", "i.p.c.")
+_CRPC_KEYWORDS = ("crpc", "c.r.p.c.", "cr.p.c.")
+
+# (pattern, act, keyword that must occur, act keywords of which one must occur).
+# The keywords are necessary conditions for a match, so pages without them skip the pattern.
+_REFERENCE_PATTERNS = [
+    (re.compile(r'\bsections?\s+([0-9]{1,4}[A-Za-z]{0,3}(?:\s*(?:,|and)\s*[0-9]{1,4}[A-Za-z]{0,3})*)\s+of\s+the\s+Indian\s+Penal\s+Code', re.IGNORECASE | re.DOTALL),
+     'indian_penal_code', "section", ("penal",)),
+    (re.compile(r'\bsections?\s+([0-9]{1,4}[A-Za-z]{0,3}(?:\s*(?:,|and)\s*[0-9]{1,4}[A-Za-z]{0,3})*)\s+(?:IPC|I\.P\.C\.)\b', re.IGNORECASE | re.DOTALL),
+     'indian_penal_code', "section", _IPC_KEYWORDS),
+    (re.compile(r'\bsections?\s+([0-9]{1,4}[A-Za-z]{0,3}(?:\s*(?:,|and)\s*[0-9]{1,4}[A-Za-z]{0,3})*)\s+of\s+the\s+Code\s+of\s+Criminal\s+Procedure', re.IGNORECASE | re.DOTALL),
+     'code_of_criminal_procedure', "section", ("criminal",)),
+    (re.compile(r'\bsections?\s+([0-9]{1,4}[A-Za-z]{0,3}(?:\s*(?:,|and)\s*[0-9]{1,4}[A-Za-z]{0,3})*)\s+(?:CrPC|C\.r\.P\.C\.|Cr\.P\.C\.)\b', re.IGNORECASE | re.DOTALL),
+     'code_of_criminal_procedure', "section", _CRPC_KEYWORDS),
+    (re.compile(r'\bu/s\.?\s*([0-9]{1,4}[A-Za-z]{0,3})\s+(?:IPC|I\.P\.C\.)\b', re.IGNORECASE | re.DOTALL),
+     'indian_penal_code', "u/s", _IPC_KEYWORDS),
+    (re.compile(r'\bu/s\.?\s*([0-9]{1,4}[A-Za-z]{0,3})\s+(?:CrPC|C\.r\.P\.C\.|Cr\.P\.C\.)\b', re.IGNORECASE | re.DOTALL),
+     'code_of_criminal_procedure', "u/s", _CRPC_KEYWORDS),
+    (re.compile(r'\bsection\s+([0-9]{1,4}[A-Za-z]{0,3}).{0,40}\b(?:IPC|Indian\s+Penal\s+Code)\b', re.IGNORECASE | re.DOTALL),
+     'indian_penal_code', "section", _IPC_KEYWORDS + ("penal",)),
+    (re.compile(r'\bsection\s+([0-9]{1,4}[A-Za-z]{0,3}).{0,40}\b(?:CrPC|Code\s+of\s+Criminal\s+Procedure)\b', re.IGNORECASE | re.DOTALL),
+     'code_of_criminal_procedure', "section", _CRPC_KEYWORDS + ("criminal",)),
+]
+_MULTI_SECTION_SPLIT_RE = re.compile(r'\s*(?:,|and)\s*')
+
+
+def _prefilter_text(lowered: str) -> str:
+    """
+    Lowercased text for substring prefilters. Under re.IGNORECASE 'i' also
+    matches 'İ' and 'ı' (the only non-ASCII case equivalents of ASCII letters
+    left after NFKC), so fold those back to 'i' - a keyword check on this text
+    is then never stricter than the regex it guards.
+    """
+    if lowered.isascii():
+        return lowered
+    return lowered.replace("\u0307", "").replace("\u0131", "i")
 
-    def _looks_like_ipc_offence_table(block: str) -> bool:
-        """Detect CrPC tables that list IPC offences"""
-        t = block.lower()
-        return ("cognizable" in t and "bailable" in t) and ("court of" in t or "punishment" in t)
+
+def _positional_fold(text: str, lowered: str) -> Optional[str]:
+    """
+    Like _prefilter_text but aligned character-for-character with text, so
+    keyword offsets are candidate match positions. None if lowercasing changed
+    the length ('İ' lowers to two code points); callers then scan the full text.
+    """
+    if lowered.isascii():
+        return lowered
+    if len(lowered) != len(text):
+        return None
+    return lowered.replace("\u0131", "i")
+
+
+def _find_all(haystack: str, needle: str) -> List[int]:
+    positions = []
+    i = haystack.find(needle)
+    while i != -1:
+        positions.append(i)
+        i = haystack.find(needle, i + 1)
+    return positions
+
+
+def _number_of_year_starts(text: str, of_positions: List[int]) -> List[int]:
+    """Start of the digit run in front of each 'of' ("45 of 1860"), i.e. where the pattern can match"""
+    starts = []
+    for q in of_positions:
+        i = q
+        while i > 0 and text[i - 1].isspace():
+            i -= 1
+        j = i
+        while j > 0 and text[j - 1].isdecimal():
+            j -= 1
+        if i < q and j < i:
+            starts.append(j)
+    return starts
+
+
+def _finditer_at(pattern: re.Pattern, text: str, starts: Optional[List[int]]):
+    """
+    pattern.finditer(text), trying only the given ascending start positions.
+    Identical to finditer as long as every position a match can start at is
+    listed (matches never overlap, exactly as with finditer). starts=None
+    falls back to scanning the whole text.
+    """
+    if starts is None:
+        yield from pattern.finditer(text)
+        return
+    end = 0
+    for pos in starts:
+        if pos < end:
+            continue
+        m = pattern.match(text, pos)
+        if m:
+            yield m
+            end = m.end()
+
+
+def _infer_primary_act(filename: str, head_text: str) -> Tuple[str, str]:
+    f = (filename or "").lower()
+    t = (head_text or "")
+
+    if "repealedfileopen" in f or "indian_penal_code" in f or "ipc" in f:
+        return ("indian_penal_code", "Indian Penal Code, 1860")
+    if "code_of_criminal_procedure" in f or "crpc" in f:
+        return ("code_of_criminal_procedure", "Code of Criminal Procedure, 1973")
+    if "constitution" in f:
+        return ("constitution_of_india", "Constitution of India")
+
+    # Check content for act identification
+    if _IPC_TITLE_RE.search(t):
+        return ("indian_penal_code", "Indian Penal Code, 1860")
+    if _CRPC_TITLE_RE.search(t):
+        return ("code_of_criminal_procedure", "Code of Criminal Procedure, 1973")
+    if _CONSTITUTION_TITLE_RE.search(t):
+        return ("constitution_of_india", "Constitution of India")
+
+    return ("unknown_act", "Unknown")
+
+
+def _looks_like_ipc_offence_table(block: str) -> bool:
+    """Detect CrPC tables that list IPC offences"""
+    t = block.lower()
+    return ("cognizable" in t and "bailable" in t) and ("court of" in t or "punishment" in t)
+
+
+def extract_legal_metadata(text: str, filename: str) -> Dict:
+    """
+    Extract legal metadata with improved section detection and better filtering.
+
+    All patterns are precompiled at module load. Instead of each pattern scanning
+    the whole page, candidate start positions are collected once with cheap
+    substring searches ("section", "u/s", "act", "of", numbered headings) and the
+    patterns are only tried there; passes whose keywords are absent are skipped,
+    and the per-line loop only runs regexes on lines that can match them.
+    """
 
     # ---------- normalize text ----------
     text = unicodedata.normalize("NFKC", text)
     lines = text.splitlines()
+    tl = text.lower()
+    folded = _prefilter_text(tl)
+    has_section_word = "section" in folded
+
+    # Candidate match positions shared by the patterns below (None = scan everything)
+    positional = _positional_fold(text, tl)
+    if positional is not None:
+        section_starts = _find_all(positional, "section")
+        us_starts = _find_all(positional, "u/s")
+        act_starts = _find_all(positional, "act")
+        number_of_starts = _number_of_year_starts(text, _find_all(positional, "of"))
+    else:
+        section_starts = us_starts = act_starts = number_of_starts = None
 
     metadata: Dict = {
         "source_file": filename,
@@ -122,26 +286,22 @@ def extract_legal_metadata(text: str, filename: str) -> Dict:
 
     # ---------- Extract additional acts (Act X of YYYY format) ----------
     act_references = []
-    act_patterns = [
-        r'\bAct\s+(\d+)\s+of\s+(\d{4})\b',  # "Act 8 of 1913"
-        r'\b(\d+)\s+of\s+(\d{4})\b',        # "45 of 1860" (Indian Penal Code reference)
-    ]
-    
-    for pattern in act_patterns:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            act_num = match.group(1)
-            year = match.group(2)
-            act_ref = f"Act {act_num} of {year}"
-            if act_ref not in act_references:
-                act_references.append(act_ref)
-    
+    if "of" in folded:
+        seen_acts = set()
+        for pattern, starts in zip(_ACT_REFERENCE_PATTERNS, (act_starts, number_of_starts)):
+            for match in _finditer_at(pattern, text, starts):
+                act_ref = f"Act {match.group(1)} of {match.group(2)}"
+                if act_ref not in seen_acts:
+                    seen_acts.add(act_ref)
+                    act_references.append(act_ref)
+
     # Add to metadata if found
     if act_references:
         if metadata["extracted_acts"]:
             metadata["extracted_acts"].extend(act_references)
         else:
             metadata["extracted_acts"] = act_references
-        
+
         if metadata["extracted_acts_norm"]:
             metadata["extracted_acts_norm"].extend([_norm_token(act) for act in act_references])
         else:
@@ -151,129 +311,92 @@ def extract_legal_metadata(text: str, filename: str) -> Dict:
     contained_sections: List[str] = []
     seen_contained = set()
 
-    # More flexible patterns
-    SECTION_WITH_EMDASH_RE = re.compile(
-        r'\b(\d{1,4}[A-Za-z]{0,3})\.\s+[A-Z][^—\n]*\s*—',  # Handle space before em-dash
-        re.IGNORECASE
-    )
-
-    SECTION_WITH_TITLE_RE = re.compile(
-        r'\b(\d{1,4}[A-Za-z]{0,3})\.\s+[A-Z][^\n.]{8,}',  # Section with title, more flexible
-        re.IGNORECASE
-    )
-
-    # Method 1: Find sections with em-dash (more flexible)
-    for match in SECTION_WITH_EMDASH_RE.finditer(text):
-        raw = match.group(1)
+    def _add_section(raw: str):
         sec = _norm_section_token(raw)
-        
         if _is_valid_section_token(sec) and sec not in seen_contained:
             seen_contained.add(sec)
             contained_sections.append(sec)
+
+    heading_starts = [m.start() for m in _NUMBERED_HEADING_CANDIDATE_RE.finditer(text)]
+
+    # Method 1: Find sections with em-dash (more flexible)
+    if "—" in text:
+        for match in _finditer_at(SECTION_WITH_EMDASH_RE, text, heading_starts):
+            _add_section(match.group(1))
     # Method 2: Find sections with titles
-    for match in SECTION_WITH_TITLE_RE.finditer(text):
-        raw = match.group(1)
-        sec = _norm_section_token(raw)
-        
-        if _is_valid_section_token(sec) and sec not in seen_contained:
-            seen_contained.add(sec)
-            contained_sections.append(sec)
+    for match in _finditer_at(SECTION_WITH_TITLE_RE, text, heading_starts):
+        _add_section(match.group(1))
 
     # Method 3: Process lines more aggressively
     in_sections_list = False
-    
+
     for i, line in enumerate(lines):
         line_stripped = line.strip()
-        
+
         # Skip obvious page numbers and very short lines
-        if _looks_like_page_or_counter(line_stripped) or len(line_stripped) < 3:
+        if len(line_stripped) < 3:
+            continue
+        lead = line_stripped[0]
+        if (lead.isdecimal() or lead in _COUNTER_LEADS) and _PAGE_OR_COUNTER_RE.fullmatch(line_stripped):
             continue
-            
+
         # More flexible SECTIONS detection
-        if re.search(r'\bSECTIONS?\b', line_stripped, flags=re.IGNORECASE):
+        if has_section_word and "section" in _prefilter_text(line_stripped.lower()) \
+                and _SECTIONS_HEADING_RE.search(line_stripped):
             in_sections_list = True
             continue
-            
+
         if in_sections_list:
             # Exit SECTIONS mode
-            if (re.match(r'^CHAPTER\b', line_stripped, flags=re.IGNORECASE) or 
-                re.match(r'^[A-Z][A-Z ]{8,}$', line_stripped)):
+            if _CHAPTER_RE.match(line_stripped) or _CAPS_HEADING_RE.match(line_stripped):
                 in_sections_list = False
                 continue
-                
+
             # In SECTIONS mode, be more aggressive
             # Look for any number followed by optional letters, then a period
-            section_matches = re.findall(r'\b(\d{1,4}[A-Za-z]{0,3})\.\s', line_stripped)
-            for raw in section_matches:
-                sec = _norm_section_token(raw)
-                if (_is_valid_section_token(sec) and 
-                    sec not in seen_contained):
-                    seen_contained.add(sec)
-                    contained_sections.append(sec)
-        else:
+            if "." in line_stripped:
+                for raw in _LISTED_SECTION_RE.findall(line_stripped):
+                    _add_section(raw)
+        elif lead.isdecimal():
             # Outside SECTIONS mode, look for section patterns
-            # More flexible pattern matching
-            section_match = re.match(r'^(\d{1,4}[A-Za-z]{0,3})\.\s+[A-Z]', line_stripped)
+            section_match = _LINE_SECTION_RE.match(line_stripped)
             if section_match:
-                raw = section_match.group(1)
-                sec = _norm_section_token(raw)
-                
+                sec = _norm_section_token(section_match.group(1))
+
                 if _is_valid_section_token(sec) and sec not in seen_contained:
                     # Additional context check for CrPC IPC tables
-                    start = max(0, i - 2)
-                    end = min(len(lines), i + 6)
-                    block = "\n".join(lines[start:end])
-                    
-                    # Skip if this is in an IPC offence table within CrPC
-                    if (primary_act_key == "code_of_criminal_procedure" and 
-                        _looks_like_ipc_offence_table(block)):
-                        continue
-                        
+                    if primary_act_key == "code_of_criminal_procedure":
+                        start = max(0, i - 2)
+                        end = min(len(lines), i + 6)
+                        # Skip if this is in an IPC offence table within CrPC
+                        if _looks_like_ipc_offence_table("\n".join(lines[start:end])):
+                            continue
+
                     seen_contained.add(sec)
                     contained_sections.append(sec)
 
     # Also capture inline "section X" occurrences that may appear in running text
     # (e.g. "section 117 or sub-section (2) of section 138") and add them if valid.
-    INLINE_SECTION_RE = re.compile(r'\bsection[s]?\s*\.?\s*\(?\s*([0-9]{1,4}[A-Za-z]{0,3})\b', re.IGNORECASE)
-    for m in INLINE_SECTION_RE.finditer(text):
-        raw = m.group(1)
-        sec = _norm_section_token(raw)
-        if _is_valid_section_token(sec) and sec not in seen_contained:
-            seen_contained.add(sec)
-            contained_sections.append(sec)
+    if has_section_word:
+        for m in _finditer_at(INLINE_SECTION_RE, text, section_starts):
+            _add_section(m.group(1))
 
     metadata["extracted_sections"] = contained_sections
     # Use section normalizer to produce canonical lowercase tokens for matching
     metadata["extracted_sections_norm"] = [_norm_section_token(s).lower() for s in contained_sections]
 
     # ---------- Cross-act references ----------
-    ref_patterns = [
-        (r'\bsections?\s+([0-9]{1,4}[A-Za-z]{0,3}(?:\s*(?:,|and)\s*[0-9]{1,4}[A-Za-z]{0,3})*)\s+of\s+the\s+Indian\s+Penal\s+Code', 'indian_penal_code'),
-        (r'\bsections?\s+([0-9]{1,4}[A-Za-z]{0,3}(?:\s*(?:,|and)\s*[0-9]{1,4}[A-Za-z]{0,3})*)\s+(?:IPC|I\.P\.C\.)\b', 'indian_penal_code'),
-        (r'\bsections?\s+([0-9]{1,4}[A-Za-z]{0,3}(?:\s*(?:,|and)\s*[0-9]{1,4}[A-Za-z]{0,3})*)\s+of\s+the\s+Code\s+of\s+Criminal\s+Procedure', 'code_of_criminal_procedure'),
-        (r'\bsections?\s+([0-9]{1,4}[A-Za-z]{0,3}(?:\s*(?:,|and)\s*[0-9]{1,4}[A-Za-z]{0,3})*)\s+(?:CrPC|C\.r\.P\.C\.|Cr\.P\.C\.)\b', 'code_of_criminal_procedure'),
-        (r'\bu/s\.?\s*([0-9]{1,4}[A-Za-z]{0,3})\s+(?:IPC|I\.P\.C\.)\b', 'indian_penal_code'),
-        (r'\bu/s\.?\s*([0-9]{1,4}[A-Za-z]{0,3})\s+(?:CrPC|C\.r\.P\.C\.|Cr\.P\.C\.)\b', 'code_of_criminal_procedure'),
-        (r'\bsection\s+([0-9]{1,4}[A-Za-z]{0,3}).{0,40}\b(?:IPC|Indian\s+Penal\s+Code)\b', 'indian_penal_code'),
-        (r'\bsection\s+([0-9]{1,4}[A-Za-z]{0,3}).{0,40}\b(?:CrPC|Code\s+of\s+Criminal\s+Procedure)\b', 'code_of_criminal_procedure'),
-    ]
-
     referenced_sections = []
     referenced_acts = set()
 
-    def _split_multi_sections(group: str) -> List[str]:
-        parts = re.split(r'\s*(?:,|and)\s*', group.strip())
-        out = []
-        for p in parts:
-            if p:
-                out.append(_norm_section_token(p))
-        return out
-
-    for pat, canon in ref_patterns:
-        for m in re.finditer(pat, text, flags=re.IGNORECASE | re.DOTALL):
-            g = m.group(1)
-            secs = _split_multi_sections(g)
-            for s in secs:
+    for pat, canon, lead, act_keywords in _REFERENCE_PATTERNS:
+        if lead not in folded or not any(k in folded for k in act_keywords):
+            continue
+        for m in _finditer_at(pat, text, us_starts if lead == "u/s" else section_starts):
+            for p in _MULTI_SECTION_SPLIT_RE.split(m.group(1).strip()):
+                if not p:
+                    continue
+                s = _norm_section_token(p)
                 if _is_valid_section_token(s):
                     referenced_sections.append({"section": s, "act": canon})
                     referenced_acts.add(canon)
@@ -286,7 +409,7 @@ def extract_legal_metadata(text: str, filename: str) -> Dict:
         if ref_key not in seen_refs:
             seen_refs.add(ref_key)
             unique_refs.append(ref)
-    
+
     # Remove primary act from referenced acts
     if primary_act_key in referenced_acts:
         referenced_acts.remove(primary_act_key)
@@ -295,7 +418,6 @@ def extract_legal_metadata(text: str, filename: str) -> Dict:
     metadata["referenced_acts"] = sorted(referenced_acts)
 
     # ---------- Legal topics ----------
-    tl = text.lower()
     topics = []
     if any(k in tl for k in ["criminal", "police", "fir", "conspiracy", "murder", "theft"]):
         topics.append("criminal")
@@ -305,10 +427,10 @@ def extract_legal_metadata(text: str, filename: str) -> Dict:
         topics.append("constitutional")
     if any(k in tl for k in ["marriage", "divorce", "custody", "maintenance"]):
         topics.append("family")
-        
+
     metadata["legal_topics"] = topics
     metadata["legal_topics_norm"] = [_norm_token(t) for t in topics]
-    
+
     return metadata
 
 def identify_document_type(filename:str, text:str) -> str:
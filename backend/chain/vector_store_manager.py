@@ -1,8 +1,9 @@
 import threading
-from typing import Tuple, List, Optional
-from langchain.schema import Document
+from typing import Tuple, Optional
 from langchain_chroma import Chroma
 
+from chain.chunk_store import ChunkStore
+
 class VectorStoreManager:
     _instance = None
     _lock = threading.Lock()
@@ -20,14 +21,26 @@ class VectorStoreManager:
             return
         self._vectorstore = None
         self._docs = None
+        self._bm25_index = None
+        self._persist_dir = None
         self._initialized = True
     
-    def get_vector_store(self) -> Tuple[Chroma, List[Document]]:
+    def get_vector_store(self) -> Tuple[Chroma, ChunkStore]:
         if self._vectorstore is None:
             with self._lock:
                 if self._vectorstore is None:
                     self._load_vector_store()
         return self._vectorstore, self._docs
+
+    def get_bm25_index(self):
+        """Persisted BM25 index for the loaded chunk list, or None if it is unavailable"""
+        self.get_vector_store()
+        return self._bm25_index
+
+    def get_persist_dir(self) -> Optional[str]:
+        """Directory the vector store and its side indexes are persisted in"""
+        self.get_vector_store()
+        return self._persist_dir
     
     def _load_vector_store(self):
         import os
@@ -42,13 +55,25 @@ class VectorStoreManager:
         if use_aws:
             from chain.aws_loader import AWSDocumentsLoader
             loader = AWSDocumentsLoader()
-            self._vectorstore, self._docs = loader.get_or_create_vector_store()
+            self._vectorstore, docs = loader.get_or_create_vector_store()
+            self._docs = ChunkStore.from_documents(docs)
+            self._bm25_index = loader.load_bm25_index(self._docs)
+            self._persist_dir = loader.chroma_persist_dir
             print("✅ AWS S3 document loading successful")
         else:
-            from chain.local_loader import get_or_create_vector_store
-            self._vectorstore, self._docs = get_or_create_vector_store()
+            from chain.local_loader import CHROMA_PERSIST_DIR, get_or_create_vector_store, load_bm25_index
+            self._vectorstore, docs = get_or_create_vector_store()
+            self._docs = ChunkStore.from_documents(docs)
+            self._bm25_index = load_bm25_index(self._docs)
+            self._persist_dir = CHROMA_PERSIST_DIR
             print("✅ Local document loading successful")
 
 # Global functions
-def get_vector_store() -> Tuple[Chroma, List[Document]]:
-    return VectorStoreManager().get_vector_store()
\ No newline at end of file
+def get_vector_store() -> Tuple[Chroma, ChunkStore]:
+    return VectorStoreManager().get_vector_store()
+
+def get_bm25_index():
+    return VectorStoreManager().get_bm25_index()
+
+def get_persist_dir() -> Optional[str]:
+    return VectorStoreManager().get_persist_dir()
@@ -117,6 +117,24 @@ class Settings:
         """Directory used by Chroma to persist vector store (local path inside container)."""
         return os.getenv('CHROMA_PERSIST_DIR', './.chroma')
 
+    @property
+    def s3_object_cache_dir(self) -> Optional[str]:
+        """Local cache of downloaded S3 documents (default: <chroma_persist_dir>/s3_object_cache)."""
+        return os.getenv('S3_OBJECT_CACHE_DIR') or None
+
+    @property
+    def s3_download_concurrency(self) -> int:
+        """Parallel S3 downloads during ingestion."""
+        return int(os.getenv('S3_DOWNLOAD_CONCURRENCY', '8'))
+
+    @property
+    def s3_listing_trust_minutes(self) -> int:
+        """
+        Reuse the bucket listing saved by a previous run for this many minutes
+        instead of listing S3 again at startup (0 = always list).
+        """
+        return int(os.getenv('S3_LISTING_TRUST_MINUTES', '0'))
+
     @property
     def aws_access_key_id(self) -> Optional[str]:
         # prefer Secrets Manager; fallback to env
@@ -158,6 +176,126 @@ class Settings:
             val = secrets_manager.get_secret("jwt_secret_key", "JWT_SECRET_KEY")
         return os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
     
+    # INGESTION SETTINGS
+    @property
+    def ingestion_workers(self) -> int:
+        """
+        Worker processes used for PDF parsing and metadata extraction.
+        1 (default) keeps ingestion in-process, 0 means one worker per CPU core.
+        """
+        try:
+            workers = int(os.getenv('INGESTION_WORKERS', '1'))
+        except ValueError:
+            workers = 1
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        return workers
+
+    @property
+    def chunking_mode(self) -> str:
+        """
+        How pages are split into chunks: 'recursive' (default, 1000-char windows
+        with 200-char overlap) or 'section' (one chunk per statute section, no overlap).
+        """
+        mode = os.getenv('CHUNKING_MODE', 'recursive').lower()
+        return mode if mode in ('recursive', 'section') else 'recursive'
+
+    @property
+    def embedding_batch_size(self) -> int:
+        """Chunks sent to the embedding provider per request during index builds."""
+        return int(os.getenv('EMBEDDING_BATCH_SIZE', '256'))
+
+    @property
+    def embedding_max_concurrency(self) -> int:
+        """Embedding requests in flight at once during index builds."""
+        return int(os.getenv('EMBEDDING_MAX_CONCURRENCY', '4'))
+
+    @property
+    def embedding_requests_per_minute(self) -> int:
+        """Provider request budget during index builds (0 = unlimited)."""
+        return int(os.getenv('EMBEDDING_REQUESTS_PER_MINUTE', '0'))
+
+    # RETRIEVAL SETTINGS
+    @property
+    def retrieval_lexical_timeout_ms(self) -> int:
+        """Deadline for the BM25 leg of hybrid retrieval (0 = wait indefinitely)."""
+        return int(os.getenv('RETRIEVAL_LEXICAL_TIMEOUT_MS', '1000'))
+
+    @property
+    def retrieval_semantic_timeout_ms(self) -> int:
+        """Deadline for the vector-store leg of hybrid retrieval, including the query embedding call (0 = wait indefinitely)."""
+        return int(os.getenv('RETRIEVAL_SEMANTIC_TIMEOUT_MS', '5000'))
+
+    @property
+    def retrieval_pushdown_max_ids(self) -> int:
+        """Largest filtered chunk set pushed into the Chroma query as a chunk_id $in clause; larger sets are post-filtered."""
+        return int(os.getenv('RETRIEVAL_PUSHDOWN_MAX_IDS', '5000'))
+
+    @property
+    def retrieval_fanout_workers(self) -> int:
+        """Threads shared by concurrent retrieval legs across requests."""
+        return max(2, int(os.getenv('RETRIEVAL_FANOUT_WORKERS', '8')))
+
+    @property
+    def citation_fast_path_enabled(self) -> bool:
+        """Answer exact-citation queries ("Section 302 IPC") from the citation index, skipping hybrid retrieval and reranking."""
+        return os.getenv('CITATION_FAST_PATH_ENABLED', 'true').lower() == 'true'
+
+    @property
+    def cross_reference_expansion_limit(self) -> int:
+        """Cross-referenced provisions added to the LLM context after retrieval (0 disables the expansion)."""
+        return max(0, int(os.getenv('CROSS_REFERENCE_EXPANSION_LIMIT', '2')))
+
+    @property
+    def rerank_backend(self) -> str:
+        """Inference backend for the SBERT reranker: 'torch' (full precision), 'torch-int8', 'onnx' or 'onnx-int8' (see chain/reranker_backends.py)."""
+        backend = os.getenv('RERANK_BACKEND', 'torch').lower()
+        return backend if backend in ('torch', 'torch-int8', 'onnx', 'onnx-int8') else 'torch'
+
+    @property
+    def rerank_onnx_file(self) -> Optional[str]:
+        """Quantized ONNX file in the model repo used by the 'onnx-int8' backend (default onnx/model_quint8_avx2.onnx)."""
+        return os.getenv('RERANK_ONNX_FILE') or None
+
+    @property
+    def cross_encoder_enabled(self) -> bool:
+        """Rescore the top of the SBERT rerank output with a cross-encoder."""
+        return os.getenv('CROSS_ENCODER_ENABLED', 'false').lower() == 'true'
+
+    @property
+    def cross_encoder_model(self) -> str:
+        return os.getenv('CROSS_ENCODER_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+
+    @property
+    def cross_encoder_quantize(self) -> bool:
+        """Run the cross-encoder with int8 dynamically quantized Linear layers."""
+        return os.getenv('CROSS_ENCODER_QUANTIZE', 'false').lower() == 'true'
+
+    @property
+    def cross_encoder_top_n(self) -> int:
+        """Stage-one results rescored by the cross-encoder."""
+        return max(1, int(os.getenv('CROSS_ENCODER_TOP_N', '10')))
+
+    @property
+    def cross_encoder_budget_ms(self) -> int:
+        """Per-request time budget for the cross-encoder; when exceeded the stage-one order is kept."""
+        return int(os.getenv('CROSS_ENCODER_BUDGET_MS', '200'))
+
+    # QUERY EMBEDDING CACHE
+    @property
+    def query_embedding_cache_size(self) -> int:
+        """Query embeddings kept in the in-process LRU (0 disables the cache)."""
+        return int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', '2048'))
+
+    @property
+    def query_embedding_cache_ttl_seconds(self) -> int:
+        return int(os.getenv('QUERY_EMBEDDING_CACHE_TTL_SECONDS', '86400'))
+
+    @property
+    def query_embedding_cache_redis(self) -> bool:
+        """Share query embeddings across workers through Redis when it is connected."""
+        return os.getenv('QUERY_EMBEDDING_CACHE_REDIS', 'true').lower() == 'true'
+
     # COST MONITORING
     @property
     def cost_monitoring_enabled(self) -> bool:
@@ -85,9 +85,13 @@ async def load_sbert_reranker():
         print("🔄 Loading SBERT reranker model at startup...")
         enhanced_retriever._ensure_reranker_loaded()
         if getattr(enhanced_retriever, "_reranker_model", None) is not None:
-            print("✅ SBERT reranker loaded successfully.")
+            print(f"✅ SBERT reranker loaded successfully ({enhanced_retriever.reranker_backend} backend).")
         else:
             print("⚠️  SBERT reranker could not be loaded.")
+        if enhanced_retriever.cross_encoder_enabled:
+            enhanced_retriever._ensure_cross_encoder_loaded()
+            if enhanced_retriever._cross_encoder is not None:
+                print(f"✅ Cross-encoder {settings.cross_encoder_model} loaded successfully.")
     else:
         print("⚠️  Enhanced retriever not available; SBERT reranker not loaded.")
 
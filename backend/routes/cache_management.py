@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 
 from config.database import get_db
 from redis_cache.redis_cache import cache
+from chain.query_embedding_cache import REDIS_KEY_PREFIX as QUERY_EMBEDDING_PREFIX, query_embedding_cache
 
 logger = logging.getLogger(__name__)
 
@@ -107,6 +108,7 @@ async def get_cache_info():
             "using_redis": cache.client is not None,
             "query_count": 0,
             "latency_count": 0,
+            "query_embedding_count": 0,
             "other_count": 0,
             "total_keys": 0
         }
@@ -122,6 +124,8 @@ async def get_cache_info():
                         info["query_count"] += 1
                     elif key.startswith("latency:"):
                         info["latency_count"] += 1
+                    elif key.startswith(QUERY_EMBEDDING_PREFIX):
+                        info["query_embedding_count"] += 1
                     else:
                         info["other_count"] += 1
                         
@@ -137,6 +141,8 @@ async def get_cache_info():
                     info["query_count"] += 1
                 elif key.startswith("latency:"):
                     info["latency_count"] += 1
+                elif key.startswith(QUERY_EMBEDDING_PREFIX):
+                    info["query_embedding_count"] += 1
                 else:
                     info["other_count"] += 1
         
@@ -153,6 +159,25 @@ async def get_cache_info():
             detail=f"Failed to get cache info: {str(e)}"
         )
 
+@router.get("/cache/query-embeddings")
+async def get_query_embedding_cache_stats():
+    """
+    Hit rate and size of the query-embedding cache (in-process LRU + Redis tier).
+    Counters are per worker process and reset on restart.
+    """
+    try:
+        return {
+            "success": True,
+            "message": "Query embedding cache statistics retrieved",
+            "query_embedding_cache": query_embedding_cache.stats()
+        }
+    except Exception as e:
+        logger.error(f"Failed to get query embedding cache stats: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get query embedding cache stats: {str(e)}"
+        )
+
 @router.delete("/cache/clear-all")
 async def clear_all_cache(
     confirm: bool = Query(False, description="Set to true to confirm deletion"),
@@ -182,7 +207,7 @@ async def clear_all_cache(
                         cleared_count += deleted
                         logger.info(f"Cleared {deleted} keys with prefix '{prefix}'")
             else:
-                # Clear everything
+                # Clear everything (including the Redis tier of the query-embedding cache)
                 all_keys = cache.client.keys("*")
                 if all_keys:
                     cleared_count = cache.client.delete(*all_keys)
@@ -204,6 +229,9 @@ async def clear_all_cache(
                 cleared_count = len(cache._store)
                 cache._store.clear()
         
+        if not preserve_vectors:
+            query_embedding_cache.clear()
+
         message = f"Cleared {cleared_count} cache entries"
         if preserve_vectors:
             message += " (vector embeddings preserved)"
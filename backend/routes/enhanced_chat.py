@@ -133,53 +133,62 @@ async def stream_response_generator(
         except Exception as e:
             logger.warning(f"Failed to record streaming query analysis timing: {e}")
         
-        # Step 3: Document retrieval
-        yield f"data: {json.dumps({'type': 'status', 'message': 'Retrieving relevant documents...', 'timestamp': time.time()})}\n\n"
+        # Step 3: Exact citations ("Section 302 IPC") come straight from the citation index
+        relevant_docs = citation_fast_path(payload.question, query_analysis, db, payload.user_id, request_id, streaming=True)
+        fast_path = relevant_docs is not None
+
+        # Step 3b: Document retrieval
+        if not fast_path:
+            yield f"data: {json.dumps({'type': 'status', 'message': 'Retrieving relevant documents...', 'timestamp': time.time()})}\n\n"
         
-        retrieval_start = time.time()
-        if enhanced_retriever:
-            filters = query_analysis.get('filters', {})
-            # Use parallel async retrieval with reduced document count for speed
-            relevant_docs = enhanced_retriever.retrieve_with_filters(
-                query=payload.question,
-                filters=filters,
-                k=2  # Further reduced from 3 to 2 for faster processing
-            )
-        else:
-            retriever = vectorstore.as_retriever(search_kwargs={"k": 2})  # Reduced from 3 to 2
-            relevant_docs = retriever.get_relevant_documents(payload.question)
+            retrieval_start = time.time()
+            if enhanced_retriever:
+                filters = query_analysis.get('filters', {})
+                # Use parallel async retrieval with reduced document count for speed
+                # 2 documents, or the cross-encoder's candidate pool when it is on
+                relevant_docs = enhanced_retriever.retrieve_with_filters(
+                    query=payload.question,
+                    filters=filters,
+                    k=enhanced_retriever.candidate_k(2)
+                )
+            else:
+                retriever = vectorstore.as_retriever(search_kwargs={"k": 2})  # Reduced from 3 to 2
+                relevant_docs = retriever.get_relevant_documents(payload.question)
         
-        retrieval_time = (time.time() - retrieval_start) * 1000
+            retrieval_time = (time.time() - retrieval_start) * 1000
         
-        # Record retrieval timing for streaming
-        try:
-            LatencyMetricService.record_latency(
-                db=db,
-                endpoint="enhanced-chat",
-                latency_ms=retrieval_time,
-                user_id=payload.user_id,
-                request_id=request_id,
-                latency_metadata={
-                    "phase": "document_retrieval",
-                    "retriever_type": "enhanced" if enhanced_retriever else "basic",
-                    "k_documents": 2,
-                    "has_filters": bool(query_analysis.get('filters', {})),
-                    "docs_found": len(relevant_docs),
-                    "streaming": True
-                },
-                type_category="phase_timing"
-            )
-        except Exception as e:
-            logger.warning(f"Failed to record streaming retrieval timing: {e}")
+            # Record retrieval timing for streaming
+            try:
+                LatencyMetricService.record_latency(
+                    db=db,
+                    endpoint="enhanced-chat",
+                    latency_ms=retrieval_time,
+                    user_id=payload.user_id,
+                    request_id=request_id,
+                    latency_metadata={
+                        "phase": "document_retrieval",
+                        "retriever_type": "enhanced" if enhanced_retriever else "basic",
+                        "k_documents": enhanced_retriever.candidate_k(2) if enhanced_retriever else 2,
+                        "has_filters": bool(query_analysis.get('filters', {})),
+                        "docs_found": len(relevant_docs),
+                        "streaming": True
+                    },
+                    type_category="phase_timing"
+                )
+            except Exception as e:
+                logger.warning(f"Failed to record streaming retrieval timing: {e}")
         
         # Step 4: Reranking and confidence
         yield f"data: {json.dumps({'type': 'status', 'message': 'Processing documents...', 'timestamp': time.time()})}\n\n"
         
         # Quick reranking
-        if enhanced_retriever:
+        if enhanced_retriever and not fast_path:
             rerank_start = time.time()
             
-            relevant_docs = enhanced_retriever.rerank(relevant_docs, payload.question, top_k=2, alpha=EVAL_ALPHA)
+            # With the cross-encoder on, keep its top N here; it cuts the list to 2
+            relevant_docs = enhanced_retriever.rerank(
+                relevant_docs, payload.question, top_k=enhanced_retriever.candidate_k(2), alpha=EVAL_ALPHA
+            )
         
             logger.debug(f"Reranked {len(relevant_docs)} documents")  # Reduced logging
         
@@ -203,9 +212,15 @@ async def stream_response_generator(
                 )
             except Exception as e:
                 logger.warning(f"Failed to record reranking timing: {e}")
+
+            if enhanced_retriever.cross_encoder_enabled:
+                relevant_docs = cross_encoder_stage(
+                    relevant_docs, payload.question, db, payload.user_id, request_id, streaming=True
+                )
         
         confidence = calculate_confidence(relevant_docs, query_analysis)
-        context = format_context(relevant_docs)
+        context_docs = relevant_docs + cross_reference_stage(relevant_docs, db, payload.user_id, request_id, streaming=True)
+        context = format_context(context_docs)
         
         # Step 5: Generate streaming response
         yield f"data: {json.dumps({'type': 'status', 'message': 'Generating response...', 'timestamp': time.time()})}\n\n"
@@ -338,7 +353,7 @@ async def stream_response_generator(
         end_time = time.time()
         response_time = int((end_time - start_time) * 1000)
         
-        citations = extract_citations_enhanced(relevant_docs, accumulated_response)
+        citations = extract_citations_enhanced(context_docs, accumulated_response)
         
         final_data = {
             "answer": accumulated_response,
@@ -361,7 +376,7 @@ async def stream_response_generator(
         
         # Record latency to in-memory tracker
         try:
-            latency_tracker.record_latency("enhanced-chat", response_time, payload.user_id)
+            latency_tracker.record_latency("enhanced-chat-citation" if fast_path else "enhanced-chat", response_time, payload.user_id)
             
             # Note: API latency will be recorded once at the end of the full request
             logger.debug(f"Recorded streaming latency: {response_time}ms for enhanced-chat")
@@ -488,10 +503,13 @@ async def execute_tools_intelligently(
     confidence: float,
     db: Session = None,
     user_id: str = None,
-    request_id: str = None
+    request_id: str = None,
+    cross_referenced: bool = False
 ) -> tuple[str, List[str]]:
     """
-    Intelligently decide which tools to run and execute them in parallel
+    Intelligently decide which tools to run and execute them in parallel.
+    When the context already holds the cross-referenced provisions, the
+    citation and section lookup tools are not run.
     """
     from tools.tool import fetch_legal_citations, summarize_legal_section, find_similar_cases
     
@@ -499,7 +517,7 @@ async def execute_tools_intelligently(
     tools_to_run = []
     
     # Check if we need citations
-    if any(keyword in query.lower() for keyword in ['section', 'act', 'law', 'provision', 'cite']):
+    if not cross_referenced and any(keyword in query.lower() for keyword in ['section', 'act', 'law', 'provision', 'cite']):
         tools_to_run.append({
             'name': 'fetch_legal_citations',
             'func': fetch_legal_citations,
@@ -508,7 +526,7 @@ async def execute_tools_intelligently(
     
     # Check if we need section explanation
     section_pattern = r'(section|sec|article|art)\s+(\d+[a-z]*)'
-    if re.search(section_pattern, query.lower()) or complexity_level in ['simple', 'beginner']:
+    if not cross_referenced and (re.search(section_pattern, query.lower()) or complexity_level in ['simple', 'beginner']):
         # Extract section reference if present
         match = re.search(section_pattern, query.lower())
         section_ref = match.group(2) if match else query.split()[:3]  # fallback
@@ -736,49 +754,58 @@ async def enhanced_chat(
         except Exception as e:
             logger.warning(f"Failed to record query analysis timing: {e}")
 
+        # Step 3: Exact citations ("Section 302 IPC") come straight from the citation index
+        relevant_docs = citation_fast_path(payload.question, query_analysis, db, payload.user_id, request_id, streaming=False)
+        fast_path = relevant_docs is not None
+
         # Step 4: Enhanced retrieval
-        retrieval_start = time.time()
-        if enhanced_retriever:
-            # Use hybrid retriever with filters - further reduced documents for speed
-            filters = query_analysis.get('filters', {})
-            relevant_docs = enhanced_retriever.retrieve_with_filters(
-                query=payload.question,
-                filters=filters,
-                k=2  # Further reduced from 3 to 2 for faster processing
-        )
-        else:
-            # Fallback to basic retrieval - also reduced
-            retriever = vectorstore.as_retriever(search_kwargs={"k": 2})  # Reduced from 3 to 2
-            relevant_docs = retriever.get_relevant_documents(payload.question)
+        if not fast_path:
+            retrieval_start = time.time()
+            if enhanced_retriever:
+                # Use hybrid retriever with filters - further reduced documents for speed
+                filters = query_analysis.get('filters', {})
+                # 2 documents, or the cross-encoder's candidate pool when it is on
+                relevant_docs = enhanced_retriever.retrieve_with_filters(
+                    query=payload.question,
+                    filters=filters,
+                    k=enhanced_retriever.candidate_k(2)
+            )
+            else:
+                # Fallback to basic retrieval - also reduced
+                retriever = vectorstore.as_retriever(search_kwargs={"k": 2})  # Reduced from 3 to 2
+                relevant_docs = retriever.get_relevant_documents(payload.question)
         
-        retrieval_time = (time.time() - retrieval_start) * 1000
-        print(f'⏱️  DOCUMENT RETRIEVAL: {retrieval_time:.1f}ms')
+            retrieval_time = (time.time() - retrieval_start) * 1000
+            print(f'⏱️  DOCUMENT RETRIEVAL: {retrieval_time:.1f}ms')
         
-        # Record retrieval timing
-        try:
-            LatencyMetricService.record_latency(
-                db=db,
-                endpoint="enhanced-chat",
-                latency_ms=retrieval_time,
-                user_id=payload.user_id,
-                request_id=request_id,
-                latency_metadata={
-                    "phase": "document_retrieval",
-                    "retriever_type": "enhanced" if enhanced_retriever else "basic",
-                    "k_documents": 2,
-                    "has_filters": bool(query_analysis.get('filters', {})),
-                    "docs_found": len(relevant_docs)
-                },
-                type_category="phase_timing"
-            )
-        except Exception as e:
-            logger.warning(f"Failed to record retrieval timing: {e}")
+            # Record retrieval timing
+            try:
+                LatencyMetricService.record_latency(
+                    db=db,
+                    endpoint="enhanced-chat",
+                    latency_ms=retrieval_time,
+                    user_id=payload.user_id,
+                    request_id=request_id,
+                    latency_metadata={
+                        "phase": "document_retrieval",
+                        "retriever_type": "enhanced" if enhanced_retriever else "basic",
+                        "k_documents": enhanced_retriever.candidate_k(2) if enhanced_retriever else 2,
+                        "has_filters": bool(query_analysis.get('filters', {})),
+                        "docs_found": len(relevant_docs)
+                    },
+                    type_category="phase_timing"
+                )
+            except Exception as e:
+                logger.warning(f"Failed to record retrieval timing: {e}")
 
         # Reranking step - optimized for speed
-        if enhanced_retriever:
+        if enhanced_retriever and not fast_path:
             rerank_start = time.time()
             
-            relevant_docs = enhanced_retriever.rerank(relevant_docs, payload.question, top_k=2, alpha=EVAL_ALPHA)
+            # With the cross-encoder on, keep its top N here; it cuts the list to 2
+            relevant_docs = enhanced_retriever.rerank(
+                relevant_docs, payload.question, top_k=enhanced_retriever.candidate_k(2), alpha=EVAL_ALPHA
+            )
         
             logger.debug(f"Reranked {len(relevant_docs)} documents")  # Reduced logging
         
@@ -803,14 +830,21 @@ async def enhanced_chat(
             except Exception as e:
                 logger.warning(f"Failed to record reranking timing: {e}")
 
+            if enhanced_retriever.cross_encoder_enabled:
+                relevant_docs = cross_encoder_stage(
+                    relevant_docs, payload.question, db, payload.user_id, request_id, streaming=False
+                )
+
         # Step 5: Calculate confidence based on retrieval quality
         confidence_start = time.time()
         confidence = calculate_confidence(relevant_docs, query_analysis)
         print(f'⏱️  CONFIDENCE CALC: {(time.time() - confidence_start)*1000:.1f}ms')
 
-        # Step 6: Prepare context for LLM
+        # Step 6: Prepare context for LLM, with the provisions the retrieved chunks cite
+        related_docs = cross_reference_stage(relevant_docs, db, payload.user_id, request_id, streaming=False)
+        context_docs = relevant_docs + related_docs
         context_start = time.time()
-        context = format_context(relevant_docs)
+        context = format_context(context_docs)
         print(f'⏱️  CONTEXT FORMATTING: {(time.time() - context_start)*1000:.1f}ms')
 
         cost_callback = CostTrackingCallback(user_id=payload.user_id, request_id=request_id)
@@ -850,7 +884,8 @@ async def enhanced_chat(
                 confidence=confidence,
                 db=db,
                 user_id=payload.user_id,
-                request_id=request_id
+                request_id=request_id,
+                cross_referenced=bool(related_docs)
             )
             tools_time = (time.time() - tools_start) * 1000
             
@@ -931,7 +966,7 @@ async def enhanced_chat(
         
         # Extract enhanced citations from documents
         citation_start = time.time()
-        citations = extract_citations_enhanced(relevant_docs, answer)
+        citations = extract_citations_enhanced(context_docs, answer)
         print(f'⏱️  CITATIONS: {(time.time() - citation_start)*1000:.1f}ms')
 
         # Step 8: Format response
@@ -970,7 +1005,7 @@ async def enhanced_chat(
         latency_recording_start = time.time()
         try:
             # Record in-memory with enhanced metadata
-            latency_tracker.record_latency("enhanced-chat", response_time, payload.user_id)
+            latency_tracker.record_latency("enhanced-chat-citation" if fast_path else "enhanced-chat", response_time, payload.user_id)
             
             # Record final latency metrics - this is the ONLY place we record the total request time
             metadata = {
@@ -979,6 +1014,7 @@ async def enhanced_chat(
                 "tools_used": len(tools_used),
                 "confidence": confidence,
                 "documents_retrieved": len(relevant_docs),
+                "retrieval_path": "citation" if fast_path else "hybrid",
                 "source": "final_total"  # Mark as the final total request time
             }
             
@@ -1037,6 +1073,96 @@ async def validation_exception_handler(payload: Request, exc):
         ).dict()
     )
 
+def citation_fast_path(question: str, query_analysis: Dict, db: Session, user_id: str, request_id: str, streaming: bool = False):
+    """
+    Look the query up in the citation index. Returns the cited sections' chunks,
+    or None when the query needs hybrid retrieval; a hit is recorded as its own phase.
+    """
+    if not enhanced_retriever:
+        return None
+    lookup_start = time.time()
+    docs = enhanced_retriever.citation_lookup(question, query_analysis, k=2)
+    if docs is None:
+        return None
+    lookup_time = (time.time() - lookup_start) * 1000
+    print(f'⏱️  CITATION LOOKUP: {lookup_time:.1f}ms (retrieval and reranking skipped)')
+
+    try:
+        LatencyMetricService.record_latency(
+            db=db,
+            endpoint="enhanced-chat",
+            latency_ms=lookup_time,
+            user_id=user_id,
+            request_id=request_id,
+            latency_metadata={
+                "phase": "citation_lookup",
+                "docs_found": len(docs),
+                "streaming": streaming
+            },
+            type_category="phase_timing"
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record citation lookup timing: {e}")
+    return docs
+
+def cross_reference_stage(docs: List, db: Session, user_id: str, request_id: str, streaming: bool = False) -> List:
+    """Provisions cited by the retrieved docs, from the cross-reference index; recorded as its own phase"""
+    limit = settings.cross_reference_expansion_limit
+    if not enhanced_retriever or not docs or limit <= 0:
+        return []
+    expansion_start = time.time()
+    related = enhanced_retriever.related_sections(docs, limit=limit)
+    expansion_time = (time.time() - expansion_start) * 1000
+    print(f'⏱️  CROSS-REFERENCES: {expansion_time:.1f}ms ({len(related)} added)')
+
+    try:
+        LatencyMetricService.record_latency(
+            db=db,
+            endpoint="enhanced-chat",
+            latency_ms=expansion_time,
+            user_id=user_id,
+            request_id=request_id,
+            latency_metadata={
+                "phase": "cross_reference_expansion",
+                "docs_added": len(related),
+                "streaming": streaming
+            },
+            type_category="phase_timing"
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record cross-reference expansion timing: {e}")
+    return related
+
+def cross_encoder_stage(docs: List, question: str, db: Session, user_id: str, request_id: str, streaming: bool = False) -> List:
+    """Run the cross-encoder over the reranked docs (within its time budget) and record it as its own phase"""
+    ce_start = time.time()
+    docs, stats = enhanced_retriever.cross_encode_rerank(docs, question, top_k=2)
+    ce_time = (time.time() - ce_start) * 1000
+    print(f'⏱️  CROSS-ENCODER: {ce_time:.1f}ms ({"applied" if stats["applied"] else "stage-one order kept"})')
+
+    try:
+        LatencyMetricService.record_latency(
+            db=db,
+            endpoint="enhanced-chat",
+            latency_ms=ce_time,
+            user_id=user_id,
+            request_id=request_id,
+            latency_metadata={
+                "phase": "cross_encoder_rerank",
+                "model": settings.cross_encoder_model,
+                "quantized": settings.cross_encoder_quantize,
+                "candidates": stats["candidates"],
+                "budget_ms": stats["budget_ms"],
+                "applied": stats["applied"],
+                "timed_out": stats["timed_out"],
+                "streaming": streaming
+            },
+            type_category="phase_timing"
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record cross-encoder timing: {e}")
+    return docs
+
 def calculate_confidence(docs: List, query_analysis: Dict) -> float:
     """Calculate confidence score based on retrieval quality"""
     if not docs:
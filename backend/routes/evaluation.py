@@ -14,6 +14,7 @@ from evaluation.rag_evaluator import compute_latency_stats, rag_evaluator, Evalu
 from evaluation.eval_dataset import LegalEvalDataset
 
 from chain.retriever import enhanced_retriever, query_processor
+from config.settings import settings
 from services.openai_service import openai_service
 
 router = APIRouter()
@@ -66,7 +67,7 @@ def _normalize_doc_id(doc_id: Optional[str]) -> Optional[str]:
 
 # Helper: perform retrieval and rerank, return final retrieved_docs (ordered)
 
-def retrieve_and_rerank(question: str, filters: Dict[str, Any]) -> Tuple[List[Any], List[float]]:
+def retrieve_and_rerank(question: str, filters: Dict[str, Any], query_analysis: Optional[Dict[str, Any]] = None) -> Tuple[List[Any], List[float]]:
     """
     Replicates the retrieval and reranking flow from enhanced_chat_stream for true evaluation.
     """
@@ -74,13 +75,19 @@ def retrieve_and_rerank(question: str, filters: Dict[str, Any]) -> Tuple[List[An
     t0 = time.time()
 
     # Step 1: Query analysis (already done before calling this function)
-    # Step 2: Retrieval with filters (k=2, as in enhanced_chat_stream)
+    # Exact citations are answered from the citation index, as in enhanced_chat
+    if enhanced_retriever and query_analysis is not None:
+        citation_docs = enhanced_retriever.citation_lookup(question, query_analysis, k=2)
+        if citation_docs is not None:
+            return citation_docs, [(time.time() - t0) * 1000.0, 0.0]
+
+    # Step 2: Retrieval with filters (k=2, or the cross-encoder candidate pool, as in enhanced_chat_stream)
     try:
         if enhanced_retriever:
             relevant_docs = enhanced_retriever.retrieve_with_filters(
                 query=question,
                 filters=filters,
-                k=2  # Match enhanced_chat_stream
+                k=enhanced_retriever.candidate_k(2)  # Match enhanced_chat_stream
             )
         else:
             # Fallback to basic retriever
@@ -96,9 +103,12 @@ def retrieve_and_rerank(question: str, filters: Dict[str, Any]) -> Tuple[List[An
     rerank_start = time.time()
     if enhanced_retriever and relevant_docs:
         try:
+            # Same stages as enhanced_chat, including the optional cross-encoder
             relevant_docs = enhanced_retriever.rerank(
-                relevant_docs, question, top_k=2, alpha=0.75  # Match EVAL_ALPHA in enhanced_chat
+                relevant_docs, question, top_k=enhanced_retriever.candidate_k(2), alpha=0.75  # Match EVAL_ALPHA in enhanced_chat
             )
+            if enhanced_retriever.cross_encoder_enabled:
+                relevant_docs, _ = enhanced_retriever.cross_encode_rerank(relevant_docs, question, top_k=2)
         except Exception as e:
             logger.warning("Rerank failed: %s. Returning original docs.", e)
     latencies.append((time.time() - rerank_start) * 1000.0)
@@ -107,6 +117,18 @@ def retrieve_and_rerank(question: str, filters: Dict[str, Any]) -> Tuple[List[An
     return relevant_docs[:2], latencies  # Always return at most 2 docs, as in enhanced_chat_stream
 
 
+# Helper: provisions cited by the retrieved docs, added to the context as cross_reference_stage does
+def related_provisions(docs: List[Any]) -> List[Any]:
+    limit = settings.cross_reference_expansion_limit
+    if not enhanced_retriever or not docs or limit <= 0:
+        return []
+    try:
+        return enhanced_retriever.related_sections(docs, limit=limit)
+    except Exception as e:
+        logger.warning("Cross-reference expansion failed: %s", e)
+        return []
+
+
 # Helper: create evaluation prompt with strict grounding using doc_map + snippets
 def make_evaluation_prompt(doc_map: List[str], full_context: str, question: str, evidence_threshold: float, max_context_chars: int = 18000) -> Tuple[str, str]:
     """
@@ -146,11 +168,14 @@ async def evaluate_single_question(request: SingleEvaluationRequest):
         filters = query_analysis.get("filters", {})
 
         # Retrieval + rerank
-        retrieved_docs, retrieval_latencies = retrieve_and_rerank(request.question, filters)
+        retrieved_docs, retrieval_latencies = retrieve_and_rerank(request.question, filters, query_analysis)
+
+        # Cross-referenced provisions join the context (not the retrieval metrics), as in enhanced_chat
+        related_docs = related_provisions(retrieved_docs)
 
         from routes.enhanced_chat import format_context
 
-        context = format_context(retrieved_docs)
+        context = format_context(retrieved_docs + related_docs)
         # Optionally truncate context as in production
         max_context_length = 6000
         if len(context) > max_context_length:
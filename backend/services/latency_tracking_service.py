@@ -201,7 +201,7 @@ class LatencyTracker:
             
             # Fallback to known endpoints if discovery failed
             if not endpoint_names:
-                endpoint_names = {"enhanced-chat", "auth", "evaluation"}  # Add more as needed
+                endpoint_names = {"enhanced-chat", "enhanced-chat-citation", "auth", "evaluation"}  # Add more as needed
                 logger.info(f"Using fallback endpoints: {list(endpoint_names)}")
             
             for endpoint in endpoint_names:
@@ -0,0 +1,113 @@
+"""
+Check of the S3 object cache and listing memoisation against a moto S3 bucket.
+
+WHAT THIS DOES:
+1. S3ObjectCache.iter_fetched downloads every object once, then serves
+   the same ETags from the cache directory (hits, no downloads)
+2. Overwriting an object changes its ETag, so only that object is fetched again
+3. AWSDocumentsLoader.list_s3_documents lists the bucket once per loader,
+   and refresh=True lists it again and sees the new ETag
+
+Run (from backend/, needs moto):
+    python test_s3_object_cache.py
+or  python -m pytest -q test_s3_object_cache.py
+"""
+
+import os
+import tempfile
+
+import boto3
+from moto import mock_aws
+
+BUCKET = "legal-docs-test"
+REGION = "us-east-1"
+KEYS = ["acts/ipc.pdf", "acts/crpc.pdf", "acts/constitution.pdf"]
+
+
+def _setup_bucket(s3_client):
+    s3_client.create_bucket(Bucket=BUCKET)
+    for key in KEYS:
+        s3_client.put_object(Bucket=BUCKET, Key=key, Body=f"%PDF-1.4 {key}".encode())
+    s3_client.put_object(Bucket=BUCKET, Key="acts/readme.txt", Body=b"not a pdf")
+
+
+def _set_env(persist_dir: str):
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": REGION,
+        "AWS_REGION": REGION,
+        "AWS_S3_BUCKET": BUCKET,
+        "AWS_S3_PREFIX": "acts/",
+        "CHROMA_PERSIST_DIR": persist_dir,
+        "S3_LISTING_TRUST_MINUTES": "0",
+    })
+
+
+def test_etag_cache_hit_and_miss():
+    """Cached ETags are not downloaded again; a changed ETag is"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _set_env(tmp)
+        with mock_aws():
+            from chain.aws_loader import AWSDocumentsLoader
+            from chain.s3_object_cache import S3ObjectCache
+
+            s3_client = boto3.client("s3", region_name=REGION)
+            _setup_bucket(s3_client)
+            loader = AWSDocumentsLoader()
+            listing = loader.list_s3_documents()
+            assert sorted(o["key"] for o in listing) == sorted(KEYS)
+
+            cache_dir = os.path.join(tmp, "objects")
+            cold = S3ObjectCache(s3_client, BUCKET, cache_dir, max_concurrency=2)
+            fetched = list(cold.iter_fetched(listing))
+            assert [o["key"] for o, _ in fetched] == [o["key"] for o in listing]
+            assert all(path and os.path.exists(path) for _, path in fetched)
+            assert (cold.downloads, cold.hits) == (len(KEYS), 0)
+
+            warm = S3ObjectCache(s3_client, BUCKET, cache_dir, max_concurrency=2)
+            assert [p for _, p in warm.iter_fetched(listing)] == [p for _, p in fetched]
+            assert (warm.downloads, warm.hits) == (0, len(KEYS))
+
+            s3_client.put_object(Bucket=BUCKET, Key=KEYS[0], Body=b"%PDF-1.4 amended")
+            relisted = loader.list_s3_documents(refresh=True)
+            changed = S3ObjectCache(s3_client, BUCKET, cache_dir, max_concurrency=2)
+            paths = dict((o["key"], p) for o, p in changed.iter_fetched(relisted))
+            assert (changed.downloads, changed.hits) == (1, len(KEYS) - 1)
+            with open(paths[KEYS[0]], "rb") as f:
+                assert f.read() == b"%PDF-1.4 amended"
+            # The superseded version of the changed key is gone
+            assert os.listdir(os.path.dirname(paths[KEYS[0]])) == [os.path.basename(paths[KEYS[0]])]
+
+
+def test_listing_memoised_per_loader():
+    """list_s3_documents lists the bucket once; refresh=True lists it again"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _set_env(tmp)
+        with mock_aws():
+            from chain.aws_loader import AWSDocumentsLoader
+
+            loader = AWSDocumentsLoader()
+            _setup_bucket(loader.s3_client)
+            list_calls = []
+            loader.s3_client.meta.events.register(
+                "before-call.s3.ListObjectsV2", lambda **kwargs: list_calls.append(1)
+            )
+
+            first = loader.list_s3_documents()
+            assert loader.list_s3_documents() is first
+            assert len(list_calls) == 1
+
+            old_etag = next(o["etag"] for o in first if o["key"] == KEYS[1])
+            loader.s3_client.put_object(Bucket=BUCKET, Key=KEYS[1], Body=b"%PDF-1.4 repealed")
+            refreshed = loader.list_s3_documents(refresh=True)
+            assert len(list_calls) == 2
+            new_etag = next(o["etag"] for o in refreshed if o["key"] == KEYS[1])
+            assert new_etag and new_etag != old_etag
+            assert loader.list_s3_documents() is refreshed
+
+
+if __name__ == "__main__":
+    for check in (test_etag_cache_hit_and_miss, test_listing_memoised_per_loader):
+        check()
+        print(f"✅ {check.__name__}")